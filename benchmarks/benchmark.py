@@ -0,0 +1,1046 @@
+#!/usr/bin/env python
+"""
+===== 模型查找器性能基准 (Model Finder Benchmarks) =====
+完全离线运行：合成工作流、伪造模型目录、本地模拟搜索/Hugging Face服务器。
+
+用法：
+    python benchmarks/benchmark.py -o results.json
+    python benchmarks/benchmark.py --quick --compare baseline.json
+
+结果为JSON，--compare 对比两次运行，超出阈值的场景视为性能回退（退出码1）。
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import importlib
+import statistics
+import subprocess
+import threading
+from contextlib import contextmanager, redirect_stdout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote, unquote
+from urllib.request import urlopen
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+mf = importlib.import_module('model_finder_精简版')
+
+# 常见的模型文件名，用于制造重复引用
+COMMON_MODELS = [
+    'flux1-dev.safetensors', 'flux1-schnell.safetensors', 'ae.safetensors',
+    't5xxl_fp16.safetensors', 't5xxl_fp8_e4m3fn.safetensors', 'clip_l.safetensors',
+    'sd_xl_base_1.0.safetensors', 'sdxl_vae.safetensors', 'v1-5-pruned-emaonly.ckpt',
+    '4x-UltraSharp.pth', 'control_v11p_sd15_canny.pth', 'yolov8m.pt',
+]
+
+# 模拟服务器中的仓库（其余文件名按需生成 fake-org/<文件名主干> 仓库）
+FAKE_REPOS = {
+    'comfyanonymous/flux_text_encoders': ['clip_l.safetensors', 't5xxl_fp16.safetensors', 't5xxl_fp8_e4m3fn.safetensors'],
+    'black-forest-labs/FLUX.1-dev': ['flux1-dev.safetensors', 'ae.safetensors'],
+    'black-forest-labs/FLUX.1-schnell': ['flux1-schnell.safetensors', 'ae.safetensors'],
+    'stabilityai/stable-diffusion-xl-base-1.0': ['sd_xl_base_1.0.safetensors', 'vae/diffusion_pytorch_model.safetensors'],
+    'stabilityai/sdxl-vae': ['sdxl_vae.safetensors'],
+    'XLabs-AI/flux-lora-collection': ['anime_lora.safetensors', 'art_lora.safetensors', 'disney_lora.safetensors',
+                                      'mjv6_lora.safetensors', 'realism_lora.safetensors', 'scenery_lora.safetensors'],
+    'XLabs-AI/flux-controlnet-collections': ['flux-canny-controlnet-v3.safetensors',
+                                             'flux-depth-controlnet-v3.safetensors',
+                                             'flux-hed-controlnet-v3.safetensors'],
+}
+
+# 模型分类目录
+CATEGORIES = ['checkpoints', 'loras', 'vae', 'clip', 'unet', 'controlnet', 'upscale_models', 'embeddings']
+
+# ----- 数据生成 -----
+
+def generate_workflow(path, nodes=1000, duplicate_ratio=0.5, prompt_length=2000, seed=0):
+    """生成合成工作流：模型加载节点、长提示词节点和重复文件名"""
+    rng = random.Random(seed)
+    node_list = []
+    for i in range(nodes):
+        kind = i % 4
+        if kind == 0:
+            if rng.random() < duplicate_ratio:
+                name = rng.choice(COMMON_MODELS)
+            else:
+                name = f"model_{rng.randrange(nodes)}_{rng.choice(['fp16', 'fp8', 'Q4_K_M'])}.safetensors"
+            node = {'id': i, 'type': 'CheckpointLoaderSimple', 'widgets_values': [name]}
+        elif kind == 1:
+            name = f"lora_{rng.randrange(nodes // 2 + 1)}.safetensors"
+            node = {'id': i, 'type': 'LoraLoader', 'widgets_values': [name, 1.0, 1.0]}
+        elif kind == 2:
+            prompt = ' '.join(rng.choice(['a', 'photo', 'of', 'cat', 'masterpiece', 'flux.safetensors'])
+                              for _ in range(prompt_length // 6))
+            node = {'id': i, 'type': 'CLIPTextEncode', 'widgets_values': [prompt]}
+        else:
+            node = {'id': i, 'type': 'KSampler', 'widgets_values': [rng.randrange(2 ** 32), 'fixed', 20, 7.0, 'euler', 'normal', 1.0]}
+        node.update({'pos': [rng.random() * 1000, rng.random() * 1000], 'size': [300, 100], 'flags': {}, 'order': i, 'mode': 0})
+        node_list.append(node)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'last_node_id': nodes, 'nodes': node_list, 'links': [], 'extra': {}, 'version': 0.4}, f)
+    return path
+
+def build_model_tree(root, files=10000, seed=0):
+    """生成伪造模型目录（空文件），包含常见模型和随机文件名"""
+    rng = random.Random(seed)
+    for category in CATEGORIES:
+        for sub in range(4):
+            os.makedirs(os.path.join(root, category, f"set_{sub}"), exist_ok=True)
+
+    names = COMMON_MODELS[:len(COMMON_MODELS) // 2] + [
+        f"model_{i}_{rng.choice(['fp16', 'fp8', 'Q4_K_M'])}.safetensors" for i in range(files)]
+    for name in names[:files]:
+        directory = os.path.join(root, rng.choice(CATEGORIES), f"set_{rng.randrange(4)}")
+        open(os.path.join(directory, name), 'wb').close()
+    return root
+
+def generate_missing_csv(path, rows=1000, seed=0):
+    """生成缺失模型CSV（create_csv_file的输入格式）"""
+    rng = random.Random(seed)
+    missing = [{'node_id': i, 'node_type': 'LoraLoader',
+                'file_path': rng.choice(COMMON_MODELS) if rng.random() < 0.3 else f"lora_{i}.safetensors"}
+               for i in range(rows)]
+    with quiet():
+        return mf.create_csv_file(missing, path)
+
+def generate_result_csv(path, rows=1000, seed=0):
+    """生成已搜索完成的结果CSV（create_html_view的输入格式）"""
+    rng = random.Random(seed)
+    import csv
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['序号', '节点ID', '节点类型', '文件名', '下载链接', '镜像链接', '搜索状态'])
+        for i in range(rows):
+            name = f"model_{i}.safetensors"
+            if rng.random() < 0.8:
+                link = f"https://huggingface.co/org{i % 50}/repo{i}/resolve/main/{name}"
+                writer.writerow([i + 1, i, 'UNETLoader', name, link, mf.get_mirror_link(link), '已处理'])
+            else:
+                writer.writerow([i + 1, i, 'UNETLoader', name, '', '', '未找到'])
+    return path
+
+def generate_link_csv(path, base_url, rows=1000, seed=0):
+    """生成链接指向模拟服务器的结果CSV（verify_links的输入格式）"""
+    rng = random.Random(seed)
+    import csv
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['序号', '节点ID', '节点类型', '文件名', '下载链接', '镜像链接', '搜索状态'])
+        for i in range(rows):
+            kind = rng.choices(['ok', 'missing', 'nohead'], [0.8, 0.1, 0.1])[0]
+            name = f"{kind}_{i}.safetensors"
+            link = f"{base_url}/org{i % 50}/repo{i}/resolve/main/{name}"
+            mirror = f"{base_url}/mirror/org{i % 50}/repo{i}/resolve/main/{name}"
+            writer.writerow([i + 1, i, 'UNETLoader', name, link, mirror, '已处理'])
+    return path
+
+# ----- 本地模拟服务器 -----
+
+# 模拟模型文件内容的重复块
+FILE_BLOCK = bytes(range(256)) * 256
+
+def file_bytes(start, stop):
+    """模拟模型文件中[start, stop)范围的内容"""
+    offset = start % len(FILE_BLOCK)
+    return (FILE_BLOCK * ((stop - start) // len(FILE_BLOCK) + 2))[offset:offset + stop - start]
+
+class FakeServer:
+    """本地模拟搜索/Hugging Face服务器，每个请求附加可配置的延迟
+
+    file_size: 模型文件大小，默认约1MB
+    stream_rate: 每个响应的传输速度上限（字节/秒），模拟CDN对单连接的限速
+    """
+
+    def __init__(self, latency=0.0, file_size=None, stream_rate=None):
+        self.latency = latency
+        self.file_size = file_size
+        self.stream_rate = stream_rate
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.handle_request()
+
+            def do_HEAD(self):
+                self.handle_request(head=True)
+
+            def handle_request(self, head=False):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                status, headers, body = server.route(self)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if 'Content-Length' not in headers:
+                    self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if head:
+                    return
+                if not server.stream_rate:
+                    self.wfile.write(body)
+                    return
+                chunk_size = 256 * 1024
+                try:
+                    for start in range(0, len(body), chunk_size):
+                        self.wfile.write(body[start:start + chunk_size])
+                        time.sleep(min(chunk_size, len(body) - start) / server.stream_rate)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def route(self, handler):
+        parsed = urlparse(handler.path)
+        if parsed.path == '/api/models':
+            return self.json_response(self.search_models(parse_qs(parsed.query)))
+        if parsed.path.startswith('/api/models/'):
+            # /api/models/{仓库} 和 /api/models/{仓库}/revision/{版本}
+            repo_id = unquote(parsed.path[len('/api/models/'):]).split('/revision/', 1)[0]
+            files = self.repo_files(repo_id)
+            if files is None:
+                return 404, {}, b'{"error": "Repository not found"}'
+            return self.json_response({'id': repo_id, 'sha': '0' * 40,
+                                       'siblings': [{'rfilename': f} for f in files]})
+        if parsed.path.startswith('/cdn/'):
+            return self.model_file(handler, unquote(parsed.path))
+        if '/resolve/' in parsed.path:
+            # 模拟Hugging Face下载链接：重定向到CDN
+            return 302, {'Location': '/cdn' + parsed.path}, b''
+        if parsed.path == '/search':
+            query = parse_qs(parsed.query).get('q', [''])[0]
+            return 200, {'Content-Type': 'text/html; charset=utf-8'}, self.search_page(query).encode('utf-8')
+        if parsed.path == '/json/version':
+            return self.json_response({'Browser': 'FakeChrome/1.0'})
+        if parsed.path == '/':
+            return 200, {'Content-Type': 'text/html; charset=utf-8'}, b'<form id="sb_form"><input id="sb_form_q"></form>'
+        return 404, {}, b'not found'
+
+    def model_file(self, handler, path):
+        """模拟CDN上的模型文件：名称包含"missing"的返回404，包含"nohead"的不支持HEAD，支持Range请求"""
+        if 'missing' in path:
+            return 404, {}, b'not found'
+        if 'nohead' in path and handler.command == 'HEAD':
+            return 405, {}, b''
+        size = self.file_size or 1024 * 1024 + len(path)
+        etag = '"%s"' % hashlib.sha256(path.encode('utf-8')).hexdigest()
+        if handler.command == 'HEAD':
+            return 200, {'Content-Length': str(size), 'ETag': etag, 'Accept-Ranges': 'bytes'}, b''
+        
+        range_header = handler.headers.get('Range', '')
+        if range_header.startswith('bytes='):
+            first, _, last = range_header[len('bytes='):].partition('-')
+            start = int(first)
+            stop = min(size, int(last) + 1) if last else size
+            return 206, {'Content-Range': f"bytes {start}-{stop - 1}/{size}", 'ETag': etag}, file_bytes(start, stop)
+        return 200, {'ETag': etag, 'Accept-Ranges': 'bytes'}, file_bytes(0, size)
+
+    @staticmethod
+    def json_response(data):
+        return 200, {'Content-Type': 'application/json'}, json.dumps(data).encode('utf-8')
+
+    @staticmethod
+    def repo_files(repo_id):
+        """仓库文件列表：fake-org下的仓库按名称生成，名称包含"missing"的视为不存在"""
+        if repo_id in FAKE_REPOS:
+            return FAKE_REPOS[repo_id]
+        if repo_id.startswith('fake-org/') and 'missing' not in repo_id:
+            stem = repo_id.split('/', 1)[1]
+            return [stem + ext for ext in mf.MODEL_EXTENSIONS]
+        return None
+
+    def search_models(self, params):
+        """模拟 /api/models?search= ：返回id包含搜索词的仓库"""
+        term = params.get('search', [''])[0]
+        limit = int(params.get('limit', ['10'])[0])
+        ids = [repo_id for repo_id in FAKE_REPOS if term.lower() in repo_id.lower()]
+        if self.repo_files(f"fake-org/{term}") is not None:
+            ids.append(f"fake-org/{term}")
+        return [{'id': repo_id} for repo_id in ids[:limit]]
+
+    @staticmethod
+    def search_page(query):
+        """模拟Bing搜索结果页：文件名包含"missing"时返回空结果，FAKE_REPOS中的文件链接到所在仓库"""
+        name = query.split('"')[1] if '"' in query else query
+        if 'missing' in name:
+            return '<ol id="b_results"></ol>'
+        repo_id = next((r for r, files in FAKE_REPOS.items() if name in files),
+                       f"fake-org/{quote(os.path.splitext(name)[0])}")
+        link = f"https://huggingface.co/{repo_id}/blob/main/{quote(name)}"
+        return f'<ol id="b_results"><li><h2><a href="{link}">{name}</a></h2></li></ol>'
+
+class FakeElement:
+    def __init__(self, page=None, text='', href=''):
+        self.page = page
+        self.text = text
+        self.href = href
+
+    def clear(self):
+        self.page.query = ''
+
+    def input(self, text):
+        self.page.query += text
+
+    def attr(self, name):
+        return self.href if name == 'href' else None
+
+class FakeChromiumPage:
+    """替代ChromiumPage的模拟浏览器：把Bing请求转发到本地模拟服务器
+
+    launch_delay: 模拟启动浏览器的耗时（秒），launches记录启动次数
+    """
+
+    server_url = None
+    launch_delay = 0.0
+    launches = 0
+
+    def __init__(self, options=None):
+        self.query = ''
+        self.html = ''
+        self.url = ''
+        self.tabs = {}
+        self.tab_id = str(id(self))
+        self.process_id = None
+        if options is not None:
+            FakeChromiumPage.launches += 1
+            time.sleep(self.launch_delay)
+
+    def new_tab(self, url=None):
+        tab = FakeChromiumPage()
+        self.tabs[tab.tab_id] = tab
+        return tab
+
+    @property
+    def tab_ids(self):
+        return [self.tab_id] + list(self.tabs)
+
+    def get_tab(self, tab_id):
+        return self.tabs[tab_id]
+
+    def get(self, url, **kwargs):
+        self.url = url
+        if url == 'about:blank':
+            self.html = ''
+            return True
+        parsed = urlparse(url)
+        path = parsed.path or '/'
+        if parsed.query and path == '/search':
+            path += '?' + parsed.query
+        self.html = urlopen(self.server_url + path).read().decode('utf-8')
+        return True
+
+    def ele(self, locator, timeout=None):
+        if locator == '#sb_form_q':
+            return FakeElement(self) if 'sb_form_q' in self.html else None
+        if locator == '#b_results':
+            return FakeElement(self) if 'b_results' in self.html else None
+        return None
+
+    def eles(self, locator, timeout=None):
+        results = []
+        for part in self.html.split('<h2><a href="')[1:]:
+            href, rest = part.split('">', 1)
+            results.append(FakeElement(self, text=rest.split('<', 1)[0], href=href))
+        return results
+
+    def run_js(self, script):
+        if 'submit' in script:
+            self.get('/search?q=' + quote(self.query))
+
+    def refresh(self):
+        pass
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+class FakeChromiumOptions:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+@contextmanager
+def fake_browser(server):
+    """把模块中的浏览器替换为模拟浏览器"""
+    saved = (mf.ChromiumPage if hasattr(mf, 'ChromiumPage') else None,
+             mf.ChromiumOptions if hasattr(mf, 'ChromiumOptions') else None,
+             mf.DRISSION_AVAILABLE, os.environ.get('LOCALAPPDATA'))
+    FakeChromiumPage.server_url = server.url
+    mf.ChromiumPage, mf.ChromiumOptions, mf.DRISSION_AVAILABLE = FakeChromiumPage, FakeChromiumOptions, True
+    os.environ.setdefault('LOCALAPPDATA', tempfile.gettempdir())
+    try:
+        yield
+    finally:
+        mf.ChromiumPage, mf.ChromiumOptions, mf.DRISSION_AVAILABLE = saved[:3]
+        if saved[3] is None:
+            os.environ.pop('LOCALAPPDATA', None)
+
+# ----- 计时 -----
+
+@contextmanager
+def quiet():
+    """屏蔽被测函数的打印输出"""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        yield
+
+def time_runs(func, repeat, setup=None):
+    """运行repeat次并返回每次耗时（秒）"""
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with quiet():
+            start = time.perf_counter()
+            func()
+            runs.append(time.perf_counter() - start)
+    return runs
+
+def summarize(runs, **params):
+    return {
+        'median_s': statistics.median(runs),
+        'min_s': min(runs),
+        'max_s': max(runs),
+        'runs': runs,
+        'params': params,
+    }
+
+def has_module(name):
+    try:
+        importlib.import_module(name)
+        return True
+    except ImportError:
+        return False
+
+# ----- 场景 -----
+
+def scenario_startup(work_dir, config):
+    """命令行冷启动：每次调用都是新进程，计入解释器启动和模块导入"""
+    env = dict(os.environ, MODEL_FINDER_CACHE_DIR=mf.CACHE_DIR)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    module = mf.__name__
+
+    def run_cli(*args):
+        subprocess.run([sys.executable, '-m', module, *args], cwd=REPO_DIR, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    # 分析路径不应导入的重量级依赖
+    check = ("import sys, importlib; importlib.import_module(%r); "
+             "print(','.join(m for m in ('pandas', 'tkinter', 'DrissionPage', 'asyncio') if m in sys.modules))" % module)
+    heavy_modules = subprocess.run([sys.executable, '-c', check], cwd=REPO_DIR, env=env,
+                                   capture_output=True, text=True).stdout.strip()
+
+    # 先运行一次以生成字节码缓存
+    run_cli('--version')
+
+    results = {}
+    results['startup.version'] = summarize(
+        time_runs(lambda: run_cli('--version'), config['startup_repeat']),
+        budget_s=config['startup_budget'], heavy_modules=heavy_modules)
+
+    tree = build_model_tree(os.path.join(work_dir, 'models'), files=200)
+    workflow = generate_workflow(os.path.join(work_dir, 'workflow.json'), nodes=50)
+    output = os.path.join(work_dir, 'missing.csv')
+    results['startup.batch_small[nodes=50]'] = summarize(
+        time_runs(lambda: run_cli('batch', workflow, '-o', output, '--model-roots', tree), config['startup_repeat']),
+        budget_s=config['startup_budget'], heavy_modules=heavy_modules)
+    return results
+
+def scenario_find_missing_models(work_dir, config):
+    results = {}
+    tree = build_model_tree(os.path.join(work_dir, 'models'), files=config['tree_files'])
+
+    def clear_index():
+        shutil.rmtree(mf.CACHE_DIR, ignore_errors=True)
+
+    for nodes in config['workflow_nodes']:
+        workflow = generate_workflow(os.path.join(work_dir, f"workflow_{nodes}.json"), nodes=nodes)
+        run = lambda: mf.find_missing_models(workflow, model_roots=[tree])
+        results[f"find_missing_models.cold_index[nodes={nodes}]"] = summarize(
+            time_runs(run, config['repeat'], setup=clear_index), nodes=nodes, tree_files=config['tree_files'])
+        results[f"find_missing_models.warm_index[nodes={nodes}]"] = summarize(
+            time_runs(run, config['repeat']), nodes=nodes, tree_files=config['tree_files'])
+        results[f"find_missing_models.streaming[nodes={nodes}]"] = summarize(
+            time_runs(lambda: mf.find_missing_models(workflow, model_roots=[tree], streaming=True), config['repeat']),
+            nodes=nodes, tree_files=config['tree_files'])
+    return results
+
+def scenario_model_layout(work_dir, config):
+    """按节点类型只在ComfyUI会加载的目录中查找：模型目录 + extra_model_paths.yaml中的另一个根目录"""
+    comfy_dir = os.path.join(work_dir, 'ComfyUI')
+    tree = build_model_tree(os.path.join(comfy_dir, 'models'), files=config['tree_files'])
+    extra_dir = os.path.join(work_dir, 'nfs', 'loras')
+    os.makedirs(extra_dir, exist_ok=True)
+    for i in range(config['tree_files'] // 10):
+        open(os.path.join(extra_dir, f"lora_{i}.safetensors"), 'wb').close()
+    with open(os.path.join(comfy_dir, 'extra_model_paths.yaml'), 'w', encoding='utf-8') as f:
+        f.write(f"nfs:\n    base_path: {os.path.dirname(extra_dir)}\n    loras: |\n        loras\n")
+
+    results = {}
+    nodes = config['workflow_nodes'][-1]
+    workflow = generate_workflow(os.path.join(work_dir, f"layout_{nodes}.json"), nodes=nodes)
+    with quiet():
+        missing = mf.find_missing_models(workflow, model_roots=[tree], near_matches=False)
+    misplaced = sum(1 for entry in missing if entry.get('misplaced'))
+    results[f"model_layout.find_missing_models[nodes={nodes}]"] = summarize(
+        time_runs(lambda: mf.find_missing_models(workflow, model_roots=[tree], near_matches=False), config['repeat']),
+        nodes=nodes, tree_files=config['tree_files'], missing=len(missing), misplaced=misplaced)
+    return results
+
+def scenario_hash_identity(work_dir, config):
+    """按内容哈希识别重命名的模型：首次需要计算SHA-256，之后按(设备, inode, 大小, mtime)命中缓存"""
+    count, size = config['hash_files'], config['hash_file_mb'] * 1024 * 1024
+    model_dir = os.path.join(work_dir, 'models', 'loras')
+    os.makedirs(model_dir)
+    block = os.urandom(1024 * 1024)
+    for i in range(count):
+        with open(os.path.join(model_dir, f"renamed_{i}.safetensors"), 'wb') as f:
+            f.write(str(i).encode('ascii').ljust(64))
+            for _ in range(size // len(block)):
+                f.write(block)
+
+    # 以旧文件名登记已知哈希，模拟工作流仍引用重命名前的文件名
+    hash_cache = mf.HashCache()
+    for i in range(count):
+        path = os.path.join(model_dir, f"renamed_{i}.safetensors")
+        hash_cache.add_known(f"original_{i}.safetensors", mf.hash_file(path), os.path.getsize(path))
+    hash_cache.close()
+
+    index = mf.load_model_index([os.path.join(work_dir, 'models')])
+    missing = lambda: [{'file_path': f"original_{i}.safetensors"} for i in range(count)]
+    db_file = os.path.join(mf.CACHE_DIR, 'hash_cache.sqlite3')
+
+    def clear_file_hashes():
+        cache = mf.HashCache(db_file)
+        with cache.conn:
+            cache.conn.execute("DELETE FROM file_hashes")
+        cache.close()
+
+    params = {'files': count, 'file_mb': config['hash_file_mb']}
+    return {
+        f"hash_identity.cold[files={count}]": summarize(
+            time_runs(lambda: mf.identify_by_hash(missing(), index), config['repeat'], setup=clear_file_hashes),
+            **params),
+        f"hash_identity.warm[files={count}]": summarize(
+            time_runs(lambda: mf.identify_by_hash(missing(), index), config['repeat']), **params),
+    }
+
+def scenario_fuzzy_match(work_dir, config):
+    """本地近似文件名匹配：构建三元组索引，以及对改了大小写、变体后缀的文件名查询"""
+    rng = random.Random(0)
+    files = config['fuzzy_files']
+    names = COMMON_MODELS + [f"{rng.choice(COMMON_MODELS).split('.')[0]}_{i}_{rng.choice(['fp16', 'fp8_e4m3fn', 'Q4_K_M'])}"
+                             f".safetensors" for i in range(files)]
+    results = {}
+    indexes = []
+    results[f"fuzzy_match.build[files={files}]"] = summarize(
+        time_runs(lambda: indexes.append(mf.FuzzyIndex(names)), config['repeat']), files=files)
+
+    fuzzy = indexes[-1]
+    queries = [rng.choice(names).upper().replace('_', '-') for _ in range(config['fuzzy_queries'])]
+    queries += [name.replace('.safetensors', '_fp8_e4m3fn.safetensors') for name in COMMON_MODELS]
+    runs = time_runs(lambda: [fuzzy.search(q) for q in queries], config['repeat'])
+    results[f"fuzzy_match.query[files={files},queries={len(queries)}]"] = summarize(
+        runs, files=files, queries=len(queries), per_query_ms=statistics.median(runs) / len(queries) * 1000)
+    return results
+
+def scenario_create_csv_file(work_dir, config):
+    rows = config['csv_rows']
+    rng = random.Random(0)
+    missing = [{'node_id': i, 'node_type': 'LoraLoader', 'file_path': f"lora_{rng.randrange(rows)}.safetensors"}
+               for i in range(rows)]
+    output = os.path.join(work_dir, 'missing.csv')
+    return {f"create_csv_file[rows={rows}]": summarize(
+        time_runs(lambda: mf.create_csv_file(missing, output), config['repeat']), rows=rows)}
+
+def scenario_search_model_links(work_dir, config):
+    if not has_module('pandas'):
+        return {'search_model_links': {'skipped': 'pandas未安装'}}
+
+    rows = config['search_rows']
+    csv_file = os.path.join(work_dir, 'search.csv')
+
+    def setup():
+        generate_missing_csv(csv_file, rows=rows)
+
+    results = {}
+    with FakeServer(latency=config['latency']) as server, fake_browser(server):
+        # 只有一个镜像时不测速，避免访问外网；不查询离线模型目录，测量的是搜索本身
+        runs = time_runs(lambda: mf.search_model_links(csv_file, use_cache=False, backend='bing', mirrors=[server.url],
+                                                       use_catalog=False),
+                         config['search_repeat'], setup=setup)
+        results[f"search_model_links.bing[rows={rows},latency={config['latency']}]"] = summarize(
+            runs, rows=rows, latency=config['latency'], server_requests=server.requests)
+
+    rows = config['api_search_rows']
+    with FakeServer(latency=config['latency']) as server:
+        backend = lambda: mf.HuggingFaceSearchBackend(base_url=server.url)
+        runs = time_runs(lambda: mf.search_model_links(csv_file, use_cache=False, backend=backend(), use_catalog=False),
+                         config['repeat'], setup=lambda: generate_missing_csv(csv_file, rows=rows))
+        results[f"search_model_links.hf_api[rows={rows},latency={config['latency']}]"] = summarize(
+            runs, rows=rows, latency=config['latency'], server_requests=server.requests)
+    return results
+
+def scenario_repo_tree(work_dir, config):
+    """仓库文件列表展开：Flux类工作流中同一仓库的多个文件，比较展开前后的Bing搜索次数
+
+    cold: 没有缓存的文件列表；warm: 先解析另一个使用同一批仓库的工作流，文件列表已缓存
+    """
+    if not has_module('pandas'):
+        return {'repo_tree': {'skipped': 'pandas未安装'}}
+
+    rng = random.Random(0)
+    names = [name for files in FAKE_REPOS.values() for name in files]
+    rng.shuffle(names)
+    workflows = {'all': names, 'first': names[::2], 'second': names[1::2]}
+    csv_file = os.path.join(work_dir, 'repo_tree.csv')
+    cache_file = os.path.join(work_dir, 'repo_tree_cache.db')
+
+    def write_csv(files):
+        missing = [{'node_id': i, 'node_type': 'DualCLIPLoader', 'file_path': name} for i, name in enumerate(files)]
+        with quiet():
+            mf.create_csv_file(missing, csv_file)
+
+    results = {}
+    searches = []
+    original_get = FakeChromiumPage.get
+
+    def counting_get(page, url, **kwargs):
+        if '/search' in url:
+            searches.append(url)
+        return original_get(page, url, **kwargs)
+
+    saved_endpoint = mf.HF_ENDPOINT
+    FakeChromiumPage.get = counting_get
+    try:
+        for case, expand in (('cold', False), ('cold', True), ('warm', True)):
+            with FakeServer(latency=config['latency']) as server, fake_browser(server):
+                mf.HF_ENDPOINT = server.url
+                search = lambda cache=None: mf.search_model_links(
+                    csv_file, use_cache=cache is not None, cache=cache, backend='bing', mirrors=[server.url],
+                    use_catalog=False, expand_repos=expand)
+                if case == 'cold':
+                    files = workflows['all']
+                    setup = lambda: write_csv(files)
+                    func = search
+                else:
+                    files = workflows['second']
+                    cache = None
+
+                    def setup():
+                        nonlocal cache
+                        if cache is not None:
+                            cache.close()
+                        if os.path.exists(cache_file):
+                            os.remove(cache_file)
+                        cache = mf.ResolutionCache(cache_file)
+                        write_csv(workflows['first'])
+                        with quiet():
+                            search(cache)
+                        write_csv(files)
+                        searches.clear()
+
+                    func = lambda: search(cache)
+                searches.clear()
+                runs = time_runs(func, config['search_repeat'], setup=setup)
+                if case == 'warm':
+                    cache.close()
+                results[f"repo_tree.{case}[files={len(files)},expand={expand}]"] = summarize(
+                    runs, files=len(files), searches=len(searches) // config['search_repeat'])
+    finally:
+        FakeChromiumPage.get = original_get
+        mf.HF_ENDPOINT = saved_endpoint
+    return results
+
+def scenario_browser_service(work_dir, config):
+    """常驻浏览器：连续多次只有1~3个缺失模型的短搜索，比较每次启动浏览器与复用常驻浏览器"""
+    if not has_module('pandas'):
+        return {'browser_service': {'skipped': 'pandas未安装'}}
+
+    csv_file = os.path.join(work_dir, 'browser_service.csv')
+    runs_count = config['browser_runs']
+    results = {}
+    FakeChromiumPage.launch_delay = config['browser_launch_delay']
+    try:
+        for persistent in (False, True):
+            with FakeServer(latency=config['latency']) as server, fake_browser(server):
+                # 模拟服务器同时充当常驻浏览器的调试端口（响应 /json/version）
+                service = mf.BrowserService(persistent=True, port=int(server.url.rsplit(':', 1)[1]),
+                                            profile_dir=os.path.join(work_dir, 'browser_profile')) if persistent else None
+                FakeChromiumPage.launches = 0
+                runs = time_runs(lambda: mf.search_model_links(
+                    csv_file, use_cache=False, backend=mf.BrowserSearchBackend(service=service), mirrors=[server.url],
+                    use_catalog=False, expand_repos=False), runs_count,
+                    setup=lambda: generate_missing_csv(csv_file, rows=random.randint(1, 3)))
+                if service is not None:
+                    service.stop()
+                results[f"browser_service[persistent={persistent},runs={runs_count}]"] = summarize(
+                    runs, persistent=persistent, launch_delay=config['browser_launch_delay'],
+                    launches=FakeChromiumPage.launches)
+    finally:
+        FakeChromiumPage.launch_delay = 0.0
+    return results
+
+def scenario_catalog(work_dir, config):
+    """离线模型目录：打开（内存映射）和按文件名查询"""
+    entries = config['catalog_entries']
+    catalog_file = os.path.join(work_dir, 'catalog.bin')
+    mf.ModelCatalog.write(catalog_file, ({'file_name': f"model_{i}.safetensors", 'repo_id': 'org/repo',
+                                          'path': f"model_{i}.safetensors", 'size': i} for i in range(entries)), 1)
+    names = [f"MODEL_{i}.safetensors" for i in range(0, entries, max(1, entries // 1000))] + COMMON_MODELS
+    results = {}
+    results[f"catalog.open[entries={entries}]"] = summarize(
+        time_runs(lambda: mf.ModelCatalog(catalog_file).close(), config['repeat']), entries=entries)
+
+    catalog = mf.ModelCatalog(catalog_file)
+    try:
+        runs = time_runs(lambda: [catalog.get(name) for name in names], config['repeat'])
+    finally:
+        catalog.close()
+    results[f"catalog.lookup[entries={entries},names={len(names)}]"] = summarize(
+        runs, entries=entries, names=len(names), per_lookup_us=statistics.median(runs) / len(names) * 1e6)
+    return results
+
+def scenario_verify_links(work_dir, config):
+    if not has_module('pandas'):
+        return {'verify_links': {'skipped': 'pandas未安装'}}
+
+    rows = config['verify_rows']
+    csv_file = os.path.join(work_dir, 'links.csv')
+    with FakeServer(latency=config['latency']) as server:
+        runs = time_runs(lambda: mf.verify_links(csv_file, use_cache=False), config['repeat'],
+                         setup=lambda: generate_link_csv(csv_file, server.url, rows=rows))
+        return {f"verify_links[links={rows * 2},latency={config['latency']}]": summarize(
+            runs, links=rows * 2, latency=config['latency'], server_requests=server.requests)}
+
+def scenario_download_models(work_dir, config):
+    if not has_module('pandas'):
+        return {'download_models': {'skipped': 'pandas未安装'}}
+
+    results = {}
+    files = config['download_files']
+    size = config['download_file_mb'] * 1024 * 1024
+    rate = config['download_stream_mb'] * 1024 * 1024
+    csv_file = os.path.join(work_dir, 'downloads.csv')
+    models_dir = os.path.join(work_dir, 'models')
+
+    def setup(server):
+        shutil.rmtree(models_dir, ignore_errors=True)
+        generate_link_csv(csv_file, server.url, rows=files, seed=1)
+
+    # 单连接对比多连接：服务器按连接限速时，分段下载的速度随连接数增长
+    with FakeServer(latency=config['latency'], file_size=size, stream_rate=rate) as server:
+        for connections in (1, mf.DOWNLOAD_CONNECTIONS):
+            runs = time_runs(lambda: mf.download_models(csv_file, models_dir, connections=connections),
+                             config['search_repeat'], setup=lambda: setup(server))
+            results[f"download_models[files={files},mb={config['download_file_mb']},connections={connections}]"] = \
+                summarize(runs, files=files, file_mb=config['download_file_mb'], connections=connections,
+                          stream_mb_s=config['download_stream_mb'])
+    return results
+
+def scenario_mirror_selection(work_dir, config):
+    """三个延迟不同的模拟镜像：首次测速，和之后从缓存读取测速结果"""
+    latency = config['latency']
+    cache_file = os.path.join(work_dir, 'mirror_cache.sqlite3')
+    with FakeServer(latency=latency * 4) as slow, FakeServer(latency=latency * 2) as medium, \
+            FakeServer(latency=latency) as fast:
+        mirrors = [slow.url, medium.url, fast.url]
+        link = slow.url + '/org/repo/resolve/main/model.safetensors'
+        chosen = []
+
+        def select():
+            cache = mf.ResolutionCache(cache_file)
+            selector = mf.MirrorSelector(mirrors, cache)
+            try:
+                chosen.append(selector.mirror_link(link).startswith(fast.url))
+            finally:
+                selector.close()
+                cache.close()
+
+        def reset():
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+
+        results = {}
+        runs = time_runs(select, config['repeat'], setup=reset)
+        results[f"mirror_selection.probe[mirrors=3,latency={latency}]"] = summarize(
+            runs, mirrors=3, latency=latency, fastest_chosen=all(chosen))
+        runs = time_runs(select, config['repeat'])
+        results[f"mirror_selection.cached[mirrors=3,latency={latency}]"] = summarize(
+            runs, mirrors=3, latency=latency, fastest_chosen=all(chosen))
+    return results
+
+def scenario_watch(work_dir, config):
+    """监视模式：模型目录中出现一个缺失的模型后，报告中对应的行被移除所需的时间"""
+    import csv
+    tree = build_model_tree(os.path.join(work_dir, 'models'), files=config['tree_files'])
+    workflow_dir = os.path.join(work_dir, 'workflows')
+    os.makedirs(workflow_dir)
+    for i in range(config['watch_workflows']):
+        generate_workflow(os.path.join(workflow_dir, f"workflow_{i}.json"), nodes=200, seed=i)
+
+    def report_names(report_file):
+        """报告中的文件名 -> 节点类型"""
+        try:
+            with open(report_file, 'r', encoding='utf-8-sig', newline='') as f:
+                return {row['文件名']: row['节点类型'] for row in csv.DictReader(f)}
+        except OSError:
+            return {}
+
+    def wait_for(predicate, timeout=10):
+        deadline = time.perf_counter() + timeout
+        while not predicate():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("报告没有更新")
+            time.sleep(0.005)
+
+    results = {}
+    for polling in (False, True):
+        mode = 'polling' if polling else 'inotify'
+        report_file = os.path.join(work_dir, f"watch_{mode}.csv")
+        stop = threading.Event()
+        with quiet():
+            thread = threading.Thread(target=mf.watch_report, args=([workflow_dir], report_file),
+                                      kwargs={'model_roots': [tree], 'polling': polling, 'stop_event': stop},
+                                      daemon=True)
+            start = time.perf_counter()
+            thread.start()
+            wait_for(lambda: report_names(report_file))
+            initial = time.perf_counter() - start
+            time.sleep(0.2)
+        names = sorted(report_names(report_file).items())
+
+        def drop_model():
+            # 放入节点类型对应的分类目录，其他目录中的同名文件不算存在
+            name, node_type = names.pop()
+            open(os.path.join(tree, mf.model_folder_for(node_type), 'set_0', name), 'wb').close()
+            wait_for(lambda: name not in report_names(report_file))
+
+        runs = time_runs(drop_model, config['repeat'])
+        stop.set()
+        thread.join(5)
+        results[f"watch.model_added[{mode},workflows={config['watch_workflows']}]"] = summarize(
+            runs, workflows=config['watch_workflows'], tree_files=config['tree_files'], initial_analysis_s=initial)
+    return results
+
+def scenario_api_server(work_dir, config):
+    """本地API服务：单个请求的延迟，以及多个客户端并发时的吞吐"""
+    tree = build_model_tree(os.path.join(work_dir, 'models'), files=config['tree_files'])
+    with open(generate_workflow(os.path.join(work_dir, 'workflow.json'), nodes=400), 'rb') as f:
+        workflow = f.read()
+    prompt = json.dumps({'prompt': {
+        str(i): {'class_type': 'LoraLoader', 'inputs': {'lora_name': f"lora_{i}.safetensors", 'strength_model': 1.0}}
+        for i in range(10)}}).encode('utf-8')
+
+    results = {}
+    with quiet():
+        server = mf.ApiServer(port=0, model_roots=[tree], refresh_interval=0).start()
+    try:
+        for name, body in (('workflow[nodes=400]', workflow), ('prompt[nodes=10]', prompt)):
+            pool = mf.HttpConnectionPool()
+            pool.request('POST', server.url + '/analyze', body=body)
+            runs = time_runs(lambda: pool.request('POST', server.url + '/analyze', body=body),
+                             config['api_requests'])
+            results[f"api_server.analyze.{name}"] = summarize(runs, requests=config['api_requests'])
+            pool.close()
+
+        clients = 8
+        def client():
+            pool = mf.HttpConnectionPool()
+            for _ in range(config['api_requests']):
+                pool.request('POST', server.url + '/analyze', body=prompt)
+            pool.close()
+
+        def concurrent():
+            threads = [threading.Thread(target=client) for _ in range(clients)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        runs = time_runs(concurrent, config['repeat'])
+        results[f"api_server.concurrent[clients={clients},requests={clients * config['api_requests']}]"] = summarize(
+            runs, clients=clients, requests=clients * config['api_requests'])
+    finally:
+        server.shutdown()
+    return results
+
+def scenario_profiling(work_dir, config):
+    """剖析开关的开销：关闭时空区间的单次耗时，以及开启前后分析同一工作流的耗时"""
+    results = {}
+    calls = 100000
+
+    def null_spans():
+        for _ in range(calls):
+            with mf.trace_span('noop'):
+                pass
+    results[f"profiling.null_span[calls={calls}]"] = summarize(time_runs(null_spans, config['repeat']), calls=calls)
+
+    tree = build_model_tree(os.path.join(work_dir, 'models'), files=config['tree_files'])
+    nodes = config['workflow_nodes'][-1]
+    workflow = generate_workflow(os.path.join(work_dir, 'workflow.json'), nodes=nodes)
+    index = mf.load_model_index([tree])
+    run = lambda: mf.find_missing_models(workflow, model_index=index)
+    results[f"profiling.off[nodes={nodes}]"] = summarize(time_runs(run, config['repeat']), nodes=nodes)
+    tracer = mf.start_profiling()
+    try:
+        runs = time_runs(run, config['repeat'])
+    finally:
+        mf.stop_profiling()
+    results[f"profiling.on[nodes={nodes}]"] = summarize(runs, nodes=nodes, events=len(tracer.events))
+    return results
+
+def scenario_create_html_view(work_dir, config):
+    results = {}
+    for rows in config['html_rows']:
+        csv_file = generate_result_csv(os.path.join(work_dir, f"results_{rows}.csv"), rows=rows)
+        for mode in ('table', 'compact'):
+            html_file = os.path.splitext(csv_file)[0] + '.html'
+            runs = time_runs(lambda: mf.create_html_view(csv_file, mode), config['repeat'])
+            results[f"create_html_view.{mode}[rows={rows}]"] = summarize(
+                runs, rows=rows, mode=mode, html_bytes=os.path.getsize(html_file))
+    return results
+
+SCENARIOS = {
+    'startup': scenario_startup,
+    'find_missing_models': scenario_find_missing_models,
+    'model_layout': scenario_model_layout,
+    'hash_identity': scenario_hash_identity,
+    'fuzzy_match': scenario_fuzzy_match,
+    'create_csv_file': scenario_create_csv_file,
+    'search_model_links': scenario_search_model_links,
+    'repo_tree': scenario_repo_tree,
+    'browser_service': scenario_browser_service,
+    'catalog': scenario_catalog,
+    'verify_links': scenario_verify_links,
+    'download_models': scenario_download_models,
+    'mirror_selection': scenario_mirror_selection,
+    'watch': scenario_watch,
+    'api_server': scenario_api_server,
+    'profiling': scenario_profiling,
+    'create_html_view': scenario_create_html_view,
+}
+
+CONFIGS = {
+    'full': {
+        'repeat': 5, 'search_repeat': 1, 'tree_files': 100000, 'workflow_nodes': [100, 5000, 50000],
+        'csv_rows': 10000, 'search_rows': 8, 'api_search_rows': 500, 'latency': 0.05, 'html_rows': [1000, 50000],
+        'startup_repeat': 20, 'startup_budget': 0.15, 'hash_files': 16, 'hash_file_mb': 64,
+        'verify_rows': 500, 'download_files': 4, 'download_file_mb': 256, 'download_stream_mb': 32,
+        'watch_workflows': 500, 'api_requests': 200, 'fuzzy_files': 100000, 'fuzzy_queries': 1000,
+        'catalog_entries': 100000, 'browser_runs': 10, 'browser_launch_delay': 1.0,
+    },
+    'quick': {
+        'repeat': 3, 'search_repeat': 1, 'tree_files': 5000, 'workflow_nodes': [100, 5000],
+        'csv_rows': 1000, 'search_rows': 3, 'api_search_rows': 100, 'latency': 0.01, 'html_rows': [1000],
+        'startup_repeat': 5, 'startup_budget': 0.15, 'hash_files': 8, 'hash_file_mb': 16,
+        'verify_rows': 200, 'download_files': 3, 'download_file_mb': 32, 'download_stream_mb': 16,
+        'watch_workflows': 100, 'api_requests': 50, 'fuzzy_files': 10000, 'fuzzy_queries': 200,
+        'catalog_entries': 10000, 'browser_runs': 5, 'browser_launch_delay': 0.5,
+    },
+}
+
+# ----- 对比 -----
+
+def compare_results(baseline, current, threshold):
+    """对比两次运行的中位数，返回回退的场景列表"""
+    regressions = []
+    print(f"{'场景':<60} {'基准(s)':>10} {'当前(s)':>10} {'比值':>7}")
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or 'median_s' not in base or 'median_s' not in result:
+            continue
+        ratio = result['median_s'] / base['median_s'] if base['median_s'] else float('inf')
+        flag = ' <-- 回退' if ratio > threshold else ''
+        print(f"{name:<60} {base['median_s']:>10.4f} {result['median_s']:>10.4f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="模型查找器性能基准")
+    parser.add_argument('-o', '--output', help="结果JSON文件")
+    parser.add_argument('--quick', action='store_true', help="使用较小的数据规模")
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), help="只运行指定场景")
+    parser.add_argument('--compare', help="与之前的结果JSON对比")
+    parser.add_argument('--threshold', type=float, default=1.25, help="中位数超过基准该倍数视为回退")
+    args = parser.parse_args(argv)
+
+    config = CONFIGS['quick' if args.quick else 'full']
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix='model_finder_bench_')
+    saved_cache_dir = mf.CACHE_DIR
+    try:
+        for name in args.scenarios or list(SCENARIOS):
+            print(f"运行场景: {name}")
+            scenario_dir = os.path.join(work_dir, name)
+            os.makedirs(scenario_dir)
+            mf.CACHE_DIR = os.path.join(scenario_dir, 'cache')
+            results.update(SCENARIOS[name](scenario_dir, config))
+    finally:
+        mf.CACHE_DIR = saved_cache_dir
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': 'quick' if args.quick else 'full',
+        },
+        'results': results,
+    }
+
+    for name, result in results.items():
+        if 'skipped' in result:
+            print(f"{name:<60} 跳过: {result['skipped']}")
+        else:
+            print(f"{name:<60} 中位数 {result['median_s']:.4f}s  最小 {result['min_s']:.4f}s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存为: {os.path.abspath(args.output)}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare_results(baseline, report, args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
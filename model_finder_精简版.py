@@ -15,128 +15,1079 @@
 import os
 import sys
 import json
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
+import importlib
+import importlib.util
+import queue
 import threading
-import webbrowser
 import csv
+import html
+import io
+import itertools
+import mmap
 import time
-from urllib.parse import urlparse, urljoin
-import pandas as pd
+import re
+import random
+import glob
+import hashlib
+import struct
+import argparse
+from collections import Counter, deque
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse, urljoin, urlencode, quote, unquote, parse_qs
 
-# 检查DrissionPage是否可用
-try:
-    from DrissionPage import ChromiumPage, ChromiumOptions
-    DRISSION_AVAILABLE = True
-except ImportError:
-    DRISSION_AVAILABLE = False
+__version__ = '1.0'
 
-# ----- 核心功能：检测缺失文件 -----
+class _LazyModule:
+    """延迟导入的模块：首次访问属性时才真正导入
 
-def find_missing_models(workflow_file):
-    """从工作流文件中提取缺失的模型文件"""
-    print(f"分析工作流文件: {workflow_file}")
-    
-    # 获取工作流文件所在目录
-    base_dir = os.path.dirname(os.path.abspath(workflow_file))
-    
-    # 加载工作流JSON
-    try:
-        with open(workflow_file, 'r', encoding='utf-8') as f:
-            workflow_json = json.load(f)
-    except Exception as e:
-        print(f"加载工作流文件时出错: {e}")
-        return []
+    pandas、tkinter等导入较慢，分析工作流和写CSV只需要标准库，
+    只有搜索和图形界面才会触发导入，命令行启动因此保持轻量。
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+pd = _LazyModule('pandas')
+tk = _LazyModule('tkinter')
+ttk = _LazyModule('tkinter.ttk')
+filedialog = _LazyModule('tkinter.filedialog')
+messagebox = _LazyModule('tkinter.messagebox')
+http_client = _LazyModule('http.client')
+webbrowser = _LazyModule('webbrowser')
+sqlite3 = _LazyModule('sqlite3')
+
+# 检查DrissionPage是否可用（只查找不导入，真正使用浏览器搜索时才导入）
+DRISSION_AVAILABLE = importlib.util.find_spec('DrissionPage') is not None
+ChromiumPage = ChromiumOptions = None
+
+# psutil可选，只用于读取常驻浏览器的内存占用
+PSUTIL_AVAILABLE = importlib.util.find_spec('psutil') is not None
+psutil = _LazyModule('psutil')
+
+def _load_drission():
+    """导入DrissionPage，返回是否可用"""
+    global ChromiumPage, ChromiumOptions, DRISSION_AVAILABLE
+    if ChromiumPage is None and DRISSION_AVAILABLE:
+        try:
+            from DrissionPage import ChromiumPage, ChromiumOptions
+        except ImportError:
+            DRISSION_AVAILABLE = False
+    return DRISSION_AVAILABLE
+
+# 支持的模型文件扩展名
+MODEL_EXTENSIONS = ('.safetensors', '.pth', '.ckpt', '.pt', '.bin', '.onnx')
+
+# 超过该大小的工作流文件自动使用流式解析
+STREAMING_THRESHOLD = 16 * 1024 * 1024
+
+# 本地缓存目录（模型库索引、搜索结果缓存等），可用环境变量指向共享目录
+CACHE_DIR = os.environ.get('MODEL_FINDER_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.model_finder')
+
+# 模型根目录环境变量，多个目录用系统路径分隔符分隔（Windows为";"，Linux为":"）
+MODEL_ROOTS_ENV = 'MODEL_FINDER_ROOTS'
+
+# ----- 性能剖析 -----
+
+class _NullSpan:
+    """未启用剖析时的空计时区间"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.add(self.name, self.cat, self.start, time.perf_counter(), self.args)
+        return False
+
+class Tracer:
+    """记录各阶段的耗时区间和计数器，导出为Chrome trace-event JSON（chrome://tracing 或 Perfetto 打开）"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self.counters = {}
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, cat, start, end, args):
+        thread = threading.current_thread()
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'pid': self.pid, 'tid': thread.ident,
+                 'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6}
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+            self.threads.setdefault(thread.ident, thread.name)
+
+    def count(self, name, n=1):
+        with self.lock:
+            value = self.counters[name] = self.counters.get(name, 0) + n
+            self.events.append({'name': name, 'ph': 'C', 'pid': self.pid, 'tid': threading.get_ident(),
+                                'ts': (time.perf_counter() - self.origin) * 1e6, 'args': {name: value}})
+
+    def summary(self):
+        """按阶段汇总：[(名称, 次数, 总耗时秒, 平均秒, 最大秒)]，按总耗时降序"""
+        stats = {}
+        with self.lock:
+            events = [e for e in self.events if e['ph'] == 'X']
+        for event in events:
+            entry = stats.setdefault(event['name'], [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += event['dur'] / 1e6
+            entry[2] = max(entry[2], event['dur'] / 1e6)
+        rows = [(name, n, total, total / n, longest) for name, (n, total, longest) in stats.items()]
+        return sorted(rows, key=lambda row: -row[2])
+
+    def print_summary(self, file=None):
+        """打印按总耗时排序的阶段汇总表和计数器"""
+        file = file or sys.stdout
+        widths = (30, 8, 12, 10, 10)
+        header = ('阶段', '次数', '总耗时(ms)', '平均(ms)', '最长(ms)')
+        print('\n' + ' '.join(_pad_cell(text, width, i == 0) for i, (text, width) in enumerate(zip(header, widths))),
+              file=file)
+        for name, n, total, mean, longest in self.summary():
+            print(f"{name:<30} {n:>8} {total * 1000:>12.1f} {mean * 1000:>10.2f} {longest * 1000:>10.1f}", file=file)
+        if self.counters:
+            print("\n计数器:", file=file)
+            for name, value in sorted(self.counters.items()):
+                print(f"  {name:<28} {value:>8}", file=file)
+
+    def write_trace(self, trace_file):
+        """写入Chrome trace-event JSON"""
+        with self.lock:
+            events = list(self.events)
+            threads = dict(self.threads)
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in threads.items()]
+        with open(trace_file, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms',
+                       'otherData': {'version': __version__, 'counters': self.counters}}, f, ensure_ascii=False)
+        return trace_file
+
+def _pad_cell(text, width, left=False):
+    """按终端显示宽度补齐（中文字符占两列）"""
+    padding = ' ' * max(0, width - sum(2 if ord(ch) > 0x2e7f else 1 for ch in text))
+    return text + padding if left else padding + text
+
+# 当前的剖析器，None表示未启用（默认）
+_tracer = None
+
+def trace_span(name, cat='stage', **args):
+    """计时区间（with语句），未启用剖析时返回共享的空对象，几乎没有开销"""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, cat, args)
+
+def trace_count(name, n=1):
+    """累加计数器（重试、缓存命中、重连等），未启用剖析时直接返回"""
+    if _tracer is not None:
+        _tracer.count(name, n)
+
+def start_profiling():
+    """启用剖析，返回Tracer"""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+def stop_profiling():
+    """停用剖析，返回已记录的Tracer（未启用时为None）"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+# ----- 模型分类目录 -----
+
+# 节点类型 -> ComfyUI的模型分类（也是下载时models目录下的子目录）
+NODE_TYPE_FOLDERS = {
+    'CheckpointLoaderSimple': 'checkpoints',
+    'CheckpointLoader': 'checkpoints',
+    'ImageOnlyCheckpointLoader': 'checkpoints',
+    'unCLIPCheckpointLoader': 'checkpoints',
+    'LoraLoader': 'loras',
+    'LoraLoaderModelOnly': 'loras',
+    'LoraLoader|pysssss': 'loras',
+    'VAELoader': 'vae',
+    'CLIPLoader': 'text_encoders',
+    'DualCLIPLoader': 'text_encoders',
+    'TripleCLIPLoader': 'text_encoders',
+    'QuadrupleCLIPLoader': 'text_encoders',
+    'UNETLoader': 'diffusion_models',
+    'ControlNetLoader': 'controlnet',
+    'DiffControlNetLoader': 'controlnet',
+    'UpscaleModelLoader': 'upscale_models',
+    'CLIPVisionLoader': 'clip_vision',
+    'StyleModelLoader': 'style_models',
+    'GLIGENLoader': 'gligen',
+    'HypernetworkLoader': 'hypernetworks',
+    'PhotoMakerLoader': 'photomaker',
+    'IPAdapterModelLoader': 'ipadapter',
+}
+
+# 模型分类 -> models目录下ComfyUI会加载的子目录（与ComfyUI的folder_paths一致，unet、clip是旧目录名），
+# 未列出的分类（如自定义节点注册的ipadapter）使用同名子目录
+MODEL_CATEGORY_DIRS = {
+    'text_encoders': ('text_encoders', 'clip'),
+    'diffusion_models': ('unet', 'diffusion_models'),
+    'controlnet': ('controlnet', 't2i_adapter'),
+}
+
+# extra_model_paths.yaml中的旧分类名
+_LEGACY_CATEGORIES = {'unet': 'diffusion_models', 'clip': 'text_encoders'}
+
+# ComfyUI额外模型路径配置：默认读取每个模型根目录上一级（ComfyUI目录）中的该文件，
+# 也可以用环境变量指定，多个文件用系统路径分隔符分隔
+EXTRA_MODEL_PATHS_FILE = 'extra_model_paths.yaml'
+EXTRA_MODEL_PATHS_ENV = 'MODEL_FINDER_EXTRA_PATHS'
+
+def model_folder_for(node_type):
+    """根据节点类型返回模型子目录，批量报告中的多个节点类型用"; "分隔，取第一个能识别的"""
+    for name in _cell_text(node_type).split(';'):
+        folder = NODE_TYPE_FOLDERS.get(name.strip())
+        if folder:
+            return folder
+    return ''
+
+def _yaml_scalar(value):
+    """YAML标量：去掉引号和行尾注释"""
+    if value[:1] in ('"', "'"):
+        end = value.find(value[0], 1)
+        text = value[:end + 1] if end > 0 else value + value[0]
+        if text[0] == '"':
+            try:
+                return json.loads(text)
+            except ValueError:
+                pass
+        return text[1:-1]
+    return re.split(r'\s+#', value, 1)[0].strip()
+
+def parse_extra_model_paths(text):
+    """解析extra_model_paths.yaml，返回 {配置名: {键: 字符串}}
+
+    只支持该文件用到的YAML子集（两层映射、引号字符串、"|"多行文本和注释），分析时不依赖PyYAML。
+    """
+    config = {}
+    section = None
+    block_key = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        indent = len(line) - len(line.lstrip())
+        
+        # "|"多行文本：缩进比键更深的行都属于该值
+        if block_key is not None:
+            if not stripped or indent > block_indent:
+                if stripped and not stripped.startswith('#'):
+                    block_lines.append(stripped)
+                continue
+            section[block_key] = '\n'.join(block_lines)
+            block_key = None
+        
+        if not stripped or stripped.startswith('#'):
+            continue
+        key, sep, value = stripped.partition(':')
+        if not sep:
+            continue
+        key = _yaml_scalar(key.strip())
+        value = value.strip()
+        if indent == 0:
+            section = config.setdefault(key, {})
+        elif section is not None:
+            if value.split('#', 1)[0].strip() in ('|', '|-', '|+', '>', '>-'):
+                block_key, block_indent, block_lines = key, indent, []
+            else:
+                section[key] = _yaml_scalar(value)
+    if block_key is not None:
+        section[block_key] = '\n'.join(block_lines)
+    return config
+
+def load_extra_model_paths(yaml_file):
+    """读取extra_model_paths.yaml，返回 [(模型分类, 目录)]，路径规则与ComfyUI相同：
+    相对路径基于base_path，没有base_path时基于配置文件所在目录
+    """
+    with open(yaml_file, 'r', encoding='utf-8') as f:
+        config = parse_extra_model_paths(f.read())
     
-    # 查找文件引用
-    file_references = []
-    model_extensions = ('.safetensors', '.pth', '.ckpt', '.pt', '.bin', '.onnx')
+    yaml_dir = os.path.dirname(os.path.abspath(yaml_file))
+    paths = []
+    for conf in config.values():
+        conf = dict(conf)
+        base_path = conf.pop('base_path', None)
+        conf.pop('is_default', None)
+        if base_path:
+            base_path = os.path.expandvars(os.path.expanduser(base_path))
+            if not os.path.isabs(base_path):
+                base_path = os.path.join(yaml_dir, base_path)
+        for category, value in conf.items():
+            for directory in value.split('\n'):
+                directory = directory.strip()
+                if not directory:
+                    continue
+                directory = os.path.join(base_path or yaml_dir, os.path.expandvars(os.path.expanduser(directory)))
+                paths.append((_LEGACY_CATEGORIES.get(category, category), os.path.abspath(directory)))
+    return paths
+
+def find_extra_model_paths(model_roots):
+    """查找extra_model_paths.yaml：优先使用环境变量，否则查找每个模型根目录的上一级目录"""
+    configured = os.environ.get(EXTRA_MODEL_PATHS_ENV)
+    if configured is not None:
+        return [os.path.abspath(p.strip()) for p in configured.split(os.pathsep) if p.strip()]
     
-    # 处理所有节点
-    for node in workflow_json.get('nodes', []):
-        node_id = node.get('id')
-        node_type = node.get('type', '')
-        widgets_values = node.get('widgets_values', [])
+    files = []
+    for root in model_roots:
+        path = os.path.join(os.path.dirname(root), EXTRA_MODEL_PATHS_FILE)
+        if path not in files and os.path.isfile(path):
+            files.append(path)
+    return files
+
+class ModelLayout:
+    """模型分类 -> ComfyUI会从中加载该类模型的所有目录
+
+    来源：每个模型根目录（ComfyUI的models目录）下的分类子目录，以及extra_model_paths.yaml中配置的目录。
+    没有任何分类子目录的模型根目录（所有模型放在一起）不参与按分类查找。
+    """
+
+    def __init__(self, model_roots, extra_paths_files=None):
+        self.model_roots = list(model_roots)
+        self.extra_files = find_extra_model_paths(self.model_roots) if extra_paths_files is None \
+            else list(extra_paths_files)
+        self.extra = {}    # 分类 -> extra_model_paths.yaml中的目录
+        for yaml_file in self.extra_files:
+            try:
+                for category, directory in load_extra_model_paths(yaml_file):
+                    directories = self.extra.setdefault(category, [])
+                    if directory not in directories:
+                        directories.append(directory)
+            except (OSError, ValueError) as e:
+                print(f"读取{yaml_file}时出错: {e}")
         
-        # 跳过空的widgets_values
-        if not widgets_values:
-            continue
+        # 只有包含分类子目录的根目录才按ComfyUI的目录结构查找
+        known = set(NODE_TYPE_FOLDERS.values()) | {d for dirs in MODEL_CATEGORY_DIRS.values() for d in dirs}
+        self.comfy_roots = [root for root in self.model_roots
+                            if any(os.path.isdir(os.path.join(root, name)) for name in known)]
+        self._dirs = {}
+
+    def category_dirs(self, category):
+        """模型分类对应的所有加载目录"""
+        directories = self._dirs.get(category)
+        if directories is None:
+            directories = [os.path.join(root, name) for root in self.comfy_roots
+                           for name in MODEL_CATEGORY_DIRS.get(category, (category,))]
+            directories += [d for d in self.extra.get(category, []) if d not in directories]
+            self._dirs[category] = directories
+        return directories
+
+    def dirs_for(self, node_type):
+        """节点类型对应的所有加载目录，无法识别的节点类型或该分类没有任何目录时返回None"""
+        category = NODE_TYPE_FOLDERS.get(node_type)
+        if not category:
+            return None
+        return self.category_dirs(category) or None
+
+    def extra_roots(self):
+        """extra_model_paths.yaml中不在模型根目录下的目录，需要加入模型库索引"""
+        roots = []
+        for directories in self.extra.values():
+            for directory in directories:
+                if directory not in roots and not _is_under(directory, self.model_roots):
+                    roots.append(directory)
+        return roots
+
+# ----- 模型库索引 -----
+
+def get_model_roots(model_roots=None):
+    """获取模型根目录列表，未指定时读取环境变量"""
+    if model_roots is None:
+        model_roots = os.environ.get(MODEL_ROOTS_ENV, '')
+    if isinstance(model_roots, str):
+        model_roots = model_roots.split(os.pathsep)
+    return [os.path.abspath(r.strip()) for r in model_roots if r and r.strip()]
+
+class ModelIndex:
+    """模型库索引：文件名 -> 路径列表
+
+    首次使用时并行扫描所有模型根目录，之后根据目录mtime增量刷新，
+    只重新列出发生变化的目录。索引保存在磁盘上供下次分析复用。
+    extra_model_paths.yaml中配置的目录（见ModelLayout）也加入扫描。
+    """
+
+    INDEX_VERSION = 1
+
+    def __init__(self, roots, index_file=None, max_workers=16, extra_paths_files=None):
+        self.model_roots = get_model_roots(roots)
+        self.layout = ModelLayout(self.model_roots, extra_paths_files)
+        self.roots = self.model_roots + self.layout.extra_roots()
+        if index_file is None:
+            key = hashlib.sha1('\n'.join(self.roots).encode('utf-8')).hexdigest()[:12]
+            index_file = os.path.join(CACHE_DIR, f"model_index_{key}.json")
+        self.index_file = index_file
+        self.max_workers = max_workers
+        # 目录 -> {'mtime': 目录mtime, 'files': [模型文件名], 'subdirs': [子目录名]}
+        self.dirs = {}
+        self.by_name = {}
+        self.stats = {'scanned': 0, 'reused': 0, 'changed': False}
+        self._count = 0
+        self._fuzzy = None
+
+    def load(self):
+        """从磁盘加载索引，根目录不一致时忽略"""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.INDEX_VERSION and data.get('roots') == self.roots:
+                self.dirs = data.get('dirs', {})
+                self._rebuild_names()
+        except (OSError, ValueError):
+            self.dirs = {}
+        return self
+
+    def save(self):
+        """原子地写入索引文件"""
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_file = self.index_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.INDEX_VERSION, 'roots': self.roots, 'dirs': self.dirs},
+                          f, ensure_ascii=False)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"保存模型库索引时出错: {e}")
+        return self
+
+    def refresh(self):
+        """按层并行刷新索引，mtime未变化的目录直接复用缓存"""
+        old_dirs = self.dirs
+        new_dirs = {}
+        seen = set()
+        self.stats = {'scanned': 0, 'reused': 0, 'changed': False}
+        pending = list(self.roots)
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending:
+                results = executor.map(lambda d: self._scan_dir(d, old_dirs.get(d)), pending)
+                pending = []
+                for directory, key, entry, reused in results:
+                    # 跳过无法访问的目录以及符号链接造成的重复目录
+                    if entry is None or key in seen:
+                        continue
+                    seen.add(key)
+                    new_dirs[directory] = entry
+                    self.stats['reused' if reused else 'scanned'] += 1
+                    pending.extend(os.path.join(directory, name) for name in entry['subdirs'])
+        
+        # 有目录重新列出（mtime变化）或目录增减时，磁盘上的索引需要更新
+        self.stats['changed'] = bool(self.stats['scanned']) or new_dirs.keys() != old_dirs.keys()
+        self.dirs = new_dirs
+        self._rebuild_names()
+        return self
+
+    def _scan_dir(self, directory, cached):
+        """检查单个目录，mtime未变化时返回缓存条目"""
+        try:
+            st = os.stat(directory)
+        except OSError:
+            return directory, None, None, False
+        key = (st.st_dev, st.st_ino)
+        if cached and cached.get('mtime') == st.st_mtime_ns:
+            return directory, key, cached, True
         
-        # 检查widgets_values中的每个值
-        for value in widgets_values:
-            if not isinstance(value, str):
+        files, subdirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            subdirs.append(entry.name)
+                        elif entry.name.lower().endswith(MODEL_EXTENSIONS):
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return directory, None, None, False
+        return directory, key, {'mtime': st.st_mtime_ns, 'files': files, 'subdirs': subdirs}, False
+
+    def update_dirs(self, directories):
+        """只重新列出指定的目录（监视模式收到变化通知时使用），返回有增减的规范化文件名集合"""
+        changed = set()
+        pending = [d for d in directories if _is_under(d, self.roots)]
+        while pending:
+            directory = pending.pop()
+            old = self.dirs.get(directory, {'files': [], 'subdirs': []})
+            _, _, entry, _ = self._scan_dir(directory, None)
+            if entry is None:
+                changed |= self._remove_tree(directory)
                 continue
-                
-            # 对值进行预处理和初步检查
-            value = value.strip()
             
-            # 跳过空字符串
-            if not value:
+            self.dirs[directory] = entry
+            old_files, new_files = set(old['files']), set(entry['files'])
+            for name in old_files - new_files:
+                changed.add(self._remove_path(os.path.join(directory, name)))
+            for name in new_files - old_files:
+                changed.add(self._add_path(os.path.join(directory, name)))
+            
+            # 新的子目录完整扫描，消失的子目录连同下级一起移除
+            for name in set(entry['subdirs']) - set(old['subdirs']):
+                pending.append(os.path.join(directory, name))
+            for name in set(old['subdirs']) - set(entry['subdirs']):
+                changed |= self._remove_tree(os.path.join(directory, name))
+        return changed
+
+    def _remove_tree(self, directory):
+        """从索引中移除目录及其所有子目录，返回被移除的规范化文件名"""
+        removed = set()
+        prefix = directory.rstrip(os.sep) + os.sep
+        for path in [d for d in self.dirs if d == directory or d.startswith(prefix)]:
+            for name in self.dirs.pop(path)['files']:
+                removed.add(self._remove_path(os.path.join(path, name)))
+        return removed
+
+    def _add_path(self, path):
+        """加入一个文件，返回规范化文件名；新出现的文件名同时加入近似匹配索引"""
+        name = os.path.basename(path)
+        key = os.path.normcase(name)
+        paths = self.by_name.get(key)
+        if paths is None:
+            paths = self.by_name[key] = []
+            if self._fuzzy is not None:
+                self._fuzzy.add(name)
+        paths.append(path)
+        self._count += 1
+        return key
+
+    def _remove_path(self, path):
+        """移除一个文件，返回规范化文件名；文件名没有其他路径时同时从近似匹配索引中移除"""
+        key = os.path.normcase(os.path.basename(path))
+        paths = self.by_name.get(key)
+        if paths is None:
+            return key
+        if path in paths:
+            paths.remove(path)
+            self._count -= 1
+        if not paths:
+            del self.by_name[key]
+            if self._fuzzy is not None:
+                self._fuzzy.remove(key)
+        return key
+
+    def _rebuild_names(self):
+        """根据目录条目重建文件名映射，已构建的近似匹配索引只更新增减的文件名"""
+        by_name = {}
+        count = 0
+        for directory, entry in self.dirs.items():
+            for name in entry['files']:
+                by_name.setdefault(os.path.normcase(name), []).append(os.path.join(directory, name))
+            count += len(entry['files'])
+        if self._fuzzy is not None:
+            for key in self.by_name.keys() - by_name.keys():
+                self._fuzzy.remove(key)
+            for key in by_name.keys() - self.by_name.keys():
+                self._fuzzy.add(os.path.basename(by_name[key][0]))
+        self.by_name = by_name
+        self._count = count
+
+    def fuzzy_index(self):
+        """按需构建文件名的近似匹配索引，之后随文件增减增量更新"""
+        if self._fuzzy is None:
+            with trace_span('fuzzy_index_build', files=len(self.by_name)):
+                self._fuzzy = FuzzyIndex(os.path.basename(paths[0]) for paths in self.by_name.values() if paths)
+        return self._fuzzy
+
+    def lookup(self, file_name):
+        """返回与文件名匹配的所有本地路径"""
+        return self.by_name.get(os.path.normcase(file_name), [])
+
+    def lookup_for(self, file_name, node_type):
+        """只返回ComfyUI加载该节点类型的模型时会查找的目录中的文件，无法按节点类型确定目录时返回None"""
+        directories = self.layout.dirs_for(node_type)
+        if directories is None:
+            return None
+        return [path for path in self.lookup(file_name) if _is_under(path, directories)]
+
+    def __contains__(self, file_name):
+        return os.path.normcase(file_name) in self.by_name
+
+    def __len__(self):
+        return self._count
+
+def load_model_index(model_roots=None, index_file=None):
+    """加载并增量刷新模型库索引，没有配置模型根目录时返回None"""
+    roots = get_model_roots(model_roots)
+    if not roots:
+        return None
+    
+    start_time = time.time()
+    with trace_span('model_index', roots=len(roots)):
+        index = ModelIndex(roots, index_file=index_file).load().refresh()
+        # 没有变化时不重写索引文件
+        if index.stats['changed']:
+            index.save()
+    trace_count('index_dirs_scanned', index.stats['scanned'])
+    trace_count('index_dirs_reused', index.stats['reused'])
+    elapsed = time.time() - start_time
+    print(f"模型库索引: {len(index)} 个模型文件, 扫描 {index.stats['scanned']} 个目录, "
+          f"复用 {index.stats['reused']} 个目录 ({elapsed:.2f}秒)")
+    if index.layout.extra_files:
+        print(f"额外模型路径: {', '.join(index.layout.extra_files)}"
+              f"（{sum(len(d) for d in index.layout.extra.values())} 个目录）")
+    return index
+
+def _list_model_names(directory):
+    """一次性列出目录下的文件名，用于替代逐个os.path.exists检查"""
+    names = set()
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                names.add(os.path.normcase(entry.name))
+    except OSError:
+        pass
+    return names
+
+# ----- 流式工作流解析 -----
+
+# 流式解析时保留的最大字符串长度，超出的字符串（如base64图片）直接跳过
+STREAM_STRING_LIMIT = 64 * 1024
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCT_SPECIAL = re.compile(r'["{}\[\]]')
+_SCALAR_END = re.compile(r'[\s,\]}]')
+
+class _JsonStream:
+    """增量JSON扫描器：按块读取文件，只实例化调用方需要的值"""
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self):
+        """丢弃已消费的内容并读取下一块，文件结束时返回False"""
+        chunk = self.f.read(self.CHUNK_SIZE)
+        if not chunk:
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            buf = self.buf
+            pos = self.pos
+            while pos < len(buf) and buf[pos] in ' \t\r\n':
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise ValueError(f"JSON格式错误: 位置附近应为'{ch}'")
+        self.pos += 1
+
+    def read_string(self, limit=STREAM_STRING_LIMIT):
+        """读取字符串，超过limit时跳过内容并返回None"""
+        self.expect('"')
+        return self._scan_string(limit)
+
+    def _scan_string(self, limit):
+        """扫描到字符串结束引号；limit为None时只跳过不保留"""
+        keep = limit is not None
+        parts = []
+        size = 0
+        while True:
+            m = _STRING_SPECIAL.search(self.buf, self.pos)
+            end = m.start() if m else len(self.buf)
+            if keep:
+                parts.append(self.buf[self.pos:end])
+                size += end - self.pos
+                if size > limit:
+                    keep = False
+                    parts = []
+            
+            if m is None:
+                self.pos = end
+                if not self._fill():
+                    raise ValueError("JSON格式错误: 字符串未结束")
                 continue
             
-            # 跳过包含换行符的字符串(真正的文件名不会有换行)
-            if '\n' in value or '\r' in value:
+            if self.buf[end] == '"':
+                self.pos = end + 1
+                break
+            
+            # 反斜杠转义，确保转义字符已读入缓冲区
+            self.pos = end
+            while self.pos + 1 >= len(self.buf):
+                if not self._fill():
+                    raise ValueError("JSON格式错误: 字符串未结束")
+            if keep:
+                parts.append(self.buf[self.pos:self.pos + 2])
+                size += 2
+            self.pos += 2
+        
+        if not keep:
+            return None
+        raw = ''.join(parts)
+        return json.loads('"' + raw + '"') if '\\' in raw else raw
+
+    def read_scalar(self):
+        """读取数字、true、false或null"""
+        self.peek()
+        while True:
+            m = _SCALAR_END.search(self.buf, self.pos)
+            if m or not self._fill():
+                break
+        end = m.start() if m else len(self.buf)
+        token = self.buf[self.pos:end]
+        self.pos = end
+        return json.loads(token)
+
+    def read_value(self, limit=STREAM_STRING_LIMIT):
+        """读取字符串或标量，对象和数组跳过并返回None"""
+        ch = self.peek()
+        if ch == '"':
+            return self.read_string(limit)
+        if ch in '{[':
+            self.skip_value()
+            return None
+        return self.read_scalar()
+
+    def skip_value(self):
+        """跳过任意值，不实例化其中的内容"""
+        ch = self.peek()
+        if ch == '"':
+            self.pos += 1
+            self._scan_string(None)
+            return
+        if ch not in '{[':
+            self.read_scalar()
+            return
+        
+        depth = 0
+        while True:
+            m = _STRUCT_SPECIAL.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("JSON格式错误: 对象或数组未结束")
+                continue
+            self.pos = m.end()
+            c = m.group()
+            if c == '"':
+                self._scan_string(None)
+            elif c in '{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def iter_object(self):
+        """遍历对象的键，调用方需要在每次迭代中消费对应的值"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(':')
+            yield key
+            ch = self.peek()
+            self.pos += 1
+            if ch == '}':
+                return
+            if ch != ',':
+                raise ValueError("JSON格式错误: 对象成员之间缺少','")
+
+    def iter_array(self):
+        """遍历数组元素，调用方需要在每次迭代中消费对应的元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            ch = self.peek()
+            self.pos += 1
+            if ch == ']':
+                return
+            if ch != ',':
+                raise ValueError("JSON格式错误: 数组元素之间缺少','")
+
+def iter_workflow_nodes(f):
+    """流式遍历工作流的节点，逐个产生 (id, type, widgets_values中的字符串)"""
+    stream = _JsonStream(f)
+    for key in stream.iter_object():
+        if key != 'nodes' or stream.peek() != '[':
+            stream.skip_value()
+            continue
+        
+        for _ in stream.iter_array():
+            if stream.peek() != '{':
+                stream.skip_value()
                 continue
             
-            # 简单检查 - 只检查是否有模型文件扩展名
-            if any(value.lower().endswith(ext) for ext in model_extensions):
-                # 提取文件名（去掉路径）
-                if '\\' in value or '/' in value:
-                    value = os.path.basename(value.replace('\\', '/'))
-                
-                # 额外检查 - 确保是单个文件名而不是多行文本
-                if len(value.split()) > 3:  # 文件名通常不会超过3个单词
-                    continue
-                    
-                # 确保文件名有扩展名
-                name, ext = os.path.splitext(value)
-                if not ext or ext.lower() not in model_extensions:
-                    continue
+            node_id, node_type, values = None, '', []
+            for node_key in stream.iter_object():
+                if node_key == 'id':
+                    node_id = stream.read_value()
+                elif node_key == 'type':
+                    node_type = stream.read_value()
+                elif node_key == 'widgets_values' and stream.peek() == '[':
+                    for _ in stream.iter_array():
+                        value = stream.read_value()
+                        if isinstance(value, str):
+                            values.append(value)
+                elif node_key == 'widgets_values' and stream.peek() == '{':
+                    # 字典形式的widgets_values，与json.load后遍历字典一样只检查键
+                    for widget_key in stream.iter_object():
+                        values.append(widget_key)
+                        stream.skip_value()
+                else:
+                    stream.skip_value()
+            yield node_id, node_type, values
+
+# ----- 核心功能：检测缺失文件 -----
+
+def _extract_node_references(node_id, node_type, widgets_values, file_references):
+    """检查单个节点的widgets_values，将模型文件引用追加到file_references"""
+    # 跳过空的widgets_values
+    if not widgets_values:
+        return
+    
+    # 检查widgets_values中的每个值
+    for value in widgets_values:
+        if not isinstance(value, str):
+            continue
+            
+        # 对值进行预处理和初步检查
+        value = value.strip()
+        
+        # 跳过空字符串
+        if not value:
+            continue
+        
+        # 跳过包含换行符的字符串(真正的文件名不会有换行)
+        if '\n' in value or '\r' in value:
+            continue
+        
+        # 简单检查 - 只检查是否有模型文件扩展名
+        if any(value.lower().endswith(ext) for ext in MODEL_EXTENSIONS):
+            # 提取文件名（去掉路径）
+            if '\\' in value or '/' in value:
+                value = os.path.basename(value.replace('\\', '/'))
+            
+            # 额外检查 - 确保是单个文件名而不是多行文本
+            if len(value.split()) > 3:  # 文件名通常不会超过3个单词
+                continue
                 
-                file_references.append({
-                    'node_id': node_id,
-                    'node_type': node_type,
-                    'file_path': value
-                })
-    
-    if not file_references:
-        print("工作流中未找到文件引用。")
-        return []
-    
-    print(f"在工作流中找到 {len(file_references)} 个模型文件引用。")
-    
-    # 检查哪些文件缺失
-    missing_files = []
-    for ref in file_references:
-        file_path = ref['file_path']
-        
-        # 处理不同的路径格式
-        paths_to_check = [file_path, os.path.join(base_dir, file_path)]
-        
-        # 检查文件是否存在于任何可能的路径
-        file_exists = any(os.path.exists(p) for p in paths_to_check)
-        
-        if not file_exists:
-            missing_files.append({
-                'node_id': ref['node_id'],
-                'node_type': ref['node_type'],
-                'file_path': file_path
+            # 确保文件名有扩展名
+            name, ext = os.path.splitext(value)
+            if not ext or ext.lower() not in MODEL_EXTENSIONS:
+                continue
+            
+            file_references.append({
+                'node_id': node_id,
+                'node_type': node_type,
+                'file_path': value
             })
+
+def extract_model_references(workflow_json):
+    """从工作流JSON中提取模型文件引用"""
+    file_references = []
     
-    if not missing_files:
-        print("\n所有引用的文件都存在！")
-        return []
-    
-    # 统计缺失文件
-    print(f"\n缺失模型文件总数: {len(missing_files)}")
+    # 处理所有节点
+    for node in workflow_json.get('nodes', []):
+        _extract_node_references(node.get('id'), node.get('type', ''),
+                                 node.get('widgets_values', []), file_references)
     
-    # 打印缺失文件列表
-    print("\n缺失文件列表:")
-    print("-" * 50)
-    for i, missing in enumerate(missing_files, 1):
-        print(f"{i}. {missing['file_path']}")
+    return file_references
+
+def extract_prompt_references(prompt):
+    """从API格式的工作流（节点ID -> {class_type, inputs}，即ComfyUI /prompt的请求体）中提取模型文件引用"""
+    file_references = []
+    for node_id, node in prompt.items():
+        if isinstance(node, dict):
+            _extract_node_references(node_id, node.get('class_type', ''),
+                                     list((node.get('inputs') or {}).values()), file_references)
+    return file_references
+
+def extract_model_references_streaming(workflow_file):
+    """流式解析工作流文件并提取模型文件引用，结果与extract_model_references一致
+
+    只实例化节点的id、type和widgets_values中的字符串，
+    base64图片、提示词历史、组节点定义等大块内容直接跳过，峰值内存与文件大小无关。
+    """
+    file_references = []
+    with open(workflow_file, 'r', encoding='utf-8') as f:
+        for node_id, node_type, widgets_values in iter_workflow_nodes(f):
+            _extract_node_references(node_id, node_type, widgets_values, file_references)
+    return file_references
+
+def load_workflow_references(workflow_file, streaming=None):
+    """加载工作流文件并提取模型文件引用，出错时抛出异常
+
+    streaming: True使用流式解析，None时文件超过STREAMING_THRESHOLD自动启用
+    """
+    if streaming is None:
+        streaming = os.path.getsize(workflow_file) >= STREAMING_THRESHOLD
+    if streaming:
+        with trace_span('stream_extract'):
+            return extract_model_references_streaming(workflow_file)
     
-    return missing_files
+    with trace_span('json_parse'):
+        with open(workflow_file, 'r', encoding='utf-8') as f:
+            workflow_json = json.load(f)
+    with trace_span('extract_references'):
+        return extract_model_references(workflow_json)
+
+def _local_model_names(base_dir, dir_cache):
+    """工作流所在目录和当前目录中的文件名，每个目录只列出一次"""
+    for directory in (base_dir, os.getcwd()):
+        if directory not in dir_cache:
+            dir_cache[directory] = _list_model_names(directory)
+    return dir_cache[base_dir] | dir_cache[os.getcwd()]
+
+def check_missing_references(file_references, base_dir, model_index=None, dir_cache=None):
+    """检查哪些引用的文件缺失
+
+    能识别节点类型时只在ComfyUI会加载该类模型的目录中查找（见ModelLayout），
+    其他目录中的同名文件不算存在，缺失条目的'misplaced'列出这些文件；
+    无法识别的节点类型在工作流所在目录、当前目录和整个模型库中查找，两个目录只在需要时各列出一次。
+    dir_cache: 目录 -> 文件名集合，批量分析时在同一进程内复用目录列表
+    """
+    with trace_span('check_missing', references=len(file_references)):
+        if dir_cache is None:
+            dir_cache = {}
+        local_names = None
+        
+        missing_files = []
+        for ref in file_references:
+            file_path = ref['file_path']
+            
+            found = model_index.lookup_for(file_path, ref['node_type']) if model_index is not None else None
+            if found is not None:
+                file_exists = bool(found)
+            else:
+                # 检查文件是否存在于工作流目录、当前目录或模型库中
+                if local_names is None:
+                    local_names = _local_model_names(base_dir, dir_cache)
+                file_exists = os.path.normcase(file_path) in local_names
+                if not file_exists and model_index is not None:
+                    file_exists = file_path in model_index
+            
+            if not file_exists:
+                missing = {
+                    'node_id': ref['node_id'],
+                    'node_type': ref['node_type'],
+                    'file_path': file_path
+                }
+                misplaced = model_index.lookup(file_path) if found is not None else None
+                if misplaced:
+                    missing['misplaced'] = misplaced
+                missing_files.append(missing)
+        
+        return missing_files
+
+def find_missing_models(workflow_file, model_roots=None, model_index=None, streaming=None, hash_identity=False,
+                        near_matches=True):
+    """从工作流文件中提取缺失的模型文件
+
+    model_roots: 模型根目录列表（默认读取环境变量MODEL_FINDER_ROOTS）
+    model_index: 已加载的ModelIndex，批量分析时复用
+    streaming: 是否流式解析工作流，默认按文件大小自动选择
+    hash_identity: 按内容哈希识别以其他文件名存在的模型，命中的条目带有'present_as'
+    near_matches: 查找本地文件名近似的模型（大小写、变体后缀不同等），命中的条目带有'near_matches'
+    """
+    with trace_span('find_missing_models', workflow=os.path.basename(workflow_file)):
+        print(f"分析工作流文件: {workflow_file}")
+        
+        # 获取工作流文件所在目录
+        base_dir = os.path.dirname(os.path.abspath(workflow_file))
+        
+        # 加载工作流JSON并查找文件引用
+        try:
+            file_references = load_workflow_references(workflow_file, streaming)
+        except Exception as e:
+            print(f"加载工作流文件时出错: {e}")
+            return []
+        
+        if not file_references:
+            print("工作流中未找到文件引用。")
+            return []
+        
+        print(f"在工作流中找到 {len(file_references)} 个模型文件引用。")
+        
+        # 加载模型库索引
+        if model_index is None:
+            model_index = load_model_index(model_roots)
+        
+        # 检查哪些文件缺失
+        missing_files = check_missing_references(file_references, base_dir, model_index)
+        
+        if not missing_files:
+            print("\n所有引用的文件都存在！")
+            return []
+        
+        # 按内容哈希识别重命名过的模型
+        matched = 0
+        if hash_identity:
+            with trace_span('hash_identity'):
+                matched = identify_by_hash(missing_files, model_index)
+        
+        # 查找文件名近似的本地模型
+        if near_matches:
+            with trace_span('near_matches'):
+                find_near_matches(missing_files, model_index)
+        
+        # 统计缺失文件
+        print(f"\n缺失模型文件总数: {len(missing_files) - matched}")
+        if matched:
+            print(f"以其他文件名存在于本地: {matched}")
+        
+        # 打印缺失文件列表
+        print("\n缺失文件列表:")
+        print("-" * 50)
+        for i, missing in enumerate(missing_files, 1):
+            if missing.get('present_as'):
+                print(f"{i}. {missing['file_path']} （{LOCAL_MATCH_STATUS}: {missing['present_as']}）")
+            elif missing.get('misplaced'):
+                print(f"{i}. {missing['file_path']} （位于ComfyUI不会加载的目录: {'; '.join(missing['misplaced'])}）")
+            elif missing.get('near_matches'):
+                print(f"{i}. {missing['file_path']} （{FUZZY_MATCH_COLUMN}: {format_near_matches(missing['near_matches'])}）")
+            else:
+                print(f"{i}. {missing['file_path']}")
+        
+        return missing_files
 
 def create_csv_file(missing_files, output_file):
     """创建CSV文件保存缺失文件列表"""
@@ -148,19 +1099,34 @@ def create_csv_file(missing_files, output_file):
         # 获取完整路径
         abs_csv_path = os.path.abspath(csv_file)
         
+        # 按哈希识别出本地文件时，增加本地文件列并标记状态，搜索时跳过这些行
+        has_local = any(missing.get('present_as') for missing in missing_files)
+        has_near = any(missing.get('near_matches') for missing in missing_files)
+        
         # 写入CSV文件
-        with open(csv_file, 'w', newline='', encoding='utf-8-sig') as f:
+        with trace_span('create_csv_file', rows=len(missing_files)), \
+                open(csv_file, 'w', newline='', encoding='utf-8-sig') as f:
             fieldnames = ['序号', '节点ID', '节点类型', '文件名']
+            if has_local:
+                fieldnames += ['搜索状态', '本地文件']
+            if has_near:
+                fieldnames.append(FUZZY_MATCH_COLUMN)
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             
             for i, missing in enumerate(missing_files, 1):
-                writer.writerow({
+                row = {
                     '序号': i,
                     '节点ID': missing['node_id'],
                     '节点类型': missing['node_type'],
                     '文件名': missing['file_path']
-                })
+                }
+                if missing.get('present_as'):
+                    row['搜索状态'] = LOCAL_MATCH_STATUS
+                    row['本地文件'] = missing['present_as']
+                if missing.get('near_matches'):
+                    row[FUZZY_MATCH_COLUMN] = format_near_matches(missing['near_matches'])
+                writer.writerow(row)
         
         print(f"\nCSV文件已保存为: {abs_csv_path}")
         return csv_file
@@ -168,365 +1134,4279 @@ def create_csv_file(missing_files, output_file):
         print(f"\n创建CSV文件时出错: {e}")
         return None
 
-# ----- 核心功能：生成下载链接 -----
+# ----- 搜索结果缓存 -----
+
+# 缓存有效期（秒）：找到链接的结果保留30天，"未找到"的结果只保留1天
+CACHE_TTL = 30 * 24 * 3600
+NEGATIVE_CACHE_TTL = 24 * 3600
+
+# 缓存最多保留的条目数，超出时淘汰最久未使用的条目
+CACHE_MAX_ENTRIES = 50000
+
+# 链接验证结果的有效期（秒）：有效链接保留1天，无效链接只保留1小时
+LINK_CHECK_TTL = 24 * 3600
+LINK_CHECK_FAILED_TTL = 3600
+
+# 镜像测速结果的有效期（秒）：可用的镜像1小时，不可用的5分钟后重新测速
+MIRROR_PROBE_TTL = 3600
+MIRROR_PROBE_FAILED_TTL = 300
+
+# 仓库文件列表的有效期（秒）
+REPO_TREE_TTL = 24 * 3600
+
+def normalize_model_name(file_name):
+    """规范化模型文件名：去掉路径、合并空白、统一小写"""
+    name = str(file_name).strip().replace('\\', '/').rsplit('/', 1)[-1]
+    return ' '.join(name.split()).lower()
+
+class ResolutionCache:
+    """模型文件名 -> 下载链接的SQLite缓存，支持TTL、淘汰和负缓存
+
+    多次运行、多个CSV共享同一份缓存，search_model_links在启动浏览器之前先查询缓存。
+    """
+
+    def __init__(self, db_file=None, ttl=CACHE_TTL, negative_ttl=NEGATIVE_CACHE_TTL,
+                 max_entries=CACHE_MAX_ENTRIES):
+        self.db_file = db_file or os.path.join(CACHE_DIR, 'resolution_cache.sqlite3')
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS resolutions ("
+                "name TEXT PRIMARY KEY, file_name TEXT, download_link TEXT, mirror_link TEXT, "
+                "source TEXT, found INTEGER, created_at REAL, accessed_at REAL)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS link_checks ("
+                "url TEXT PRIMARY KEY, status INTEGER, content_length INTEGER, etag TEXT, error TEXT, "
+                "checked_at REAL)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS mirror_probes ("
+                "mirror TEXT PRIMARY KEY, ok INTEGER, ttfb REAL, throughput REAL, error TEXT, probed_at REAL)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS repo_trees ("
+                "repo TEXT, revision TEXT, files TEXT, fetched_at REAL, PRIMARY KEY (repo, revision))")
+
+    def get(self, file_name):
+        """查询缓存，过期或不存在时返回None"""
+        name = normalize_model_name(file_name)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT file_name, download_link, mirror_link, source, found, created_at "
+                "FROM resolutions WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            
+            ttl = self.ttl if row[4] else self.negative_ttl
+            if now - row[5] > ttl:
+                return None
+            
+            with self.conn:
+                self.conn.execute("UPDATE resolutions SET accessed_at = ? WHERE name = ?", (now, name))
+        
+        return {
+            'file_name': row[0],
+            'download_link': row[1] or '',
+            'mirror_link': row[2] or '',
+            'source': row[3] or '',
+            'found': bool(row[4]),
+            'timestamp': row[5],
+        }
+
+    def put(self, file_name, download_link='', mirror_link='', source='', found=True):
+        """写入一条结果，found=False表示负缓存（未找到）"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO resolutions "
+                "(name, file_name, download_link, mirror_link, source, found, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_model_name(file_name), str(file_name), download_link, mirror_link,
+                 source, 1 if found else 0, now, now))
+
+    def get_link(self, url):
+        """查询链接验证结果，过期或不存在时返回None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT status, content_length, etag, error, checked_at FROM link_checks WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        
+        ttl = LINK_CHECK_TTL if 200 <= row[0] < 300 else LINK_CHECK_FAILED_TTL
+        if time.time() - row[4] > ttl:
+            return None
+        return {'status': row[0], 'content_length': row[1], 'etag': row[2] or '', 'error': row[3] or ''}
+
+    def put_link(self, url, result):
+        """写入一条链接验证结果"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO link_checks (url, status, content_length, etag, error, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, result['status'], result['content_length'], result['etag'], result['error'], time.time()))
+
+    def get_probe(self, mirror):
+        """查询镜像测速结果，过期或不存在时返回None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT ok, ttfb, throughput, error, probed_at FROM mirror_probes WHERE mirror = ?",
+                (mirror,)).fetchone()
+        if row is None:
+            return None
+        
+        ttl = MIRROR_PROBE_TTL if row[0] else MIRROR_PROBE_FAILED_TTL
+        if time.time() - row[4] > ttl:
+            return None
+        return {'ok': bool(row[0]), 'ttfb': row[1], 'throughput': row[2], 'error': row[3] or ''}
+
+    def put_probe(self, mirror, result):
+        """写入一条镜像测速结果"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO mirror_probes (mirror, ok, ttfb, throughput, error, probed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (mirror, 1 if result['ok'] else 0, result['ttfb'], result['throughput'], result['error'], time.time()))
+
+    def get_trees(self):
+        """返回所有未过期的仓库文件列表 [(仓库, 版本, [[路径, 大小, sha256]])]"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT repo, revision, files FROM repo_trees WHERE fetched_at >= ?",
+                (time.time() - REPO_TREE_TTL,)).fetchall()
+        return [(repo, revision, json.loads(files)) for repo, revision, files in rows]
+
+    def put_tree(self, repo_id, revision, tree):
+        """写入一个仓库的文件列表"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO repo_trees (repo, revision, files, fetched_at) VALUES (?, ?, ?, ?)",
+                (repo_id, revision, json.dumps(tree, ensure_ascii=False), time.time()))
+
+    def evict(self):
+        """删除过期条目，并把条目数控制在max_entries以内"""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM repo_trees WHERE fetched_at < ?", (now - REPO_TREE_TTL,))
+            self.conn.execute(
+                "DELETE FROM link_checks WHERE checked_at < ?", (now - max(LINK_CHECK_TTL, LINK_CHECK_FAILED_TTL),))
+            self.conn.execute(
+                "DELETE FROM mirror_probes WHERE probed_at < ?", (now - max(MIRROR_PROBE_TTL, MIRROR_PROBE_FAILED_TTL),))
+            self.conn.execute(
+                "DELETE FROM resolutions WHERE (found = 1 AND created_at < ?) OR (found = 0 AND created_at < ?)",
+                (now - self.ttl, now - self.negative_ttl))
+            self.conn.execute(
+                "DELETE FROM resolutions WHERE name NOT IN "
+                "(SELECT name FROM resolutions ORDER BY accessed_at DESC LIMIT ?)", (self.max_entries,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# ----- 内容哈希识别 -----
+
+# 计算SHA-256时每次送入的块大小
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 并行计算哈希的线程数（hashlib在计算大块数据时会释放GIL）
+HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+# 以其他文件名存在于本地的模型的搜索状态，搜索时跳过
+LOCAL_MATCH_STATUS = '本地已存在'
+
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE):
+    """分块计算文件的SHA-256，通过内存映射读取，不把整个文件载入内存"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return sha.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mm)
+            try:
+                for offset in range(0, len(view), chunk_size):
+                    sha.update(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+    return sha.hexdigest()
+
+class HashCache:
+    """本地模型文件的SHA-256缓存，以及已知的 文件名 -> 哈希 对应关系
+
+    指纹按 (设备, inode, 大小, mtime) 缓存，文件不变时每个文件只计算一次哈希。
+    已知哈希来自本地计算过的文件（重命名前的文件名）和能提供文件哈希的搜索后端。
+    """
+
+    def __init__(self, db_file=None):
+        self.db_file = db_file or os.path.join(CACHE_DIR, 'hash_cache.sqlite3')
+        self.lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_file)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_hashes ("
+                "dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, sha256 TEXT, path TEXT, "
+                "PRIMARY KEY (dev, ino, size, mtime_ns))")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS known_hashes ("
+                "name TEXT, sha256 TEXT, size INTEGER, source TEXT, created_at REAL, "
+                "PRIMARY KEY (name, sha256))")
+
+    def get(self, st):
+        """按stat结果查询已计算的哈希"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT sha256 FROM file_hashes WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ?",
+                (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)).fetchone()
+        return row[0] if row else None
+
+    def put(self, path, st, sha256):
+        """记录文件哈希，同时把当前文件名登记为已知哈希（文件以后被重命名时仍能识别）"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (dev, ino, size, mtime_ns, sha256, path) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, sha256, path))
+        self.add_known(os.path.basename(path), sha256, st.st_size, source='local')
+
+    def add_known(self, file_name, sha256, size, source=''):
+        """登记一个文件名对应的哈希和文件大小"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO known_hashes (name, sha256, size, source, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (normalize_model_name(file_name), sha256.lower(), int(size), source, time.time()))
+
+    def known(self, file_name):
+        """返回文件名对应的所有已知 (哈希, 大小)"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT sha256, size FROM known_hashes WHERE name = ?",
+                (normalize_model_name(file_name),)).fetchall()
+
+    def hash_files(self, paths, workers=HASH_WORKERS):
+        """计算一批文件的哈希（优先使用缓存），返回 路径 -> 哈希"""
+        hashes = {}
+        pending = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            sha256 = self.get(st)
+            if sha256:
+                hashes[path] = sha256
+            else:
+                pending.append((path, st))
+        
+        if pending:
+            print(f"计算 {len(pending)} 个模型文件的SHA-256...")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(lambda item: (item, _try_hash_file(item[0])), pending)
+                for (path, st), sha256 in results:
+                    if sha256:
+                        self.put(path, st, sha256)
+                        hashes[path] = sha256
+        return hashes
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def record_known_hashes(file_hashes, source=''):
+    """登记 文件名 -> (哈希, 大小)，以后分析时可以按内容识别重命名过的模型"""
+    if not file_hashes:
+        return
+    hash_cache = HashCache()
+    try:
+        for file_name, (sha256, size) in file_hashes.items():
+            hash_cache.add_known(file_name, sha256, size, source=source)
+    finally:
+        hash_cache.close()
+
+def _try_hash_file(path):
+    try:
+        return hash_file(path)
+    except (OSError, ValueError) as e:
+        print(f"计算哈希时出错 ({path}): {e}")
+        return None
+
+def identify_by_hash(missing_files, model_index, hash_cache=None):
+    """按内容哈希识别以其他文件名存在于本地的缺失模型
+
+    只对大小与已知哈希一致的本地文件计算（或从缓存读取）SHA-256，
+    匹配成功的条目写入'present_as'（本地文件路径），返回匹配的条目数。
+    """
+    if not missing_files or model_index is None:
+        return 0
+    
+    own_cache = hash_cache is None
+    if own_cache:
+        hash_cache = HashCache()
+    try:
+        # 缺失文件名 -> 已知哈希
+        expected = {}
+        for missing in missing_files:
+            name = normalize_model_name(missing['file_path'])
+            if name not in expected:
+                expected[name] = dict(hash_cache.known(missing['file_path']))
+        sizes = {size for known in expected.values() for size in known.values()}
+        if not sizes:
+            return 0
+        
+        # 只有大小匹配的本地文件才需要哈希
+        candidates = []
+        for paths in model_index.by_name.values():
+            for path in paths:
+                try:
+                    if os.path.getsize(path) in sizes:
+                        candidates.append(path)
+                except OSError:
+                    continue
+        
+        by_hash = {}
+        for path, sha256 in hash_cache.hash_files(candidates).items():
+            by_hash.setdefault(sha256, path)
+        
+        matched = 0
+        for missing in missing_files:
+            for sha256 in expected[normalize_model_name(missing['file_path'])]:
+                if sha256 in by_hash:
+                    missing['present_as'] = by_hash[sha256]
+                    matched += 1
+                    break
+        return matched
+    finally:
+        if own_cache:
+            hash_cache.close()
+
+# ----- 本地模糊匹配 -----
+
+# 近似匹配的最低得分（0~1），低于该值的不报告
+FUZZY_MATCH_THRESHOLD = 0.6
+
+# 每个缺失文件最多报告的近似匹配数
+FUZZY_MATCH_LIMIT = 3
+
+# 每次查询最多精确计算得分的候选数（按共有的罕见三元组数量预选）
+FUZZY_MAX_CANDIDATES = 32
+
+# 每次查询最多读取的倒排表条目数，常见的三元组（如 fp1、_v1）只用于计算得分，不用于召回候选
+FUZZY_PROBE_BUDGET = 2048
+
+# 只有大小写或分隔符不同的文件得1.0；只有量化/精度后缀不同的文件至少得0.9，再按相似度排序
+FUZZY_CASE_SCORE = 1.0
+FUZZY_VARIANT_SCORE = 0.9
+
+# 报告中的近似匹配列
+FUZZY_MATCH_COLUMN = '可能的本地匹配'
+
+# 末尾的量化、精度等变体后缀（如 _fp8_e4m3fn、_q4_k_m、_pruned_emaonly）
+_VARIANT_SUFFIX = re.compile(r'(?:_(?:fp\d+|bf16|e4m3fn|e5m2|fp8e4m3fn|scaled|nf4|int[48]|q\d+(?:_[01k])?(?:_[sml])?|'
+                             r'gguf|pruned|emaonly|ema|noema))+$')
+_SEPARATORS = re.compile(r'[\s_\-.]+')
+
+def _fuzzy_stem(file_name):
+    """去掉路径和扩展名，统一小写和分隔符"""
+    name = normalize_model_name(file_name)
+    if name.endswith(MODEL_EXTENSIONS):
+        name = os.path.splitext(name)[0]
+    return _SEPARATORS.sub('_', name).strip('_')
+
+def _variant_base(stem):
+    """去掉末尾的量化/精度后缀，如 flux1_dev_fp8_e4m3fn -> flux1_dev"""
+    return _VARIANT_SUFFIX.sub('', stem)
+
+def _trigrams(stem):
+    padded = f"^{stem}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _discard_posting(postings, key, i):
+    posting = postings.get(key)
+    if posting is None:
+        return
+    posting.remove(i)
+    if not posting:
+        del postings[key]
+
+class FuzzyIndex:
+    """本地模型文件名的三元组（trigram）倒排索引，用于查找近似的文件名
+
+    得分为两个文件名三元组集合的Dice系数；只有大小写、分隔符不同的为1.0，
+    只有量化/精度后缀不同的至少为0.9。查询时只读取最罕见的几个三元组的倒排表召回候选，
+    再精确计算少量候选的得分，10万个文件时单次查询在1毫秒左右。
+    文件增减时用add/remove只更新相关的倒排表，移除后空出的编号留给之后加入的文件名。
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.stems = []
+        # 规范化文件名 -> 编号
+        self.slots = {}
+        self.free = []
+        self.postings = {}
+        self.by_stem = {}
+        self.by_base = {}
+        for name in sorted(set(names)):
+            self.add(name)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def add(self, name):
+        """加入一个文件名，已存在时忽略"""
+        key = os.path.normcase(name)
+        if key in self.slots:
+            return
+        stem = _fuzzy_stem(name)
+        if self.free:
+            i = self.free.pop()
+            self.names[i], self.stems[i] = name, stem
+        else:
+            i = len(self.names)
+            self.names.append(name)
+            self.stems.append(stem)
+        self.slots[key] = i
+        for gram in _trigrams(stem):
+            self.postings.setdefault(gram, []).append(i)
+        self.by_stem.setdefault(stem, []).append(i)
+        self.by_base.setdefault(_variant_base(stem), []).append(i)
+
+    def remove(self, name):
+        """移除一个文件名，不存在时忽略"""
+        i = self.slots.pop(os.path.normcase(name), None)
+        if i is None:
+            return
+        stem = self.stems[i]
+        for gram in _trigrams(stem):
+            _discard_posting(self.postings, gram, i)
+        _discard_posting(self.by_stem, stem, i)
+        _discard_posting(self.by_base, _variant_base(stem), i)
+        self.names[i] = self.stems[i] = None
+        self.free.append(i)
+
+    def _dice(self, grams, i):
+        other = _trigrams(self.stems[i])
+        return 2 * len(grams & other) / (len(grams) + len(other))
+
+    def search(self, file_name, limit=FUZZY_MATCH_LIMIT, threshold=FUZZY_MATCH_THRESHOLD):
+        """返回 [(得分, 本地文件名)]，按得分降序"""
+        stem = _fuzzy_stem(file_name)
+        grams = _trigrams(stem)
+        if not grams:
+            return []
+        scores = {}
+        for i in self.by_stem.get(stem, ()):
+            scores[i] = FUZZY_CASE_SCORE
+        for i in self.by_base.get(_variant_base(stem), ()):
+            if i not in scores:
+                scores[i] = FUZZY_VARIANT_SCORE + (FUZZY_CASE_SCORE - FUZZY_VARIANT_SCORE) * self._dice(grams, i)
+        
+        # 从最罕见的三元组开始读取倒排表，超出预算后停止（至少读取一个）
+        probe = []
+        budget = FUZZY_PROBE_BUDGET
+        for posting in sorted((self.postings[g] for g in grams if g in self.postings), key=len):
+            if probe and len(posting) > budget:
+                break
+            probe.append(posting)
+            budget -= len(posting)
+        counts = Counter(itertools.chain.from_iterable(probe))
+        
+        for i, _ in counts.most_common(FUZZY_MAX_CANDIDATES):
+            if i in scores:
+                continue
+            score = self._dice(grams, i)
+            if score >= threshold:
+                scores[i] = score
+        
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], self.names[item[0]]))[:limit]
+        return [(round(score, 3), self.names[i]) for i, score in ranked]
+
+def find_near_matches(missing_files, model_index, limit=FUZZY_MATCH_LIMIT, threshold=FUZZY_MATCH_THRESHOLD):
+    """为缺失文件查找本地近似的文件名，结果写入'near_matches'（[(得分, 本地路径)]），返回有匹配的条目数"""
+    if not missing_files or model_index is None:
+        return 0
+    fuzzy = model_index.fuzzy_index()
+    matched = 0
+    for missing in missing_files:
+        if missing.get('present_as'):
+            continue
+        matches = [(score, path) for score, name in fuzzy.search(missing['file_path'], limit, threshold)
+                   for path in model_index.lookup(name)[:1]]
+        if matches:
+            missing['near_matches'] = matches
+            matched += 1
+    return matched
+
+def format_near_matches(matches):
+    """报告中的显示格式：路径 (得分); ..."""
+    return '; '.join(f"{path} ({score:.2f})" for score, path in matches or ())
+
+# ----- 离线模型目录 -----
+
+# 随程序发布的模型目录（常见模型的 文件名 -> 仓库/路径），打包成exe时位于解包目录
+BUNDLED_CATALOG = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), 'model_catalog.bin')
+
+# 本机合并的模型目录，查询时优先于随程序发布的目录
+USER_CATALOG = os.path.join(CACHE_DIR, 'model_catalog.bin')
+
+# 目录文件格式：文件头 | (条目数+1)个记录偏移 | 按键的UTF-8字节排序的记录
+# 每条记录为 键\0文件名\0仓库\0路径\0大小\0SHA-256，键为normalize_model_name后的文件名
+CATALOG_MAGIC = b'MFCATLG\0'
+CATALOG_FORMAT_VERSION = 1
+_CATALOG_HEADER = struct.Struct('<8sIIQ')    # 标识, 格式版本, 条目数, 数据版本（每次合并加1）
+_CATALOG_FIELDS = ('file_name', 'repo_id', 'path', 'size', 'sha256')
+
+class ModelCatalog:
+    """只读的离线模型目录，内存映射后按有序数组二分查找
+
+    打开时只读取文件头，查询时按需访问映射的页面，启动开销与目录大小无关；
+    文件不存在或格式不符时视为空目录。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.revision = 0
+        self.count = 0
+        self.mm = None
+        self.offsets = None
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size >= _CATALOG_HEADER.size:
+                    self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            return
+        if self.mm is None:
+            return
+        magic, version, count, revision = _CATALOG_HEADER.unpack_from(self.mm, 0)
+        if magic != CATALOG_MAGIC or version != CATALOG_FORMAT_VERSION:
+            print(f"忽略无法识别的模型目录: {path}")
+            self.close()
+            return
+        self.count = count
+        self.revision = revision
+        self.data_start = _CATALOG_HEADER.size + 4 * (count + 1)
+        # 偏移表按小端写入：小端机器上直接映射，其他机器上解码一份
+        if sys.byteorder == 'little':
+            self.offsets = memoryview(self.mm)[_CATALOG_HEADER.size:self.data_start].cast('I')
+        else:
+            self.offsets = struct.unpack_from(f'<{count + 1}I', self.mm, _CATALOG_HEADER.size)
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, i):
+        start = self.data_start + self.offsets[i]
+        return self.mm[start:self.data_start + self.offsets[i + 1]]
+
+    def _key(self, i):
+        start = self.data_start + self.offsets[i]
+        return self.mm[start:self.mm.find(b'\0', start)]
+
+    def _entry(self, i):
+        values = self._record(i).decode('utf-8').split('\0')[1:]
+        entry = dict(zip(_CATALOG_FIELDS, values))
+        entry['size'] = int(entry['size']) if entry.get('size') else None
+        return entry
+
+    def get(self, file_name):
+        """按文件名查询，返回 {'file_name', 'repo_id', 'path', 'size', 'sha256'}，没有时返回None"""
+        if not self.count:
+            return None
+        key = normalize_model_name(file_name).encode('utf-8')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._key(lo) == key:
+            return self._entry(lo)
+        return None
+
+    def entries(self):
+        """按键的顺序遍历所有条目"""
+        for i in range(self.count):
+            yield self._entry(i)
+
+    def close(self):
+        if self.mm is not None:
+            # 映射的视图释放后才能关闭mmap
+            if isinstance(self.offsets, memoryview):
+                self.offsets.release()
+            self.offsets = None
+            self.mm.close()
+            self.mm = None
+        self.count = 0
+
+    @staticmethod
+    def write(path, entries, revision):
+        """原子地写入目录文件，entries为条目字典的可迭代对象，同名（规范化后）的条目保留最后一个"""
+        records = {}
+        for entry in entries:
+            key = normalize_model_name(entry['file_name'])
+            values = [key] + ['' if entry.get(field) is None else str(entry[field]) for field in _CATALOG_FIELDS]
+            if any('\0' in value for value in values):
+                continue
+            records[key.encode('utf-8')] = '\0'.join(values).encode('utf-8')
+        
+        keys = sorted(records)
+        offsets = [0]
+        for key in keys:
+            offsets.append(offsets[-1] + len(records[key]))
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_file = path + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(_CATALOG_HEADER.pack(CATALOG_MAGIC, CATALOG_FORMAT_VERSION, len(keys), revision))
+            f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+            for key in keys:
+                f.write(records[key])
+        os.replace(tmp_file, path)
+        return len(keys)
+
+def open_catalogs(paths=None):
+    """打开本机目录和随程序发布的目录（按查询优先级排列），跳过空目录"""
+    catalogs = []
+    for path in paths or (USER_CATALOG, BUNDLED_CATALOG):
+        catalog = ModelCatalog(path)
+        if len(catalog):
+            catalogs.append(catalog)
+    return catalogs
+
+def lookup_catalogs(catalogs, file_name):
+    """依次查询各目录，返回第一个命中的条目"""
+    for catalog in catalogs:
+        entry = catalog.get(file_name)
+        if entry:
+            return entry
+    return None
+
+def catalog_link(entry, base_url=None):
+    """目录条目的下载链接"""
+    return f"{(base_url or HF_DOWNLOAD_BASE).rstrip('/')}/{entry['repo_id']}/resolve/main/{quote(entry['path'])}"
+
+def parse_hf_file_link(url):
+    """从Hugging Face（或镜像）的文件链接中取出 (仓库, 文件路径)，不是文件链接时返回None"""
+    parts = urlparse(str(url)).path.strip('/').split('/')
+    if len(parts) < 5 or parts[2] not in ('resolve', 'blob'):
+        return None
+    return f"{parts[0]}/{parts[1]}", unquote('/'.join(parts[4:]))
+
+def merge_catalog(csv_files, catalog_file=USER_CATALOG):
+    """把已解析的结果CSV合并进目录，返回 (新增数, 更新数, 跳过数)
+
+    只合并下载链接指向同名文件的行；仓库链接、文件名不一致的搜索结果不收录。
+    验证过的文件大小和SHA-256形式的ETag一并记录。
+    """
+    catalog = ModelCatalog(catalog_file)
+    try:
+        revision = catalog.revision
+        merged = {normalize_model_name(entry['file_name']): entry for entry in catalog.entries()}
+    finally:
+        catalog.close()
+    
+    added = updated = skipped = 0
+    for csv_file in csv_files:
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                file_name = (row.get('文件名') or '').strip()
+                link = (row.get('下载链接') or '').strip()
+                if not file_name or not link:
+                    continue
+                parsed = parse_hf_file_link(link)
+                if not parsed or normalize_model_name(parsed[1]) != normalize_model_name(file_name):
+                    skipped += 1
+                    continue
+                
+                etag = (row.get('ETag') or '').strip().strip('"').lower()
+                if etag.startswith('w/'):
+                    etag = etag[2:].strip('"')
+                size = (row.get('文件大小') or '').strip()
+                entry = {
+                    'file_name': file_name.replace('\\', '/').rsplit('/', 1)[-1],
+                    'repo_id': parsed[0],
+                    'path': parsed[1],
+                    'size': int(float(size)) if size.replace('.', '', 1).isdigit() else None,
+                    'sha256': etag if re.fullmatch(r'[0-9a-f]{64}', etag) else '',
+                }
+                
+                key = normalize_model_name(file_name)
+                old = merged.get(key)
+                if old is None:
+                    added += 1
+                elif any(old.get(k) != entry[k] for k in ('repo_id', 'path')) or \
+                        (entry['size'] and old.get('size') != entry['size']) or \
+                        (entry['sha256'] and old.get('sha256') != entry['sha256']):
+                    # 新结果没有大小或哈希时保留已有的
+                    entry['size'] = entry['size'] or old.get('size')
+                    entry['sha256'] = entry['sha256'] or old.get('sha256')
+                    updated += 1
+                else:
+                    continue
+                merged[key] = entry
+    
+    if added or updated:
+        ModelCatalog.write(catalog_file, merged.values(), revision + 1)
+    return added, updated, skipped
+
+# ----- 核心功能：生成下载链接 -----
+
+def get_mirror_link(original_url, mirror_base_url=None):
+    """获取Hugging Face的镜像链接，默认使用镜像列表中第一个不是huggingface.co的地址"""
+    if not original_url or 'huggingface.co' not in original_url:
+        return ''
+    
+    try:
+        # 解析URL以确保正确的格式转换
+        parsed_url = urlparse(original_url)
+        path = parsed_url.path
+        
+        # 确保路径格式正确（移除/resolve/并替换为对应路径）
+        if '/resolve/' in path:
+            path = path.replace('/resolve/', '/blob/')
+            
+        # 构建正确的镜像链接
+        if mirror_base_url is None:
+            mirror_base_url = next((m for m in get_mirrors() if urlparse(m).netloc != 'huggingface.co'),
+                                   DEFAULT_MIRRORS[0])
+        mirror_url = urljoin(mirror_base_url, path)
+        
+        # 将blob替换回resolve用于下载
+        if '/blob/' in mirror_url:
+            mirror_url = mirror_url.replace('/blob/', '/resolve/')
+            
+        return mirror_url
+    except Exception as e:
+        print(f"构建镜像链接时出错: {e}")
+        return ''
+
+# ----- HTTP连接池 -----
+
+# 默认的HTTP请求头
+HTTP_USER_AGENT = 'ModelFinder/1.0'
+
+class HttpResponse:
+    """已读取完毕的HTTP响应"""
+
+    def __init__(self, status, headers, body, url):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.url = url
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+class HttpConnectionPool:
+    """线程安全的HTTP(S)长连接池，按(协议, 主机, 端口)复用keep-alive连接"""
+
+    def __init__(self, max_idle_per_host=16, timeout=30, headers=None):
+        self.max_idle_per_host = max_idle_per_host
+        self.timeout = timeout
+        self.headers = {'User-Agent': HTTP_USER_AGENT}
+        self.headers.update(headers or {})
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(parsed):
+        scheme = parsed.scheme or 'http'
+        port = parsed.port or (443 if scheme == 'https' else 80)
+        return scheme, parsed.hostname, port
+
+    def _acquire(self, key):
+        """取一个空闲连接，没有时新建"""
+        with self.lock:
+            connections = self.idle.get(key)
+            if connections:
+                return connections.pop(), True
+        scheme, host, port = key
+        if scheme == 'https':
+            return http_client.HTTPSConnection(host, port, timeout=self.timeout), False
+        return http_client.HTTPConnection(host, port, timeout=self.timeout), False
+
+    def _release(self, key, conn):
+        """归还连接，超出空闲上限时关闭"""
+        with self.lock:
+            connections = self.idle.setdefault(key, [])
+            if len(connections) < self.max_idle_per_host:
+                connections.append(conn)
+                return
+        conn.close()
+
+    def open(self, method, url, headers=None, body=None):
+        """发送请求并返回未读取的响应，调用方读取完毕后必须调用release(response)"""
+        parsed = urlparse(url)
+        key = self._key(parsed)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+        
+        for attempt in range(2):
+            conn, reused = self._acquire(key)
+            trace_count('http_requests')
+            if not reused:
+                trace_count('http_connections')
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                response = conn.getresponse()
+            except (http_client.RemoteDisconnected, ConnectionResetError, BrokenPipeError,
+                    http_client.CannotSendRequest):
+                conn.close()
+                # 复用的连接可能已被服务器关闭，换新连接重试一次
+                if reused and attempt == 0:
+                    trace_count('http_reconnects')
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            response.pool_key = key
+            response.pool_conn = conn
+            return response
+
+    def release(self, response):
+        """响应读取完毕后归还连接"""
+        conn = getattr(response, 'pool_conn', None)
+        if conn is None:
+            return
+        response.pool_conn = None
+        if response.will_close or not response.isclosed():
+            conn.close()
+        else:
+            self._release(response.pool_key, conn)
+
+    def discard(self, response):
+        """不读取响应体，关闭响应和连接（连接不再复用）"""
+        conn = getattr(response, 'pool_conn', None)
+        response.pool_conn = None
+        response.close()
+        if conn is not None:
+            conn.close()
+
+    def open_redirected(self, method, url, headers=None, max_redirects=5):
+        """发送请求并跟随重定向，返回 (未读取的响应, 最终地址)"""
+        for _ in range(max_redirects + 1):
+            response = self.open(method, url, headers)
+            location = response.getheader('Location')
+            if response.status not in (301, 302, 303, 307, 308) or not location:
+                return response, url
+            self.discard(response)
+            url = urljoin(url, location)
+        raise http_client.HTTPException(f"重定向次数过多: {url}")
+
+    def request(self, method, url, headers=None, body=None, follow_redirects=True, max_redirects=5,
+                max_body=None):
+        """发送请求并读取完整响应，默认跟随重定向
+
+        max_body: 响应体超过该字节数（或长度未知）时不读取，直接丢弃连接
+        """
+        for _ in range(max_redirects + 1):
+            response = self.open(method, url, headers, body)
+            if max_body is not None and (response.length is None or response.length > max_body) \
+                    and response.status not in (301, 302, 303, 307, 308):
+                self.discard(response)
+                data = b''
+            else:
+                try:
+                    data = response.read()
+                finally:
+                    self.release(response)
+            
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            if follow_redirects and response.status in (301, 302, 303, 307, 308) and 'location' in response_headers:
+                url = urljoin(url, response_headers['location'])
+                if response.status == 303:
+                    method, body = 'GET', None
+                continue
+            return HttpResponse(response.status, response_headers, data, url)
+        raise http_client.HTTPException(f"重定向次数过多: {url}")
+
+    def close(self):
+        with self.lock:
+            connections = [conn for conns in self.idle.values() for conn in conns]
+            self.idle = {}
+        for conn in connections:
+            conn.close()
+
+# ----- 镜像选择 -----
+
+# 镜像列表环境变量，多个地址用逗号分隔，https://huggingface.co 表示原始地址
+MIRRORS_ENV = 'MODEL_FINDER_MIRRORS'
+DEFAULT_MIRRORS = ('https://hf-mirror.com', 'https://huggingface.co')
+
+# 测速时请求的字节数（Range请求）
+MIRROR_PROBE_BYTES = 256 * 1024
+
+# 测速超时（秒）
+MIRROR_PROBE_TIMEOUT = 10
+
+# 按下载多大的文件估算耗时来给镜像排序：首字节时间 + 该大小 / 吞吐量
+MIRROR_SCORE_BYTES = 100 * 1024 * 1024
+
+def get_mirrors(mirrors=None):
+    """获取镜像列表，未指定时读取环境变量，否则使用默认列表"""
+    if mirrors is None:
+        mirrors = os.environ.get(MIRRORS_ENV, '') or DEFAULT_MIRRORS
+    if isinstance(mirrors, str):
+        mirrors = mirrors.split(',')
+    return [m.strip().rstrip('/') for m in mirrors if m and m.strip()]
+
+class MirrorSelector:
+    """按测速结果选择最快的可用镜像
+
+    用小的Range请求测量每个镜像的首字节时间和吞吐量，结果缓存在ResolutionCache中；
+    镜像列可以换成最快的镜像，下载时按速度依次尝试所有镜像。
+    """
+
+    def __init__(self, mirrors=None, cache=None, pool=None, probe_bytes=MIRROR_PROBE_BYTES):
+        self.mirrors = get_mirrors(mirrors)
+        self.hosts = {urlparse(m).netloc: m for m in self.mirrors}
+        self.hosts.setdefault('huggingface.co', 'https://huggingface.co')
+        self.cache = cache
+        self.pool = pool or HttpConnectionPool(timeout=MIRROR_PROBE_TIMEOUT)
+        self.probe_bytes = probe_bytes
+        self.lock = threading.Lock()
+        self.ranking = None
+        self.healthy = set()
+        self.failed = set()
+
+    def model_path(self, url):
+        """Hugging Face或已知镜像上的文件路径（/仓库/resolve/分支/文件），其他链接返回None"""
+        parsed = urlparse(_cell_text(url))
+        if parsed.netloc not in self.hosts or '/resolve/' not in parsed.path.replace('/blob/', '/resolve/'):
+            return None
+        return parsed.path.replace('/blob/', '/resolve/')
+
+    def probe(self, mirror, path):
+        """测速：返回 {'ok', 'ttfb': 首字节时间(秒), 'throughput': 字节/秒, 'error'}"""
+        start = time.monotonic()
+        response = None
+        try:
+            response, _ = self.pool.open_redirected('GET', mirror + path,
+                                                    {'Range': f"bytes=0-{self.probe_bytes - 1}"})
+            ttfb = time.monotonic() - start
+            if response.status not in (200, 206):
+                raise http_client.HTTPException(f"HTTP {response.status}")
+            
+            received = 0
+            while received < self.probe_bytes:
+                chunk = response.read(min(64 * 1024, self.probe_bytes - received))
+                if not chunk:
+                    break
+                received += len(chunk)
+            elapsed = max(time.monotonic() - start - ttfb, 1e-3)
+            result = {'ok': True, 'ttfb': ttfb, 'throughput': received / elapsed, 'error': ''}
+        except Exception as e:
+            result = {'ok': False, 'ttfb': None, 'throughput': None, 'error': str(e) or type(e).__name__}
+        finally:
+            if response is not None:
+                if response.isclosed():
+                    self.pool.release(response)
+                else:
+                    self.pool.discard(response)
+        
+        if self.cache is not None:
+            self.cache.put_probe(mirror, result)
+        return result
+
+    @staticmethod
+    def _score(result):
+        """估算下载MIRROR_SCORE_BYTES所需的时间，不可用的镜像排在最后"""
+        if not result or not result['ok'] or not result['throughput']:
+            return float('inf')
+        return result['ttfb'] + MIRROR_SCORE_BYTES / result['throughput']
+
+    def rank(self, path):
+        """按速度排序的镜像列表（首次调用时测速，优先使用缓存的测速结果）"""
+        with self.lock:
+            if self.ranking is None:
+                results = {}
+                for mirror in self.mirrors:
+                    results[mirror] = self.cache.get_probe(mirror) if self.cache is not None else None
+                stale = [m for m in self.mirrors if results[m] is None]
+                if len(self.mirrors) > 1 and stale:
+                    print(f"镜像测速: {', '.join(stale)}")
+                    with ThreadPoolExecutor(max_workers=len(stale)) as executor:
+                        for mirror, result in zip(stale, executor.map(lambda m: self.probe(m, path), stale)):
+                            results[mirror] = result
+                
+                self.ranking = sorted(self.mirrors, key=lambda m: self._score(results[m]))
+                self.healthy = {m for m in self.mirrors if results[m] is None or results[m]['ok']}
+                for mirror in self.ranking:
+                    result = results[mirror]
+                    if mirror not in stale or len(self.mirrors) == 1:
+                        continue
+                    if result['ok']:
+                        print(f"  {mirror}: 首字节 {result['ttfb'] * 1000:.0f}ms, {result['throughput'] / 1024 / 1024:.1f} MB/s")
+                    else:
+                        print(f"  {mirror}: 不可用 ({result['error']})")
+            
+            # 可用的镜像在前，不可用和下载失败的镜像作为最后的备选
+            usable = [m for m in self.ranking if m in self.healthy and m not in self.failed]
+            return usable + [m for m in self.ranking if m not in usable]
+
+    def mirror_link(self, url):
+        """把链接换成最快的可用镜像上的同一文件，非Hugging Face链接或没有配置镜像时返回空字符串"""
+        path = self.model_path(url)
+        if path is None:
+            return ''
+        ranking = self.rank(path)
+        return ranking[0] + path if ranking else ''
+
+    def candidates(self, url, mirror_link='', prefer_origin=False):
+        """下载时依次尝试的链接：按速度排序的所有镜像，再加上CSV中原有的链接"""
+        path = self.model_path(url)
+        urls = [m + path for m in self.rank(path)] if path is not None else []
+        if prefer_origin:
+            urls.insert(0, url)
+        urls += [url, mirror_link]
+        return list(dict.fromkeys(u for u in map(_cell_text, urls) if u.strip()))
+
+    def mark_failed(self, url):
+        """连接某个镜像失败后，后续文件先尝试其他镜像"""
+        mirror = self.hosts.get(urlparse(url).netloc)
+        if mirror:
+            with self.lock:
+                self.failed.add(mirror)
+
+    def close(self):
+        self.pool.close()
+
+# ----- 搜索后端 -----
+
+class SearchBackend:
+    """搜索后端接口：把一批模型文件名解析为下载链接"""
+
+    # 写入缓存的结果来源
+    name = ''
+
+    # RepoTreeIndex：发起每个搜索前先在已知的仓库文件列表中查找，由search_model_links设置
+    repo_trees = None
+
+    def __init__(self):
+        # 搜索过程中得到的文件哈希：文件名 -> (sha256, 文件大小)，用于以后按内容识别本地模型
+        self.file_hashes = {}
+
+    def check(self):
+        """检查后端是否可用，不可用时打印原因并返回False"""
+        return True
+
+    def search_all(self, keywords, on_result):
+        """解析所有关键词，在调用线程中依次回调 on_result(关键词, (下载链接, 镜像链接)或None, 错误信息)"""
+        raise NotImplementedError
+
+# ----- 仓库文件列表 -----
+
+# 默认使用的仓库版本（分支）
+REPO_TREE_REVISION = 'main'
+
+# 很多仓库都有的通用文件名，不能据此判断属于哪个仓库
+_GENERIC_MODEL_NAMES = frozenset((
+    'model.safetensors', 'diffusion_pytorch_model.safetensors', 'diffusion_pytorch_model.bin',
+    'pytorch_model.bin', 'pytorch_lora_weights.safetensors', 'adapter_model.safetensors', 'model.ckpt',
+))
+
+def parse_hf_repo(url):
+    """从Hugging Face（或镜像）的仓库或文件链接中取出仓库ID，不是模型仓库链接时返回None"""
+    parts = urlparse(str(url)).path.strip('/').split('/')
+    if len(parts) < 2 or not parts[0] or parts[0] in ('datasets', 'spaces', 'docs', 'blog', 'api', 'models'):
+        return None
+    return f"{parts[0]}/{parts[1]}"
+
+def _tree_from_siblings(siblings):
+    """API返回的siblings -> [[路径, 大小, sha256]]，只保留模型文件"""
+    tree = []
+    for sibling in siblings:
+        path = sibling.get('rfilename') or ''
+        if path.lower().endswith(MODEL_EXTENSIONS):
+            lfs = sibling.get('lfs') or {}
+            tree.append([path, lfs.get('size') or sibling.get('size'), lfs.get('sha256') or ''])
+    return tree
+
+class RepoTreeIndex:
+    """仓库文件列表索引：搜索命中某个仓库后取一次完整的文件列表，同一仓库中的其他缺失文件直接匹配
+
+    文件列表按 (仓库, 版本) 缓存在ResolutionCache中（默认1天），每次搜索开始时全部载入，
+    在发起新的搜索前先用已知的文件列表匹配剩余的文件名。
+    同一文件名出现在多个仓库中或属于通用文件名时不匹配，仍然交给搜索。
+    """
+
+    def __init__(self, cache=None, endpoint=None, download_base=None, revision=REPO_TREE_REVISION, pool=None):
+        self.cache = cache
+        self.endpoint = (endpoint or HF_ENDPOINT).rstrip('/')
+        self.download_base = (download_base or HF_DOWNLOAD_BASE).rstrip('/')
+        self.revision = revision
+        self.pool = pool
+        self.own_pool = pool is None
+        self.by_name = {}      # 规范化文件名 -> (仓库, 版本, 路径, 大小, sha256)
+        self.ambiguous = set()
+        self.repos = set()     # 已载入或正在获取的 (仓库, 版本)
+        self.file_hashes = {}
+        self.lock = threading.Lock()
+        if cache is not None:
+            for repo_id, revision, tree in cache.get_trees():
+                self.add_tree(repo_id, tree, revision, persist=False)
+
+    def __len__(self):
+        return len(self.repos)
+
+    def add_tree(self, repo_id, tree, revision=None, persist=True):
+        """登记一个仓库的文件列表"""
+        revision = revision or self.revision
+        with self.lock:
+            self.repos.add((repo_id, revision))
+            for path, size, sha256 in tree:
+                name = normalize_model_name(path)
+                if name in _GENERIC_MODEL_NAMES:
+                    continue
+                existing = self.by_name.get(name)
+                if existing is None:
+                    self.by_name[name] = (repo_id, revision, path, size, sha256)
+                elif existing[0] != repo_id:
+                    self.ambiguous.add(name)
+        if persist and self.cache is not None:
+            self.cache.put_tree(repo_id, revision, tree)
+
+    def lookup(self, file_name):
+        """在已知的文件列表中查找，返回 (下载链接, 镜像链接)，没有或有歧义时返回None"""
+        name = normalize_model_name(file_name)
+        with self.lock:
+            entry = None if name in self.ambiguous else self.by_name.get(name)
+        if entry is None:
+            return None
+        repo_id, revision, path, size, sha256 = entry
+        if sha256 and size:
+            self.file_hashes[file_name] = (sha256, size)
+        trace_count('repo_tree_hits')
+        download_link = f"{self.download_base}/{repo_id}/resolve/{revision}/{quote(path)}"
+        return download_link, get_mirror_link(download_link)
+
+    def expand(self, url):
+        """获取链接所在仓库的完整文件列表（每个仓库只获取一次），返回是否有新的文件列表"""
+        repo_id = parse_hf_repo(url)
+        if not repo_id:
+            return False
+        with self.lock:
+            if (repo_id, self.revision) in self.repos:
+                return False
+            self.repos.add((repo_id, self.revision))
+            if self.pool is None:
+                self.pool = HttpConnectionPool(headers={'Accept': 'application/json'})
+        
+        trace_count('repo_tree_fetches')
+        api_url = f"{self.endpoint}/api/models/{quote(repo_id)}/revision/{quote(self.revision, safe='')}?blobs=true"
+        try:
+            with trace_span('repo_tree_fetch', 'search', repo=repo_id):
+                response = self.pool.request('GET', api_url)
+            if response.status != 200:
+                raise http_client.HTTPException(f"HTTP {response.status}")
+            tree = _tree_from_siblings(response.json().get('siblings') or [])
+        except Exception as e:
+            print(f"获取仓库文件列表失败 ({repo_id}): {e}")
+            return False
+        self.add_tree(repo_id, tree)
+        print(f"已获取仓库文件列表: {repo_id}（{len(tree)} 个模型文件）")
+        return True
+
+    def close(self):
+        if self.own_pool and self.pool is not None:
+            self.pool.close()
+
+# ----- 并发浏览器搜索 -----
+
+# 并发搜索的浏览器标签页数
+SEARCH_WORKERS = 3
+
+# 全局限速：每秒最多发起的搜索次数和允许的突发次数
+SEARCH_RATE = 1.0
+SEARCH_BURST = 3
+
+# 搜索导航方式：query 直接打开搜索结果URL；form 加载首页后输入并提交表单
+SEARCH_NAVIGATION = 'query'
+BING_SEARCH_URL = 'https://www.bing.com/search'
+BING_HOME_URL = 'https://www.bing.com/?setlang=en-US'
+
+# 页面等待超时（秒）：首次使用初始值，之后根据观测到的加载时间自适应
+PAGE_TIMEOUT_INITIAL = 10
+PAGE_TIMEOUT_MIN = 2
+PAGE_TIMEOUT_MAX = 30
+
+# 重试退避（秒）：指数增长并加随机抖动
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8
+
+# 熔断退避时间（秒）：首次30秒，连续触发时翻倍，最长10分钟
+BREAKER_BASE_DELAY = 30
+BREAKER_MAX_DELAY = 600
+
+class TokenBucket:
+    """线程安全的令牌桶限速器
+
+    允许透支：一次取走的令牌数可以超过容量，之后的调用等待令牌补足。
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """取走令牌，不足时阻塞等待"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+class CircuitBreaker:
+    """全局熔断器：搜索引擎开始限流或返回验证码时，所有工作线程一起退避"""
+
+    def __init__(self, base_delay=BREAKER_BASE_DELAY, max_delay=BREAKER_MAX_DELAY):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failures = 0
+        self.open_until = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """熔断打开期间阻塞"""
+        while True:
+            with self.lock:
+                remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, 1))
+
+    def trip(self):
+        """记录一次限流，按连续次数指数退避"""
+        with self.lock:
+            self.failures += 1
+            delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+            self.open_until = max(self.open_until, time.monotonic() + delay)
+        print(f"检测到搜索引擎限流或验证码，所有搜索暂停 {delay} 秒")
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+
+class LatencyTracker:
+    """根据观测到的页面加载时间自适应计算等待超时（与TCP RTO相同的平滑算法）"""
+
+    def __init__(self, initial=PAGE_TIMEOUT_INITIAL, minimum=PAGE_TIMEOUT_MIN, maximum=PAGE_TIMEOUT_MAX):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.srtt = None
+        self.rttvar = 0.0
+        self.backoff = None
+        self.lock = threading.Lock()
+
+    def record(self, elapsed):
+        """记录一次成功加载的耗时"""
+        with self.lock:
+            self.backoff = None
+            if self.srtt is None:
+                self.srtt = elapsed
+                self.rttvar = elapsed / 2
+            else:
+                self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - elapsed)
+                self.srtt = 0.875 * self.srtt + 0.125 * elapsed
+
+    def timed_out(self, timeout):
+        """记录一次加载超时：超时时间加倍（不超过上限），直到再次成功加载"""
+        with self.lock:
+            self.backoff = min(self.maximum, max(self.backoff or 0, timeout) * 2)
+
+    def timeout(self):
+        """当前的等待超时：平滑耗时 + 4倍偏差，超时后按退避值"""
+        with self.lock:
+            if self.srtt is None:
+                current = self.initial
+            else:
+                current = min(self.maximum, max(self.minimum, self.srtt + 4 * self.rttvar))
+            return max(current, self.backoff or 0)
+
+def backoff_delay(retry, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """指数退避加随机抖动（full jitter）：第retry次重试前的等待时间"""
+    return random.uniform(0, min(cap, base * 2 ** retry))
+
+def _is_connection_lost(error_msg):
+    """判断是否是浏览器连接断开错误"""
+    return "与页面的连接已断开" in error_msg or "连接失败" in error_msg
+
+class BrowserSearchBackend(SearchBackend):
+    """用同一个浏览器的多个标签页并发执行Bing搜索
+
+    工作线程从关键词队列中取任务，共享令牌桶限速器和熔断器；
+    结果通过队列交回调用线程，由调用线程依次回调on_result。
+    浏览器的启动、标签页和重启由BrowserService管理，传入常驻服务时搜索结束后浏览器继续保留。
+    """
+
+    name = 'bing'
+
+    def __init__(self, workers=SEARCH_WORKERS, rate=SEARCH_RATE, burst=SEARCH_BURST, max_retries=3,
+                 navigation=SEARCH_NAVIGATION, service=None):
+        super().__init__()
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.navigation = navigation
+        self.limiter = TokenBucket(rate, burst)
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.service = service or BrowserService()
+
+    def check(self):
+        if not _load_drission():
+            print("错误: DrissionPage库未安装，无法使用网络搜索功能")
+            print("请运行 'pip install DrissionPage' 安装，或使用Hugging Face API搜索后端（--backend hf）")
+            return False
+        return True
+
+    @staticmethod
+    def _is_throttled(tab):
+        """检查当前页面是否是限流或验证码页面"""
+        try:
+            url = (tab.url or '').lower()
+            if 'captcha' in url or '/challenge' in url:
+                return True
+            return 'captcha' in (tab.html or '').lower()
+        except Exception:
+            return False
+
+    def _open_results(self, tab, query, timeout):
+        """打开搜索结果页并等待#b_results出现，返回是否出现"""
+        if self.navigation == 'query':
+            # 直接访问搜索结果URL，不再加载首页、输入和提交表单
+            tab.get(BING_SEARCH_URL + '?' + urlencode({'q': query, 'setlang': 'en-US'}),
+                    retry=0, timeout=timeout)
+            return bool(tab.ele('#b_results', timeout=timeout))
+
+        # 表单模式：访问国际版Bing，等待搜索框出现后输入并提交
+        tab.get(BING_HOME_URL, retry=0, timeout=timeout)
+        search_box = tab.ele("#sb_form_q", timeout=timeout)
+        if not search_box:
+            return False
+        search_box.clear()
+        search_box.input(query)
+        tab.run_js("document.querySelector('#sb_form').submit();")
+        return bool(tab.ele('#b_results', timeout=timeout))
+
+    def _search_keyword(self, state, keyword):
+        """在工作线程的标签页中搜索单个关键词，返回 (下载链接, 镜像链接)，未找到返回None"""
+        max_retries = self.max_retries
+        search_query = f'site:huggingface.co "{keyword}"'
+        for retry in range(max_retries):
+            if retry:
+                trace_count('search_retries')
+                time.sleep(backoff_delay(retry))
+            # 排队等待期间同仓库的其他文件可能已经取回了文件列表
+            links = self._known_links(keyword)
+            if links:
+                return links
+            with trace_span('rate_limit_wait', 'search'):
+                self.breaker.wait()
+                self.limiter.acquire()
+            links = self._known_links(keyword)
+            if links:
+                return links
+            tab = state['tab']
+
+            try:
+                timeout = self.latency.timeout()
+                start_time = time.monotonic()
+                with trace_span('page_load', 'search', keyword=keyword, attempt=retry + 1):
+                    state['uses'] += 1
+                    self.service.record_load()
+                    loaded = self._open_results(tab, search_query, timeout)
+                if not loaded:
+                    if self._is_throttled(tab):
+                        trace_count('search_throttled')
+                        self.breaker.trip()
+                    else:
+                        self.latency.timed_out(timeout)
+                        print(f"Bing搜索结果页加载超时 ({keyword}, {timeout:.1f}秒)，重试 ({retry+1}/{max_retries})...")
+                    continue
+                self.latency.record(time.monotonic() - start_time)
+
+                # 结果容器已出现，直接提取搜索结果，不再等待
+                search_results = tab.eles("xpath://*[@id='b_results']//h2/a", timeout=0)
+
+                if search_results and len(search_results) > 0:
+                    self.breaker.success()
+
+                    # 获取第一个搜索结果
+                    first_result = search_results[0]
+                    title = first_result.text
+                    original_link = first_result.attr("href")
+
+                    print(f"找到搜索结果 ({keyword}): {title}")
+
+                    if 'huggingface.co' in original_link:
+                        # 在原链接中，如果是blob路径，转换为resolve路径用于下载
+                        if "blob" in original_link:
+                            download_link = original_link.replace("/blob/", "/resolve/")
+                        else:
+                            download_link = original_link
+
+                        # 取回该仓库的完整文件列表，同仓库的其他缺失文件不再搜索；
+                        # 结果是仓库页面时也能据此得到文件的下载链接
+                        if self.repo_trees is not None:
+                            self.repo_trees.expand(original_link)
+                            links = self.repo_trees.lookup(keyword)
+                            if links:
+                                return links
+
+                        # 构造镜像链接
+                        return download_link, get_mirror_link(original_link)
+
+                    print(f"找到结果但不是Hugging Face链接 ({keyword})，重试 ({retry+1}/{max_retries})...")
+                elif self._is_throttled(tab):
+                    trace_count('search_throttled')
+                    self.breaker.trip()
+                else:
+                    print(f"Bing搜索未找到结果({keyword})，重试 ({retry+1}/{max_retries})...")
+
+            except Exception as e:
+                error_msg = str(e)
+                print(f"搜索过程中出错 ({keyword}, {retry+1}/{max_retries}): {error_msg}")
+
+                # 检查是否是连接断开错误，重建浏览器后换一个新标签页
+                if _is_connection_lost(error_msg):
+                    self.service.restart(state['generation'])
+                    state['tab'], state['generation'], state['uses'] = self.service.acquire_tab()
+
+        return None
+
+    def _known_links(self, keyword):
+        """在已取回的仓库文件列表中查找"""
+        if self.repo_trees is None:
+            return None
+        links = self.repo_trees.lookup(keyword)
+        if links:
+            print(f"仓库文件列表命中 ({keyword}): {links[0]}")
+        return links
+
+    def _worker(self, tasks, results):
+        """工作线程：从队列中取关键词，在自己的标签页中搜索"""
+        state = {'tab': None, 'generation': -1, 'uses': 0}
+        try:
+            while True:
+                try:
+                    keyword = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                
+                print(f"搜索模型: {keyword}")
+                try:
+                    if state['tab'] is None:
+                        state['tab'], state['generation'], state['uses'] = self.service.acquire_tab()
+                    with trace_span('search_keyword', 'search', keyword=keyword):
+                        links = self._search_keyword(state, keyword)
+                    results.put((keyword, links, None))
+                    
+                    # 标签页使用次数达到上限时回收，下一个关键词换新标签页
+                    if state['uses'] >= self.service.tab_max_uses:
+                        self.service.release_tab(state['tab'], state['generation'], state['uses'])
+                        state['tab'] = None
+                except Exception as e:
+                    if _is_connection_lost(str(e)):
+                        self.service.restart(state['generation'])
+                        state['tab'] = None
+                    results.put((keyword, None, str(e)))
+        finally:
+            if state['tab'] is not None:
+                self.service.release_tab(state['tab'], state['generation'], state['uses'])
+
+    def search_all(self, keywords, on_result):
+        """并发搜索所有关键词，在调用线程中依次回调 on_result(关键词, 链接或None, 错误信息)"""
+        tasks = queue.Queue()
+        for keyword in keywords:
+            tasks.put(keyword)
+        results = queue.Queue()
+        
+        self.service.attach()
+        try:
+            threads = [threading.Thread(target=self._worker, args=(tasks, results), daemon=True)
+                       for _ in range(min(self.workers, len(keywords)))]
+            for thread in threads:
+                thread.start()
+            
+            for _ in range(len(keywords)):
+                keyword, links, error = results.get()
+                on_result(keyword, links, error)
+            
+            for thread in threads:
+                thread.join()
+        
+        finally:
+            # 非常驻浏览器在这里关闭，常驻浏览器继续保留
+            self.service.detach()
+
+# ----- 常驻浏览器服务 -----
+
+# 常驻浏览器的远程调试端口：多次运行（界面或命令行）通过该端口连接同一个浏览器
+BROWSER_SERVICE_PORT = int(os.environ.get('MODEL_FINDER_BROWSER_PORT') or 9333)
+
+# 设置为1时搜索默认使用常驻浏览器
+BROWSER_SERVICE_ENV = 'MODEL_FINDER_BROWSER_SERVICE'
+
+# 常驻浏览器的用户数据目录，与日常使用的Chrome分开，避免配置目录被占用
+BROWSER_PROFILE_DIR = os.path.join(CACHE_DIR, 'browser_profile')
+
+# 标签页回收：加载的页面数或JS堆（MB）超过上限后关闭，换新标签页
+BROWSER_TAB_MAX_USES = 50
+BROWSER_TAB_HEAP_LIMIT_MB = 256
+
+# 重启策略：浏览器进程树内存（MB，需要psutil）或加载的页面数超过上限时，在两次运行之间重启；
+# 60秒内重启超过3次时先退避等待，避免反复崩溃时空转
+BROWSER_MEMORY_LIMIT_MB = 2048
+BROWSER_MAX_PAGE_LOADS = 2000
+BROWSER_MAX_RESTARTS = 3
+BROWSER_RESTART_WINDOW = 60
+
+# 健康检查超时（秒）
+BROWSER_HEALTH_TIMEOUT = 2
+
+def browser_service_enabled():
+    """环境变量MODEL_FINDER_BROWSER_SERVICE是否要求使用常驻浏览器"""
+    return os.environ.get(BROWSER_SERVICE_ENV, '').lower() in ('1', 'true', 'yes', 'on')
+
+def browser_endpoint_alive(port, host='127.0.0.1', timeout=BROWSER_HEALTH_TIMEOUT):
+    """健康检查：浏览器调试端口是否响应 /json/version"""
+    conn = http_client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request('GET', '/json/version')
+        response = conn.getresponse()
+        response.read()
+        return response.status == 200
+    except (OSError, http_client.HTTPException):
+        return False
+    finally:
+        conn.close()
+
+def _process_tree_memory_mb(pid):
+    """进程及其所有子进程的内存占用（MB），没有psutil或进程不存在时返回None"""
+    if not PSUTIL_AVAILABLE or not pid:
+        return None
+    try:
+        process = psutil.Process(pid)
+        total = 0
+        for p in [process] + process.children(recursive=True):
+            try:
+                total += p.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / (1024 * 1024)
+    except psutil.Error:
+        return None
+
+class BrowserService:
+    """浏览器的生命周期：启动或连接、健康检查、标签页回收和重启策略
+
+    每次搜索运行 attach() 取得浏览器，acquire_tab()/release_tab() 借还标签页，结束时 detach()。
+    persistent=False 时每次运行启动自己的浏览器，detach时关闭；
+    persistent=True 时使用固定的调试端口和独立的用户数据目录，detach后浏览器和空闲标签页都保留，
+    同一进程中的下一次运行直接复用，新进程连接已在运行的浏览器并接管其中的标签页。
+    """
+
+    def __init__(self, persistent=False, port=BROWSER_SERVICE_PORT, profile_dir=BROWSER_PROFILE_DIR,
+                 tab_max_uses=BROWSER_TAB_MAX_USES, memory_limit_mb=BROWSER_MEMORY_LIMIT_MB,
+                 max_page_loads=BROWSER_MAX_PAGE_LOADS):
+        self.persistent = persistent
+        self.port = port
+        self.profile_dir = profile_dir
+        self.tab_max_uses = tab_max_uses
+        self.memory_limit_mb = memory_limit_mb
+        self.max_page_loads = max_page_loads
+        self.page = None
+        self.generation = 0
+        self.idle = []          # 空闲标签页 [(标签页, 已加载页面数)]
+        self.attached = 0
+        self.page_loads = 0
+        self.restarts = deque()
+        self.lock = threading.RLock()
+
+    def _create_options(self):
+        """创建浏览器配置"""
+        print("正在准备浏览器配置...")
+        chrome_options = ChromiumOptions()
+        
+        if self.persistent:
+            # 固定端口：端口上已有浏览器时直接连接，否则在该端口启动
+            chrome_options.set_local_port(self.port)
+            os.makedirs(self.profile_dir, exist_ok=True)
+            chrome_options.set_user_data_path(self.profile_dir)
+        else:
+            # 使用默认用户数据目录 - 使用当前用户的Chrome配置
+            user_data_dir = os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Google', 'Chrome', 'User Data')
+            if os.path.exists(user_data_dir):
+                print(f"使用默认Chrome用户数据目录: {user_data_dir}")
+                chrome_options.set_user_data_path(user_data_dir)
+            else:
+                print("未找到Chrome用户数据目录，将使用临时配置文件")
+        
+        # 配置其他浏览器参数
+        chrome_options.set_argument('--disable-infobars')
+        chrome_options.set_argument('--disable-extensions')
+        chrome_options.set_argument('--no-sandbox')
+        chrome_options.set_argument('--disable-gpu')
+        chrome_options.set_argument('--disable-dev-shm-usage')
+        return chrome_options
+
+    def _launch(self, restart=False):
+        """启动浏览器，常驻模式下端口上已有浏览器时连接并接管其中的标签页"""
+        running = self.persistent and browser_endpoint_alive(self.port)
+        print(f"正在连接常驻浏览器 (127.0.0.1:{self.port})..." if running else "正在初始化浏览器...")
+        with trace_span('browser_start', 'browser', restart=restart, attach=running):
+            self.page = ChromiumPage(self._create_options())
+        self.generation += 1
+        self.page_loads = 0
+        self.idle = []
+        if not running:
+            return
+        
+        # 接管之前的运行留下的空闲标签页
+        try:
+            own = getattr(self.page, 'tab_id', None)
+            for tab_id in self.page.tab_ids:
+                if tab_id != own:
+                    self.idle.append((self.page.get_tab(tab_id), 0))
+        except Exception as e:
+            print(f"读取已有标签页失败: {e}")
+
+    def _shutdown(self):
+        """关闭浏览器"""
+        page, self.page, self.idle = self.page, None, []
+        if page is None:
+            return
+        try:
+            print("正在关闭浏览器...")
+            page.quit()
+        except Exception as e:
+            print(f"关闭浏览器时出错: {str(e)}")
+
+    def healthy(self):
+        """健康检查：（常驻模式）调试端口响应，并且能列出标签页"""
+        if self.page is None:
+            return False
+        if self.persistent and not browser_endpoint_alive(self.port):
+            return False
+        try:
+            self.page.tab_ids
+            return True
+        except Exception:
+            return False
+
+    def memory_mb(self):
+        """浏览器进程树的内存占用（MB），无法获取时返回None"""
+        try:
+            return _process_tree_memory_mb(self.page.process_id if self.page is not None else None)
+        except Exception:
+            return None
+
+    def _over_limits(self):
+        """返回需要重启的原因，没有超过上限时返回None"""
+        if self.page_loads >= self.max_page_loads:
+            return f"已加载 {self.page_loads} 个页面"
+        memory = self.memory_mb()
+        if memory is not None and memory > self.memory_limit_mb:
+            return f"内存占用 {memory:.0f}MB"
+        return None
+
+    def connect(self):
+        """确保已启动或连接浏览器（不检查重启策略），返回浏览器"""
+        with self.lock:
+            if self.page is None:
+                self._launch()
+            return self.page
+
+    def attach(self):
+        """开始一次搜索运行：健康检查失败或超过上限时重启，返回浏览器"""
+        with self.lock:
+            if self.page is not None and not self.healthy():
+                print("浏览器健康检查失败，重新启动...")
+                self._shutdown()
+                self._throttle_restart()
+            self.connect()
+            
+            # 只在没有其他运行使用浏览器时执行重启策略
+            if self.attached == 0:
+                reason = self._over_limits()
+                if reason:
+                    print(f"浏览器{reason}，超过上限，重新启动...")
+                    self._shutdown()
+                    self._throttle_restart()
+                    self._launch(restart=True)
+            self.attached += 1
+            return self.page
+
+    def detach(self):
+        """结束一次搜索运行：非常驻模式关闭浏览器，常驻模式保留浏览器和空闲标签页"""
+        with self.lock:
+            self.attached = max(0, self.attached - 1)
+            if not self.persistent and not self.attached:
+                self._shutdown()
+
+    def stop(self):
+        """关闭浏览器（常驻模式下先连接到端口上运行的浏览器）"""
+        with self.lock:
+            if self.page is None and self.persistent and browser_endpoint_alive(self.port):
+                self._launch()
+            self._shutdown()
+
+    def _throttle_restart(self):
+        """记录一次重启，短时间内重启次数过多时退避等待"""
+        now = time.monotonic()
+        while self.restarts and now - self.restarts[0] > BROWSER_RESTART_WINDOW:
+            self.restarts.popleft()
+        if len(self.restarts) >= BROWSER_MAX_RESTARTS:
+            delay = backoff_delay(len(self.restarts))
+            print(f"浏览器频繁重启，等待 {delay:.1f} 秒")
+            time.sleep(delay)
+        self.restarts.append(time.monotonic())
+
+    def restart(self, generation):
+        """浏览器连接断开时重新启动，多个线程同时发现时只重启一次"""
+        with self.lock:
+            if generation != self.generation:
+                return
+            print("浏览器连接断开，尝试重新创建实例...")
+            trace_count('browser_reconnects')
+            self._shutdown()
+            self._throttle_restart()
+            self._launch(restart=True)
+
+    def acquire_tab(self):
+        """借出标签页，优先复用空闲标签页，返回 (标签页, 浏览器代数, 已加载页面数)"""
+        with self.lock:
+            if self.idle:
+                tab, uses = self.idle.pop()
+                return tab, self.generation, uses
+            tab = self.page.new_tab()
+            # DrissionPage 3.x 返回标签页ID
+            if isinstance(tab, str):
+                tab = self.page.get_tab(tab)
+            return tab, self.generation, 0
+
+    def record_load(self):
+        """记录一次页面加载"""
+        with self.lock:
+            self.page_loads += 1
+
+    @staticmethod
+    def _tab_heap_mb(tab):
+        try:
+            used = tab.run_js('return performance.memory ? performance.memory.usedJSHeapSize : 0')
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0
+
+    def release_tab(self, tab, generation, uses):
+        """归还标签页：超过使用次数或JS堆上限的关闭回收，其余放回空闲列表"""
+        keep = (generation == self.generation and self.page is not None and uses < self.tab_max_uses
+                and self._tab_heap_mb(tab) < BROWSER_TAB_HEAP_LIMIT_MB)
+        if keep and self.persistent:
+            # 常驻浏览器中的空闲标签页清空页面，释放内存
+            try:
+                tab.get('about:blank')
+            except Exception:
+                keep = False
+        if keep:
+            with self.lock:
+                if generation == self.generation:
+                    self.idle.append((tab, uses))
+                    return
+        
+        trace_count('browser_tabs_recycled')
+        try:
+            tab.close()
+        except Exception:
+            pass
+
+    def status(self):
+        """服务状态，用于命令行和健康检查"""
+        with self.lock:
+            return {
+                'persistent': self.persistent,
+                'port': self.port if self.persistent else None,
+                'running': self.healthy(),
+                'generation': self.generation,
+                'attached': self.attached,
+                'idle_tabs': len(self.idle),
+                'page_loads': self.page_loads,
+                'memory_mb': self.memory_mb(),
+            }
+
+# 进程内共享的常驻浏览器服务
+_browser_service = None
+_browser_service_lock = threading.Lock()
+
+def get_browser_service():
+    """返回进程内共享的常驻浏览器服务（第一次调用时创建，不启动浏览器）"""
+    global _browser_service
+    with _browser_service_lock:
+        if _browser_service is None:
+            _browser_service = BrowserService(persistent=True)
+        return _browser_service
+
+# ----- Hugging Face API搜索 -----
+
+# Hugging Face兼容API地址，可指向hf-mirror.com或本地服务（与huggingface_hub一样读取HF_ENDPOINT）
+HF_ENDPOINT = os.environ.get('HF_ENDPOINT') or 'https://huggingface.co'
+
+# 生成的下载链接使用的主机
+HF_DOWNLOAD_BASE = 'https://huggingface.co'
+
+# API搜索的默认并发请求数
+HF_SEARCH_CONCURRENCY = 16
+
+# 每个搜索词检查的候选仓库数
+HF_SEARCH_CANDIDATES = 5
+
+# 搜索后端环境变量：bing 或 hf
+SEARCH_BACKEND_ENV = 'MODEL_FINDER_SEARCH_BACKEND'
+
+def _hf_search_terms(file_name, max_terms=3):
+    """由文件名生成仓库搜索词：完整文件名主干，再逐段去掉末尾的后缀（如_fp16、-Q4_K_M）"""
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    terms = []
+    while stem and len(terms) < max_terms:
+        if len(stem) >= 3 and stem not in terms:
+            terms.append(stem)
+        cut = max(stem.rfind('_'), stem.rfind('-'), stem.rfind('.'))
+        if cut <= 0:
+            break
+        stem = stem[:cut]
+    return terms
+
+class HuggingFaceSearchBackend(SearchBackend):
+    """通过Hugging Face兼容API解析文件名，不需要浏览器
+
+    在线程池中并发解析关键词，每个关键词先按下载量搜索候选仓库，
+    再并发读取候选仓库的文件列表匹配文件名；HTTP请求走共享的keep-alive连接池。
+    """
+
+    name = 'hf-api'
+
+    def __init__(self, base_url=None, concurrency=HF_SEARCH_CONCURRENCY, candidates=HF_SEARCH_CANDIDATES,
+                 download_base=HF_DOWNLOAD_BASE, token=None):
+        super().__init__()
+        self.base_url = (base_url or HF_ENDPOINT).rstrip('/')
+        self.download_base = download_base.rstrip('/')
+        self.concurrency = max(1, concurrency)
+        self.candidates = candidates
+        headers = {'Accept': 'application/json'}
+        token = token or os.environ.get('HF_TOKEN')
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        self.pool = HttpConnectionPool(max_idle_per_host=self.concurrency, headers=headers)
+        self.repo_files = {}
+        self.repo_lock = threading.Lock()
+        self.repo_executor = None
+
+    def _get_json(self, path):
+        """通过连接池发送GET请求"""
+        response = self.pool.request('GET', self.base_url + path)
+        if response.status == 404:
+            return None
+        if response.status != 200:
+            raise http_client.HTTPException(f"HTTP {response.status}: {path}")
+        return response.json()
+
+    def _fetch_repo_files(self, repo_id):
+        info = self._get_json(f"/api/models/{quote(repo_id)}?blobs=true")
+        siblings = [s for s in (info or {}).get('siblings', []) if s.get('rfilename')]
+        # 登记到仓库文件列表索引，同仓库的其他文件直接匹配，下次运行也不必重新请求
+        if info and self.repo_trees is not None:
+            self.repo_trees.add_tree(repo_id, _tree_from_siblings(siblings))
+        return siblings
+
+    def _list_repo_files(self, repo_id):
+        """读取仓库文件列表（含LFS哈希）的Future，同一次运行中每个仓库只请求一次"""
+        with self.repo_lock:
+            if repo_id not in self.repo_files:
+                self.repo_files[repo_id] = self.repo_executor.submit(self._fetch_repo_files, repo_id)
+            return self.repo_files[repo_id]
+
+    def _resolve(self, keyword):
+        """解析单个文件名，返回 (下载链接, 镜像链接)，未找到返回None"""
+        if self.repo_trees is not None:
+            links = self.repo_trees.lookup(keyword)
+            if links:
+                print(f"仓库文件列表命中 ({keyword}): {links[0]}")
+                return links
+        target = normalize_model_name(keyword)
+        checked = set()
+        for term in _hf_search_terms(keyword):
+            query = urlencode({'search': term, 'sort': 'downloads', 'direction': -1, 'limit': self.candidates})
+            models = self._get_json(f"/api/models?{query}") or []
+            repo_ids = [m['id'] for m in models if m.get('id') and m['id'] not in checked]
+            checked.update(repo_ids)
+            if not repo_ids:
+                continue
+            
+            # 并发读取候选仓库的文件列表，按下载量顺序取第一个匹配
+            futures = [self._list_repo_files(r) for r in repo_ids]
+            for repo_id, future in zip(repo_ids, futures):
+                for sibling in future.result():
+                    path = sibling['rfilename']
+                    if normalize_model_name(path) == target:
+                        lfs = sibling.get('lfs') or {}
+                        if lfs.get('sha256') and lfs.get('size'):
+                            self.file_hashes[keyword] = (lfs['sha256'], lfs['size'])
+                        download_link = f"{self.download_base}/{repo_id}/resolve/main/{quote(path)}"
+                        print(f"找到模型 ({keyword}): {repo_id}/{path}")
+                        return download_link, get_mirror_link(download_link)
+        return None
+
+    def _resolve_one(self, keyword):
+        try:
+            with trace_span('search_keyword', 'search', keyword=keyword):
+                return keyword, self._resolve(keyword), None
+        except Exception as e:
+            return keyword, None, str(e)
+
+    def search_all(self, keywords, on_result):
+        print(f"使用Hugging Face API: {self.base_url}（并发 {self.concurrency}）")
+        self.repo_files = {}
+        self.file_hashes = {}
+        # 仓库文件列表用单独的线程池读取，关键词线程等待它们时不会占满同一个池
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as repo_executor:
+            self.repo_executor = repo_executor
+            try:
+                futures = [executor.submit(self._resolve_one, keyword) for keyword in keywords]
+                for future in as_completed(futures):
+                    on_result(*future.result())
+            finally:
+                self.repo_executor = None
+                self.pool.close()
+
+def get_search_backend(name=None, workers=None, base_url=None, browser_service=None):
+    """按名称创建搜索后端：bing（浏览器）或 hf（Hugging Face API）
+
+    未指定时读取环境变量MODEL_FINDER_SEARCH_BACKEND，
+    仍未指定则在DrissionPage可用时使用bing，否则使用hf。
+    browser_service: True使用进程内共享的常驻浏览器（见get_browser_service），也可以传入BrowserService；
+    未指定时读取环境变量MODEL_FINDER_BROWSER_SERVICE
+    """
+    name = (name or os.environ.get(SEARCH_BACKEND_ENV) or ('bing' if DRISSION_AVAILABLE else 'hf')).lower()
+    if name in ('hf', 'hf-api', 'huggingface'):
+        return HuggingFaceSearchBackend(base_url=base_url, concurrency=workers or HF_SEARCH_CONCURRENCY)
+    if name == 'bing':
+        if browser_service is None:
+            browser_service = browser_service_enabled()
+        if browser_service is True:
+            browser_service = get_browser_service()
+        return BrowserSearchBackend(workers=workers or SEARCH_WORKERS, service=browser_service or None)
+    raise ValueError(f"未知的搜索后端: {name}")
+
+# ----- 搜索进度日志 -----
+
+# 进度日志每追加多少条执行一次fsync
+JOURNAL_FSYNC_BATCH = 8
+
+# 默认只在搜索结束时把进度日志压缩回CSV
+JOURNAL_COMPACT_INTERVAL = 0
+
+def save_csv(df, csv_file):
+    """原子地写入CSV：先写临时文件再替换，写入中途崩溃不会损坏原文件"""
+    with trace_span('save_csv', rows=len(df)):
+        tmp_file = csv_file + '.tmp'
+        df.to_csv(tmp_file, index=False, encoding='utf-8-sig')
+        os.replace(tmp_file, csv_file)
+
+class SearchJournal:
+    """追加写入的搜索进度日志，保存在CSV旁边
+
+    每个解析完成的文件名写一行JSON，按批fsync；重启时重放日志即可从中断处继续，
+    日志中的文件名（包括未找到和出错的）在本次运行中不再搜索。
+    搜索结束时把结果压缩回CSV并删除日志；按间隔压缩时保留未找到和出错的条目，
+    它们在CSV中不算已处理，续搜时仍要靠日志跳过。
+    """
+
+    def __init__(self, csv_file, fsync_batch=JOURNAL_FSYNC_BATCH):
+        self.path = os.path.splitext(csv_file)[0] + '.journal.jsonl'
+        self.fsync_batch = fsync_batch
+        self.file = None
+        self.pending = 0
+        # 已写入日志的规范化文件名，以及压缩时需要保留的条目
+        self.done = set()
+        self.retained = []
+
+    def replay(self, df):
+        """把日志中的结果写回DataFrame，返回重放的条数；崩溃时写了一半的最后一行会被忽略"""
+        if not os.path.exists(self.path):
+            return 0
+
+        count = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+
+                # 只写回文件名仍然一致的行，防止CSV在两次运行之间被修改
+                name = normalize_model_name(entry['file_name'])
+                rows = [idx for idx in entry['rows']
+                        if idx in df.index and normalize_model_name(_cell_text(df.at[idx, '文件名'])) == name]
+                set_search_result(df, rows, entry['download_link'], entry['mirror_link'], entry['status'])
+                self._remember(entry)
+                count += 1
+        return count
+
+    def _remember(self, entry):
+        self.done.add(normalize_model_name(entry['file_name']))
+        if entry['status'] != '已处理':
+            self.retained.append(entry)
+
+    def append(self, file_name, rows, download_link, mirror_link, status):
+        """追加一条结果"""
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        entry = {
+            'file_name': file_name,
+            'rows': [int(idx) for idx in rows],
+            'download_link': download_link,
+            'mirror_link': mirror_link,
+            'status': status,
+        }
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self._remember(entry)
+
+        self.pending += 1
+        if self.pending >= self.fsync_batch:
+            self.sync()
+
+    def sync(self):
+        """把已追加的结果刷到磁盘"""
+        if self.file is not None and self.pending:
+            os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+    def truncate(self):
+        """CSV已包含所有结果后清空日志，只保留未找到和出错的条目"""
+        self.close()
+        tmp_file = self.path + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for entry in self.retained:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_file, self.path)
+
+    def remove(self):
+        """压缩完成后删除日志"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def _cell_text(value):
+    """把CSV单元格转换为字符串，空值（NaN）返回空字符串"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ''
+    return str(value)
+
+def plan_searches(df, done=()):
+    """规划搜索：按规范化文件名（大小写、路径分隔符、空白）分组，每个唯一文件名只搜索一次
+
+    已处理的行把结果直接复制给同名的未处理行，已识别为本地文件的行不搜索。
+    done: 本次运行已有结果的规范化文件名（进度日志中的条目），不再搜索
+    返回 原始文件名 -> 行号列表，只包含需要搜索的文件名。
+    """
+    groups = {}
+    for idx, name, status, link, mirror in zip(df.index, df['文件名'], df['搜索状态'],
+                                                df['下载链接'], df['镜像链接']):
+        name = _cell_text(name).strip()
+        if not name or _cell_text(status) == LOCAL_MATCH_STATUS:
+            continue
+        
+        group = groups.setdefault(normalize_model_name(name), {'keyword': name, 'rows': [], 'done': None})
+        group['rows'].append(idx)
+        if group['done'] is None and _cell_text(status) == '已处理' and _cell_text(link):
+            group['done'] = (_cell_text(link), _cell_text(mirror))
+    
+    plan = {}
+    for group in groups.values():
+        if group['done']:
+            print(f"跳过已处理的关键词: {group['keyword']}")
+            set_search_result(df, group['rows'], *group['done'])
+        elif normalize_model_name(group['keyword']) in done:
+            print(f"跳过进度日志中的关键词: {group['keyword']}")
+        else:
+            plan[group['keyword']] = group['rows']
+    return plan
+
+def set_search_result(df, rows, download_link='', mirror_link='', status='已处理'):
+    """把一个文件名的搜索结果写入所有对应行，未找到或出错时只更新状态"""
+    for idx in rows:
+        if status == '已处理':
+            df.at[idx, '下载链接'] = download_link
+            df.at[idx, '镜像链接'] = mirror_link
+        df.at[idx, '搜索状态'] = status
+
+def search_model_links(csv_file, status_callback=None, progress_callback=None, cache=None, use_cache=True,
+                       search_workers=None, backend=None, compact_interval=JOURNAL_COMPACT_INTERVAL,
+                       html_mode=None, verify=False, mirrors=None, use_catalog=True, expand_repos=True):
+    """查找模型下载链接（默认使用Bing搜索引擎）
+
+    cache: ResolutionCache实例，默认使用CACHE_DIR下的共享缓存
+    use_cache: 为False时不读写缓存
+    search_workers: 并发数（浏览器标签页数或HTTP并发请求数）
+    backend: SearchBackend实例或后端名称（'bing' / 'hf'），默认见get_search_backend
+    compact_interval: 每解析多少个关键词把进度日志压缩回CSV和HTML，0表示只在结束时压缩
+    html_mode: HTML视图模式（'table' / 'compact'），默认按行数自动选择，见create_html_view
+    verify: 搜索完成后验证所有链接，见verify_links
+    mirrors: 镜像列表，镜像列使用其中测速最快的可用镜像，默认见get_mirrors
+    use_catalog: 先查询离线模型目录（见ModelCatalog），命中的文件不再访问网络
+    expand_repos: 搜索命中后取回整个仓库的文件列表，同仓库的其他文件不再搜索（见RepoTreeIndex）
+    """
+    selector = None
+    trees = None
+    owns_cache = False
+    try:
+        # 读取CSV文件
+        with trace_span('read_csv'):
+            try:
+                df = pd.read_csv(csv_file, encoding='utf-8')
+            except Exception:
+                df = pd.read_csv(csv_file, encoding='utf-8-sig')
+        
+        # 检查必要的列是否存在
+        if '文件名' not in df.columns:
+            print("错误: CSV文件必须包含'文件名'列")
+            return False
+        
+        # 添加必要的列（统一为object类型，空列读入时是float，不能直接写入链接）
+        for col in ['下载链接', '镜像链接', '搜索状态']:
+            if col not in df.columns:
+                print(f"添加缺失列: '{col}'")
+                df[col] = ''
+            df[col] = df[col].astype(object)
+
+        # 重放上次中断时留下的进度日志
+        journal = SearchJournal(csv_file)
+        with trace_span('journal_replay'):
+            replayed = journal.replay(df)
+        if replayed:
+            print(f"从进度日志恢复 {replayed} 条结果: {journal.path}")
+
+        # 规划搜索：每个唯一文件名只搜索一次，结果写入所有对应行
+        plan = plan_searches(df, journal.done)
+        keywords = list(plan)
+
+        if not keywords:
+            print("没有找到需要处理的关键词")
+            save_csv(df, csv_file)
+            journal.remove()
+            return True
+
+        print(f"找到 {len(keywords)} 个需要处理的关键词（共 {sum(len(rows) for rows in plan.values())} 行）")
+        
+        # 先查询搜索结果缓存，命中的关键词不再打开浏览器
+        if use_cache and cache is None:
+            cache = ResolutionCache()
+            owns_cache = True
+        selector = MirrorSelector(mirrors, cache if use_cache else None)
+        
+        # 先查询离线模型目录，常见模型不需要任何网络请求
+        if use_catalog:
+            catalogs = open_catalogs()
+            remaining = []
+            catalog_hashes = {}
+            try:
+                for keyword in keywords:
+                    entry = lookup_catalogs(catalogs, keyword)
+                    if entry is None:
+                        remaining.append(keyword)
+                        continue
+                    trace_count('catalog_hits')
+                    download_link = catalog_link(entry)
+                    set_search_result(df, plan[keyword], download_link,
+                                      selector.mirror_link(download_link) or get_mirror_link(download_link))
+                    if entry['sha256'] and entry['size']:
+                        catalog_hashes[keyword] = (entry['sha256'], entry['size'])
+                    print(f"模型目录命中: {keyword} -> {download_link}")
+            finally:
+                for catalog in catalogs:
+                    catalog.close()
+            
+            if len(remaining) < len(keywords):
+                print(f"模型目录命中 {len(keywords) - len(remaining)} 个，还需查询 {len(remaining)} 个")
+                save_csv(df, csv_file)
+                if use_cache:
+                    record_known_hashes(catalog_hashes, source='catalog')
+            keywords = remaining
+        
+        if use_cache:
+            remaining = []
+            for keyword in keywords:
+                with trace_span('cache_lookup', 'cache'):
+                    entry = cache.get(keyword)
+                if entry is None:
+                    trace_count('cache_misses')
+                    remaining.append(keyword)
+                    continue
+                trace_count('cache_hits')
+                
+                if entry['found']:
+                    mirror_link = selector.mirror_link(entry['download_link']) or entry['mirror_link']
+                    set_search_result(df, plan[keyword], entry['download_link'], mirror_link)
+                else:
+                    set_search_result(df, plan[keyword], status='未找到')
+                print(f"缓存命中: {keyword} -> {entry['download_link'] or '未找到'}")
+            
+            if len(remaining) < len(keywords):
+                print(f"缓存命中 {len(keywords) - len(remaining)} 个，需要搜索 {len(remaining)} 个")
+                save_csv(df, csv_file)
+            keywords = remaining
+        
+        # 再用缓存的仓库文件列表匹配剩余的文件名，只有仍未匹配的才发起搜索
+        trees = RepoTreeIndex(cache if use_cache else None) if expand_repos else None
+        if trees is not None and keywords and len(trees):
+            remaining = []
+            for keyword in keywords:
+                links = trees.lookup(keyword)
+                if links is None:
+                    remaining.append(keyword)
+                    continue
+                download_link, mirror_link = links
+                set_search_result(df, plan[keyword], download_link,
+                                  selector.mirror_link(download_link) or mirror_link)
+                if use_cache:
+                    cache.put(keyword, download_link, mirror_link, source='repo-tree')
+                print(f"仓库文件列表命中: {keyword} -> {download_link}")
+            
+            if len(remaining) < len(keywords):
+                print(f"仓库文件列表命中 {len(keywords) - len(remaining)} 个，需要搜索 {len(remaining)} 个")
+                save_csv(df, csv_file)
+                if use_cache:
+                    record_known_hashes(trees.file_hashes, source='repo-tree')
+                    trees.file_hashes = {}
+            keywords = remaining
+        
+        if backend is None or isinstance(backend, str):
+            backend = get_search_backend(backend, workers=search_workers)
+        if keywords and not backend.check():
+            return False
+        
+        if not keywords:
+            print("所有关键词均已从模型目录或缓存中获取，无需启动浏览器")
+            save_csv(df, csv_file)
+            journal.remove()
+            if verify:
+                verify_links(csv_file, use_cache=use_cache, cache=cache, progress_callback=progress_callback)
+            html_file = create_html_view(csv_file, html_mode)
+            if html_file:
+                print(f"已生成HTML结果文件: {html_file}")
+                return html_file
+            return True
+        
+        # 用搜索后端并发解析，结果在当前线程中依次写入
+        print(f"使用搜索后端: {backend.name}")
+        total = len(keywords)
+        done = 0
+        
+        def on_result(keyword, links, error):
+            nonlocal done
+            done += 1
+            
+            download_link, mirror_link = links or ('', '')
+            mirror_link = selector.mirror_link(download_link) or mirror_link
+            if error:
+                print(f"处理关键词 {keyword} 时发生错误: {error}")
+                status = '处理错误'
+            elif links:
+                print(f"生成下载链接: {download_link}")
+                print(f"生成镜像链接: {mirror_link}")
+                status = '已处理'
+                if use_cache:
+                    cache.put(keyword, download_link, mirror_link, source=backend.name)
+            else:
+                # 如果搜索失败，标记为未找到
+                print(f"未能找到模型 {keyword} 的下载链接")
+                status = '未找到'
+                if use_cache:
+                    cache.put(keyword, source=backend.name, found=False)
+
+            # 保存结果到该文件名对应的所有行，并追加到进度日志（不再每次重写整个CSV）
+            set_search_result(df, plan[keyword], download_link, mirror_link, status)
+            journal.append(keyword, plan[keyword], download_link, mirror_link, status)
+            print(f"已记录当前进度 ({done}/{total})")
+
+            # 按间隔把进度日志压缩回CSV和HTML
+            if compact_interval and done % compact_interval == 0 and done < total:
+                save_csv(df, csv_file)
+                journal.truncate()
+                create_html_view(csv_file, html_mode)
+
+            # 更新进度
+            if progress_callback:
+                progress_callback(done, total)
+        
+        backend.repo_trees = trees
+        completed = False
+        try:
+            with trace_span('search_all', backend=backend.name, keywords=total):
+                backend.search_all(keywords, on_result)
+            completed = True
+        finally:
+            backend.repo_trees = None
+            if use_cache:
+                cache.evict()
+
+            # 把进度日志压缩回CSV，成功写入后删除日志；中断时保留未找到和出错的条目，续搜时跳过
+            journal.sync()
+            save_csv(df, csv_file)
+            if completed:
+                journal.remove()
+            else:
+                journal.truncate()
+
+        # 记录搜索后端得到的文件哈希，以后分析时可以按内容识别重命名过的模型
+        if use_cache:
+            record_known_hashes(backend.file_hashes, source=backend.name)
+            if trees is not None:
+                record_known_hashes(trees.file_hashes, source='repo-tree')
+
+        if verify:
+            verify_links(csv_file, use_cache=use_cache, cache=cache, progress_callback=progress_callback)
+
+        # 创建HTML视图
+        html_file = create_html_view(csv_file, html_mode)
+        if html_file:
+            print(f"已生成HTML结果文件: {html_file}")
+            return html_file
+        
+        return True
+    
+    except Exception as e:
+        print(f"处理CSV文件时发生错误: {str(e)}")
+        return False
+    
+    finally:
+        if selector is not None:
+            selector.close()
+        if trees is not None:
+            trees.close()
+        if owns_cache:
+            cache.close()
+
+# ----- 链接验证 -----
+
+# 并发验证的链接数
+VERIFY_CONCURRENCY = 32
+
+# 单个链接的超时（秒）
+VERIFY_TIMEOUT = 15
+
+# 验证结果写入的CSV列
+VERIFY_COLUMNS = ('下载链接状态', '镜像链接状态', '文件大小', 'ETag')
+
+def check_link(pool, url):
+    """用HEAD请求检查链接，服务器不支持HEAD时改用只请求1字节的Range GET
+
+    返回 {'status': HTTP状态码（连接失败为0）, 'content_length': 文件大小或None, 'etag': ETag, 'error': 错误信息}
+    """
+    try:
+        response = pool.request('HEAD', url)
+        if response.status in (405, 501):
+            response = pool.request('GET', url, headers={'Range': 'bytes=0-0'}, max_body=1)
+    except Exception as e:
+        return {'status': 0, 'content_length': None, 'etag': '', 'error': str(e) or type(e).__name__}
+    
+    headers = response.headers
+    content_length = None
+    total = headers.get('content-range', '').rsplit('/', 1)[-1]
+    if response.status == 206 and total.isdigit():
+        content_length = int(total)
+    elif headers.get('content-length', '').isdigit():
+        content_length = int(headers['content-length'])
+    
+    etag = headers.get('etag', '').strip()
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    return {'status': response.status, 'content_length': content_length, 'etag': etag.strip('"'), 'error': ''}
+
+def is_link_ok(result):
+    return bool(result) and 200 <= result['status'] < 300
+
+def _link_status_text(result):
+    if not result:
+        return ''
+    if result['status']:
+        return str(result['status'])
+    return f"错误: {result['error']}"
+
+def verify_links(csv_file, concurrency=VERIFY_CONCURRENCY, use_cache=True, cache=None, pool=None,
+                 progress_callback=None):
+    """并发验证CSV中的下载链接和镜像链接，把状态码、文件大小和ETag写入新列
+
+    同一个链接只验证一次，结果缓存在ResolutionCache中。
+    返回 (有效链接数, 链接总数)
+    """
+    try:
+        df = pd.read_csv(csv_file, encoding='utf-8')
+    except Exception:
+        df = pd.read_csv(csv_file, encoding='utf-8-sig')
+    
+    for col in ('下载链接', '镜像链接') + VERIFY_COLUMNS:
+        if col not in df.columns:
+            df[col] = ''
+        df[col] = df[col].astype(object)
+    
+    # 收集所有不重复的链接
+    urls = list(dict.fromkeys(url for col in ('下载链接', '镜像链接')
+                              for url in map(_cell_text, df[col]) if url.strip()))
+    
+    results = {}
+    if use_cache and cache is None:
+        cache = ResolutionCache()
+    if use_cache:
+        for url in urls:
+            result = cache.get_link(url)
+            if result:
+                results[url] = result
+        if results:
+            trace_count('link_cache_hits', len(results))
+            print(f"链接验证缓存命中 {len(results)} 个")
+    
+    pending = [url for url in urls if url not in results]
+    if pending:
+        print(f"验证 {len(pending)} 个链接（并发 {concurrency}）...")
+        own_pool = pool is None
+        if own_pool:
+            pool = HttpConnectionPool(max_idle_per_host=concurrency, timeout=VERIFY_TIMEOUT)
+        try:
+            with trace_span('verify_links', links=len(pending)), ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = {executor.submit(check_link, pool, url): url for url in pending}
+                for done, future in enumerate(as_completed(futures), 1):
+                    url = futures[future]
+                    result = results[url] = future.result()
+                    if use_cache:
+                        cache.put_link(url, result)
+                    if not is_link_ok(result):
+                        print(f"链接无效 ({_link_status_text(result)}): {url}")
+                    if progress_callback:
+                        progress_callback(done, len(pending))
+        finally:
+            if own_pool:
+                pool.close()
+    
+    if use_cache:
+        cache.evict()
+    
+    # 写入验证结果，文件大小和ETag取第一个有效的链接
+    for idx, link, mirror in zip(df.index, df['下载链接'], df['镜像链接']):
+        link_result = results.get(_cell_text(link).strip())
+        mirror_result = results.get(_cell_text(mirror).strip())
+        df.at[idx, '下载链接状态'] = _link_status_text(link_result)
+        df.at[idx, '镜像链接状态'] = _link_status_text(mirror_result)
+        valid = next((r for r in (link_result, mirror_result) if is_link_ok(r)), None)
+        df.at[idx, '文件大小'] = valid['content_length'] if valid and valid['content_length'] is not None else ''
+        df.at[idx, 'ETag'] = valid['etag'] if valid else ''
+    save_csv(df, csv_file)
+    
+    valid_count = sum(1 for url in urls if is_link_ok(results.get(url)))
+    print(f"链接验证完成: {valid_count}/{len(urls)} 个链接有效")
+    return valid_count, len(urls)
+
+# ----- 模型下载 -----
+
+# 每个文件的并发连接数（按Range分段下载）
+DOWNLOAD_CONNECTIONS = 8
+
+# 同时下载的文件数
+DOWNLOAD_FILES = 2
+
+# 分段的最小大小，较小的文件少分段或不分段
+DOWNLOAD_MIN_SEGMENT = 16 * 1024 * 1024
+
+# 每次读取和写入的块大小
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 断点续传状态的保存间隔（秒）
+DOWNLOAD_STATE_INTERVAL = 2
+
+# 下载连接的超时（秒）
+DOWNLOAD_TIMEOUT = 60
+
+def download_target(models_dir, node_type, file_name):
+    """计算下载的目标路径：模型目录/子目录/文件名（保留工作流中的相对子目录，去掉".."等不安全部分）"""
+    parts = [p for p in _cell_text(file_name).replace('\\', '/').split('/') if p not in ('', '.', '..')]
+    return os.path.join(models_dir, model_folder_for(node_type), *parts)
+
+def parse_rate(text):
+    """解析带宽限制，如 "10M"、"500K"、"1048576"，返回字节/秒"""
+    text = str(text).strip().upper().rstrip('B').rstrip('/S')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
+
+class SegmentedDownloader:
+    """多连接分段下载器
+
+    服务器支持Range时把文件拆成多段并发下载到.part文件，每段的进度保存在.part.json中，
+    中断后重新运行会从每段已完成的位置继续；全部完成后原子地重命名为目标文件。
+    续传状态按目标文件和文件大小记录，与下载地址无关，换镜像或换回原始链接时也会接着下载。
+    所有文件共享一个keep-alive连接池和一个带宽限速器。
+    """
+
+    def __init__(self, connections=DOWNLOAD_CONNECTIONS, bandwidth=None, pool=None, max_retries=5,
+                 progress_callback=None):
+        self.connections = max(1, connections)
+        self.limiter = TokenBucket(bandwidth, bandwidth) if bandwidth else None
+        self.pool = pool or HttpConnectionPool(max_idle_per_host=self.connections * DOWNLOAD_FILES,
+                                               timeout=DOWNLOAD_TIMEOUT)
+        self.max_retries = max_retries
+        self.progress_callback = progress_callback
+        self.lock = threading.Lock()
+        self.done_bytes = 0
+        self.total_bytes = 0
+        self.reported_at = 0
+
+    def _progress(self, done=0, total=0):
+        """累加所有文件的下载量，按间隔回调 progress_callback(已下载字节, 总字节)"""
+        with self.lock:
+            self.done_bytes += done
+            self.total_bytes += total
+            now = time.monotonic()
+            if not self.progress_callback or (now - self.reported_at < 0.2 and self.done_bytes < self.total_bytes):
+                return
+            self.reported_at = now
+            current, total = self.done_bytes, self.total_bytes
+        self.progress_callback(current, total)
+
+    def _probe(self, url):
+        """请求第一个字节，返回 (重定向后的地址, 文件大小, ETag, 是否支持Range)"""
+        response, final_url = self.pool.open_redirected('GET', url, {'Range': 'bytes=0-0'})
+        try:
+            if response.status == 206:
+                total = (response.getheader('Content-Range') or '').rsplit('/', 1)[-1]
+                size, ranges = (int(total), True) if total.isdigit() else (None, False)
+            elif response.status == 200:
+                size, ranges = response.length, False
+            else:
+                raise http_client.HTTPException(f"HTTP {response.status}: {url}")
+            etag = (response.getheader('ETag') or '').strip()
+        finally:
+            # 只有1字节的响应读完后归还连接，给后面的分段复用
+            if response.status == 206 and response.length == 1:
+                response.read()
+                self.pool.release(response)
+            else:
+                self.pool.discard(response)
+        return final_url, size, etag, ranges
+
+    def _plan_segments(self, size, ranges):
+        """把文件按大小均分为若干段：[起始位置, 结束位置(含), 已下载字节数]"""
+        if not ranges or not size:
+            return [[0, size - 1 if size else None, 0]]
+        count = max(1, min(self.connections, size // DOWNLOAD_MIN_SEGMENT))
+        bounds = [size * i // count for i in range(count + 1)]
+        return [[bounds[i], bounds[i + 1] - 1, 0] for i in range(count)]
+
+    @staticmethod
+    def _load_state(state_file, dest, url, size, etag):
+        """读取断点续传状态，不是同一个文件（文件名或大小不同）时返回None
+
+        各镜像返回的ETag格式不一样，只有同一个地址的ETag变化时才认为文件在服务器上被更新了。
+        """
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('file') != os.path.basename(dest) or size is None or state.get('size') != size:
+            return None
+        if state.get('url') == url and state.get('etag') and etag and state['etag'] != etag:
+            return None
+        return state
+
+    @staticmethod
+    def _save_state(state, state_file):
+        tmp_file = state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, state_file)
+
+    def _download_segment(self, url, part_file, segment, ranges, on_chunk):
+        """下载一段，出错时从已下载的位置重试"""
+        for retry in range(self.max_retries + 1):
+            start, end, done = segment
+            if end is not None and start + done > end:
+                return
+            
+            response = None
+            try:
+                headers = {'Range': f"bytes={start + done}-{'' if end is None else end}"} if ranges else None
+                response, _ = self.pool.open_redirected('GET', url, headers)
+                if response.status != (206 if ranges else 200):
+                    raise http_client.HTTPException(f"HTTP {response.status}: {url}")
+                
+                # 不支持Range时只能从头下载，之前计入进度的字节要先减掉
+                if not ranges and segment[2]:
+                    on_chunk(-segment[2])
+                    segment[2] = 0
+                with open(part_file, 'r+b', buffering=0) as f:
+                    f.seek(start + segment[2])
+                    while True:
+                        chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        if self.limiter:
+                            self.limiter.acquire(len(chunk))
+                        f.write(chunk)
+                        segment[2] += len(chunk)
+                        on_chunk(len(chunk))
+                self.pool.release(response)
+                response = None
+                
+                if end is None or start + segment[2] > end:
+                    return
+                raise http_client.IncompleteRead(b'', end - start - segment[2] + 1)
+            except Exception as e:
+                if response is not None:
+                    self.pool.discard(response)
+                if retry == self.max_retries:
+                    raise
+                print(f"分段下载出错，{retry+1}/{self.max_retries} 次重试: {e}")
+                time.sleep(backoff_delay(retry))
+
+    def download(self, url, dest):
+        """下载单个文件到dest，失败时抛出异常并保留.part文件供下次续传"""
+        part_file = dest + '.part'
+        state_file = part_file + '.json'
+        final_url, size, etag, ranges = self._probe(url)
+        
+        state = self._load_state(state_file, dest, url, size, etag) if os.path.exists(part_file) else None
+        if state is None or not ranges:
+            state = {'file': os.path.basename(dest), 'url': url, 'size': size, 'etag': etag,
+                     'segments': self._plan_segments(size, ranges)}
+            os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+            with open(part_file, 'wb') as f:
+                if size:
+                    f.truncate(size)
+            self._save_state(state, state_file)
+        else:
+            # 记下本次的地址和ETag，之后再从这个地址续传时用来判断文件是否变化
+            if state['url'] != url:
+                print(f"换下载地址后继续下载: {os.path.basename(dest)}")
+            else:
+                print(f"继续下载: {os.path.basename(dest)}")
+            state['url'], state['etag'] = url, etag
+        
+        segments = state['segments']
+        self._progress(sum(s[2] for s in segments), size or 0)
+        state_lock = threading.Lock()
+        saved_at = [time.monotonic()]
+        
+        def on_chunk(length):
+            self._progress(length)
+            # 定期保存每段的进度，中断后可以续传
+            with state_lock:
+                if time.monotonic() - saved_at[0] >= DOWNLOAD_STATE_INTERVAL:
+                    saved_at[0] = time.monotonic()
+                    self._save_state(state, state_file)
+        
+        try:
+            if len(segments) == 1:
+                self._download_segment(final_url, part_file, segments[0], ranges, on_chunk)
+            else:
+                with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+                    futures = [executor.submit(self._download_segment, final_url, part_file, s, ranges, on_chunk)
+                               for s in segments]
+                    for future in futures:
+                        future.result()
+        finally:
+            with state_lock:
+                self._save_state(state, state_file)
+        
+        written = sum(s[2] for s in segments)
+        if size is not None and written != size:
+            raise http_client.IncompleteRead(b'', size - written)
+        
+        # 数据落盘后再原子地替换为目标文件
+        with open(part_file, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(part_file, dest)
+        os.remove(state_file)
+        return dest
+
+    def close(self):
+        self.pool.close()
+
+def download_models(csv_file, models_dir, connections=DOWNLOAD_CONNECTIONS, max_files=DOWNLOAD_FILES,
+                    bandwidth=None, prefer_mirror=True, progress_callback=None, pool=None, mirrors=None,
+                    cache=None):
+    """按结果CSV下载模型到models_dir下对应的子目录
+
+    Hugging Face的文件按测速结果依次尝试所有镜像（prefer_mirror=False时先尝试原始链接），
+    失败时自动换下一个；已存在的文件跳过。下载状态和本地路径写回CSV的"下载状态"、"本地文件"列。
+    返回 (成功数, 失败数)
+    """
+    try:
+        df = pd.read_csv(csv_file, encoding='utf-8')
+    except Exception:
+        df = pd.read_csv(csv_file, encoding='utf-8-sig')
+    
+    for col in ('下载链接', '镜像链接', '搜索状态', '节点类型', '下载状态', '本地文件'):
+        if col not in df.columns:
+            df[col] = ''
+        df[col] = df[col].astype(object)
+    
+    # 按目标路径合并相同的文件
+    tasks = {}
+    for idx, name, node_type, status, link, mirror in zip(df.index, df['文件名'], df['节点类型'], df['搜索状态'],
+                                                          df['下载链接'], df['镜像链接']):
+        if _cell_text(status) != '已处理' or not (_cell_text(link).strip() or _cell_text(mirror).strip()):
+            continue
+        dest = download_target(models_dir, node_type, name)
+        tasks.setdefault(dest, {'link': _cell_text(link), 'mirror': _cell_text(mirror), 'rows': []})['rows'].append(idx)
+    
+    def set_rows(rows, status, dest=''):
+        for idx in rows:
+            df.at[idx, '下载状态'] = status
+            if dest:
+                df.at[idx, '本地文件'] = dest
+    
+    pending = {}
+    for dest, task in tasks.items():
+        if os.path.exists(dest):
+            print(f"文件已存在，跳过: {dest}")
+            set_rows(task['rows'], '已存在', dest)
+        else:
+            pending[dest] = task
+    
+    if not pending:
+        print("没有需要下载的文件")
+        save_csv(df, csv_file)
+        return 0, 0
+    
+    print(f"开始下载 {len(pending)} 个文件到 {models_dir}（同时 {max_files} 个文件，每个文件 {connections} 个连接）")
+    downloader = SegmentedDownloader(connections=connections, bandwidth=bandwidth, pool=pool,
+                                     progress_callback=progress_callback)
+    own_cache = cache is None
+    if own_cache:
+        cache = ResolutionCache()
+    selector = MirrorSelector(mirrors, cache)
+    
+    def fetch(dest, link, mirror):
+        """按镜像速度依次尝试每个链接，全部失败时抛出最后一个错误"""
+        error = None
+        for url in selector.candidates(link, mirror, prefer_origin=not prefer_mirror):
+            try:
+                return downloader.download(url, dest)
+            except Exception as e:
+                error = e
+                print(f"下载失败 ({url}): {e}")
+                # 连接失败说明镜像本身不可用，后面的文件先换其他镜像
+                if isinstance(e, OSError):
+                    selector.mark_failed(url)
+        raise error
+    
+    ok = failed = 0
+    start_time = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_files)) as executor:
+            futures = {executor.submit(fetch, dest, task['link'], task['mirror']): dest
+                       for dest, task in pending.items()}
+            for future in as_completed(futures):
+                dest = futures[future]
+                try:
+                    future.result()
+                    ok += 1
+                    print(f"下载完成: {dest}")
+                    set_rows(pending[dest]['rows'], '已下载', dest)
+                except Exception as e:
+                    failed += 1
+                    set_rows(pending[dest]['rows'], f"下载失败: {e}")
+                save_csv(df, csv_file)
+    finally:
+        if pool is None:
+            downloader.close()
+        selector.close()
+        if own_cache:
+            cache.close()
+    
+    elapsed = time.time() - start_time
+    speed = downloader.done_bytes / elapsed / 1024 / 1024 if elapsed else 0
+    print(f"下载完成: 成功 {ok} 个，失败 {failed} 个，共 {downloader.done_bytes / 1024 / 1024:.1f} MB "
+          f"({elapsed:.1f}秒, {speed:.1f} MB/s)")
+    return ok, failed
+
+# HTML报告中显示的列（按CSV中的顺序）
+HTML_COLUMNS = ('序号', '节点ID', '节点类型', '文件名', '下载链接', '镜像链接', '搜索状态', '本地文件',
+                FUZZY_MATCH_COLUMN, '下载链接状态', '镜像链接状态', '文件大小')
+
+# 超过该行数时自动使用紧凑模式（数据以JSON嵌入，浏览器端分页）
+HTML_COMPACT_THRESHOLD = 2000
+
+# 紧凑模式每页显示的行数
+HTML_PAGE_SIZE = 100
+
+HTML_STATUS_CLASSES = {'已处理': 'status-processed', '处理错误': 'status-error', LOCAL_MATCH_STATUS: 'status-local'}
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>模型下载链接</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 20px; }
+        table { border-collapse: collapse; width: 100%; }
+        th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
+        th { background-color: #f2f2f2; }
+        tr:nth-child(even) { background-color: #f9f9f9; }
+        a { text-decoration: none; color: blue; }
+        a:hover { text-decoration: underline; }
+        .status-processed { color: blue; }
+        .status-notfound { color: red; }
+        .status-error { color: orange; }
+        .status-local { color: green; }
+        .file-name { font-weight: bold; }
+        .link-col { max-width: 300px; word-break: break-all; }
+        .toolbar { margin-bottom: 10px; }
+        .toolbar input { width: 300px; padding: 4px; }
+        .toolbar button { margin: 0 4px; }
+        th.sortable { cursor: pointer; }
+    </style>
+</head>
+<body>
+    <h1>模型下载链接</h1>
+    <p style="margin-bottom: 20px;">
+        注意：所有链接为通过网络搜索自动生成，查找结果可能不完全准确。
+    </p>
+"""
+
+HTML_FOOT = """    <div style="margin-top: 20px;">
+        <h3>使用说明：</h3>
+        <ul>
+            <li>优先使用镜像链接下载，速度更快</li>
+            <li>如果镜像链接无效，可尝试原始下载链接</li>
+            <li>状态为"已处理"表示已生成链接，但不保证链接有效</li>
+            <li>状态为"未找到"表示在搜索引擎中未找到对应的模型</li>
+            <li>状态为"处理错误"表示搜索过程中发生错误</li>
+            <li>状态为"本地已存在"表示内容相同的模型已以其他文件名存在于本地，无需下载</li>
+            <li>验证过的链接会显示HTTP状态码（200表示可以下载）和文件大小（字节）</li>
+        </ul>
+    </div>
+</body>
+</html>
+"""
+
+# 紧凑模式的浏览器端脚本：只渲染当前页，支持筛选和点击表头排序
+HTML_COMPACT_SCRIPT = """    <script>
+    (function () {
+        var data = JSON.parse(document.getElementById('report-data').textContent);
+        var columns = data.columns, rows = data.rows, pageSize = data.page_size;
+        var statusClasses = {'已处理': 'status-processed', '处理错误': 'status-error', '本地已存在': 'status-local'};
+        var view = rows, page = 0, sortColumn = -1, sortAsc = true;
+        var tbody = document.getElementById('report-body');
+        var info = document.getElementById('report-info');
+
+        function cell(row, col) {
+            var td = document.createElement('td'), value = row[col] || '', name = columns[col];
+            if (name === '下载链接' || name === '镜像链接') {
+                td.className = 'link-col';
+                if (/^https?:\\/\\//i.test(value)) {
+                    var a = document.createElement('a');
+                    a.href = value;
+                    a.target = '_blank';
+                    a.textContent = value;
+                    td.appendChild(a);
+                    return td;
+                }
+            } else if (name === '搜索状态') {
+                td.className = statusClasses[value] || 'status-notfound';
+            } else if (name === '文件名') {
+                td.className = 'file-name';
+            }
+            td.textContent = value;
+            return td;
+        }
+
+        function render() {
+            var pages = Math.max(1, Math.ceil(view.length / pageSize));
+            page = Math.min(Math.max(page, 0), pages - 1);
+            var fragment = document.createDocumentFragment();
+            var end = Math.min(view.length, (page + 1) * pageSize);
+            for (var i = page * pageSize; i < end; i++) {
+                var tr = document.createElement('tr');
+                for (var c = 0; c < columns.length; c++) {
+                    tr.appendChild(cell(view[i], c));
+                }
+                fragment.appendChild(tr);
+            }
+            tbody.textContent = '';
+            tbody.appendChild(fragment);
+            info.textContent = '第 ' + (page + 1) + ' / ' + pages + ' 页，共 ' + view.length + ' 行';
+        }
+
+        function applyFilter() {
+            var keyword = document.getElementById('report-filter').value.toLowerCase();
+            view = !keyword ? rows.slice() : rows.filter(function (row) {
+                return row.join('\\u0001').toLowerCase().indexOf(keyword) !== -1;
+            });
+            applySort();
+        }
+
+        function applySort() {
+            if (sortColumn >= 0) {
+                view.sort(function (a, b) {
+                    var x = a[sortColumn] || '', y = b[sortColumn] || '';
+                    var nx = Number(x), ny = Number(y), result;
+                    if (x !== '' && y !== '' && !isNaN(nx) && !isNaN(ny)) {
+                        result = nx - ny;
+                    } else {
+                        result = x < y ? -1 : (x > y ? 1 : 0);
+                    }
+                    return sortAsc ? result : -result;
+                });
+            }
+            page = 0;
+            render();
+        }
+
+        var headers = document.querySelectorAll('#report-head th');
+        for (var h = 0; h < headers.length; h++) {
+            headers[h].addEventListener('click', (function (col) {
+                return function () {
+                    sortAsc = sortColumn === col ? !sortAsc : true;
+                    sortColumn = col;
+                    applySort();
+                };
+            })(h));
+        }
+        document.getElementById('report-filter').addEventListener('input', applyFilter);
+        document.getElementById('report-prev').addEventListener('click', function () { page--; render(); });
+        document.getElementById('report-next').addEventListener('click', function () { page++; render(); });
+        render();
+    })();
+    </script>
+"""
+
+def _html_cell(column, value):
+    """生成单元格HTML，所有值都经过转义，链接只接受http(s)地址"""
+    text = html.escape(value)
+    if column == '搜索状态':
+        return f'<td class="{HTML_STATUS_CLASSES.get(value, "status-notfound")}">{text}</td>'
+    if column == '文件名':
+        return f'<td class="file-name">{text}</td>'
+    if column in ('下载链接', '镜像链接'):
+        if value.lower().startswith(('http://', 'https://')):
+            return f'<td class="link-col"><a href="{html.escape(value, quote=True)}" target="_blank">{text}</a></td>'
+        return f'<td class="link-col">{text}</td>'
+    return f'<td>{text}</td>'
+
+def _write_html_table(f, columns, rows):
+    """表格模式：逐行写入文件"""
+    f.write('    <table>\n        <tr>')
+    f.write(''.join(f'<th>{html.escape(col)}</th>' for col in columns))
+    f.write('</tr>\n')
+    for row in rows:
+        f.write('        <tr>' + ''.join(_html_cell(col, value) for col, value in zip(columns, row)) + '</tr>\n')
+    f.write('    </table>\n')
+
+def _write_html_compact(f, columns, rows, page_size=HTML_PAGE_SIZE):
+    """紧凑模式：数据以JSON嵌入页面，浏览器端分页、筛选和排序，DOM中只有当前页"""
+    f.write('    <div class="toolbar">\n'
+            '        <input id="report-filter" type="search" placeholder="筛选（文件名、状态、链接...）">\n'
+            '        <button id="report-prev">上一页</button><button id="report-next">下一页</button>\n'
+            '        <span id="report-info"></span>\n'
+            '    </div>\n')
+    f.write('    <table>\n        <thead><tr id="report-head">')
+    f.write(''.join(f'<th class="sortable">{html.escape(col)}</th>' for col in columns))
+    f.write('</tr></thead>\n        <tbody id="report-body"></tbody>\n    </table>\n')
+
+    # 逐行序列化JSON；"<"转义为\u003c，防止值中的"</script>"提前结束脚本块
+    f.write('    <script id="report-data" type="application/json">{"columns": ')
+    f.write(json.dumps(list(columns), ensure_ascii=False).replace('<', '\\u003c'))
+    f.write(f', "page_size": {int(page_size)}, "rows": [\n')
+    for i, row in enumerate(rows):
+        if i:
+            f.write(',\n')
+        f.write(json.dumps(row, ensure_ascii=False).replace('<', '\\u003c'))
+    f.write(']}</script>\n')
+    f.write(HTML_COMPACT_SCRIPT)
+
+def create_html_view(csv_file, mode=None):
+    """把结果CSV流式转换为HTML视图，返回HTML文件路径
+
+    mode: 'table' 直接输出完整表格；'compact' 数据嵌入为JSON，浏览器端分页；
+          默认行数超过HTML_COMPACT_THRESHOLD时使用紧凑模式
+    """
+    try:
+        # 生成HTML文件名
+        html_file = os.path.splitext(csv_file)[0] + '.html'
+        tmp_file = html_file + '.tmp'
+
+        with trace_span('create_html_view'), open(csv_file, 'r', encoding='utf-8-sig', newline='') as src:
+            reader = csv.reader(src)
+            header = next(reader, [])
+            indexes = [i for i, col in enumerate(header) if col in HTML_COLUMNS]
+            columns = [header[i] for i in indexes]
+            rows = ([row[i] if i < len(row) else '' for i in indexes] for row in reader)
+
+            # 未指定模式时先读取阈值以内的行，读完则用表格模式，否则切换为紧凑模式
+            if mode is None:
+                head = []
+                for row in rows:
+                    head.append(row)
+                    if len(head) > HTML_COMPACT_THRESHOLD:
+                        break
+                mode = 'compact' if len(head) > HTML_COMPACT_THRESHOLD else 'table'
+                rows = itertools.chain(head, rows)
+
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(HTML_HEAD)
+                if mode == 'compact':
+                    _write_html_compact(f, columns, rows)
+                else:
+                    _write_html_table(f, columns, rows)
+                f.write(HTML_FOOT)
+
+        os.replace(tmp_file, html_file)
+        return html_file
+    except Exception as e:
+        print(f"创建HTML视图时出错: {e}")
+        return None
+
+# ----- 批量分析（命令行） -----
+
+# 批量分析的退出码
+EXIT_OK = 0         # 没有缺失模型
+EXIT_MISSING = 1    # 存在缺失模型
+EXIT_ERROR = 2      # 有工作流无法解析或参数错误
+
+# 子进程内复用的模型库索引和目录列表
+_batch_index = None
+_batch_dir_cache = {}
+
+def collect_workflow_files(patterns):
+    """根据目录、文件或通配符收集工作流JSON文件"""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for dirpath, dirnames, filenames in os.walk(pattern):
+                dirnames.sort()
+                files.extend(os.path.join(dirpath, name) for name in sorted(filenames)
+                             if name.lower().endswith('.json'))
+        elif os.path.isfile(pattern):
+            files.append(pattern)
+        else:
+            files.extend(sorted(glob.glob(pattern, recursive=True)))
+    
+    # 去重并保持顺序
+    seen = set()
+    unique_files = []
+    for file_path in files:
+        abs_path = os.path.abspath(file_path)
+        if abs_path not in seen and os.path.isfile(abs_path):
+            seen.add(abs_path)
+            unique_files.append(abs_path)
+    return unique_files
+
+def _batch_worker_init(model_roots, index_dirs):
+    """进程池初始化：使用父进程刷新后的索引快照，不依赖索引文件是否保存成功"""
+    global _batch_index
+    if model_roots:
+        _batch_index = ModelIndex(model_roots)
+        _batch_index.dirs = index_dirs
+        _batch_index._rebuild_names()
+
+def _analyze_workflow_file(workflow_file):
+    """分析单个工作流，返回(工作流, 缺失列表, 错误信息)"""
+    try:
+        file_references = load_workflow_references(workflow_file)
+        base_dir = os.path.dirname(workflow_file)
+        missing_files = check_missing_references(file_references, base_dir, _batch_index, _batch_dir_cache)
+        return workflow_file, missing_files, None
+    except Exception as e:
+        return workflow_file, [], str(e)
+
+def _batch_analyze(workflow_file):
+    """子进程任务：屏蔽打印输出后分析单个工作流"""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        return _analyze_workflow_file(workflow_file)
+
+def analyze_workflows(workflow_files, model_roots=None, workers=None, progress_callback=None,
+                      hash_identity=False, near_matches=True):
+    """在进程池中批量分析工作流，按规范化的文件名合并缺失模型（只有一个工作流或workers=1时在当前进程分析）
+
+    hash_identity: 汇总后按内容哈希识别以其他文件名存在的模型，命中的条目带有'present_as'
+    near_matches: 汇总后查找文件名近似的本地模型，命中的条目带有'near_matches'
+    返回 (report, errors)：
+    report: 文件名（第一次出现时的写法） -> {'node_types': set, 'workflows': list, 'references': int}
+    errors: [(工作流, 错误信息)]
+    """
+    global _batch_index
+
+    # 在父进程中刷新一次索引，子进程直接使用刷新后的快照
+    model_index = load_model_index(model_roots)
+    roots = model_index.model_roots if model_index is not None else []
+    index_dirs = model_index.dirs if model_index is not None else {}
+    
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(workflow_files) // (workers * 8))
+    
+    report = {}
+    errors = []
+    executor = None
+    if workers > 1 and len(workflow_files) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_batch_worker_init,
+                                       initargs=(roots, index_dirs))
+        results = executor.map(_batch_analyze, workflow_files, chunksize=chunksize)
+    else:
+        # 启动进程池的开销远大于分析单个工作流，直接使用已加载的索引
+        _batch_index = model_index
+        results = map(_analyze_workflow_file, workflow_files)
+    
+    # 规范化文件名 -> 报告中使用的文件名，大小写或分隔符不同的写法合并为一行
+    names = {}
+    try:
+        for i, (workflow_file, missing_files, error) in enumerate(results, 1):
+            if error:
+                errors.append((workflow_file, error))
+            for missing in missing_files:
+                name = names.setdefault(normalize_model_name(missing['file_path']), missing['file_path'])
+                entry = report.setdefault(name, {'node_types': set(), 'workflows': [], 'references': 0})
+                entry['node_types'].add(missing['node_type'])
+                entry['references'] += 1
+                if not entry['workflows'] or entry['workflows'][-1] != workflow_file:
+                    entry['workflows'].append(workflow_file)
+            
+            if progress_callback:
+                progress_callback(i, len(workflow_files))
+    finally:
+        if executor:
+            executor.shutdown()
+    
+    # 汇总后统一识别，每个不同的文件名只匹配一次
+    if hash_identity and report:
+        entries = [{'file_path': name} for name in report]
+        with trace_span('hash_identity'):
+            identify_by_hash(entries, model_index)
+        for entry in entries:
+            if entry.get('present_as'):
+                report[entry['file_path']]['present_as'] = entry['present_as']
+    
+    # 近似匹配只需在父进程中对每个不同的文件名查找一次
+    if near_matches and report:
+        entries = [{'file_path': name, 'present_as': entry.get('present_as')} for name, entry in report.items()]
+        with trace_span('near_matches'):
+            find_near_matches(entries, model_index)
+        for entry in entries:
+            if entry.get('near_matches'):
+                report[entry['file_path']]['near_matches'] = entry['near_matches']
+    
+    return report, errors
+
+def write_batch_report(report, output_file, fmt=None):
+    """写入汇总报告：CSV（可直接用于搜索下载链接）或JSON Lines"""
+    if fmt is None:
+        fmt = 'jsonl' if output_file.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+    
+    file_names = sorted(report, key=lambda name: (-len(report[name]['workflows']), name.lower()))
+    
+    if fmt == 'jsonl':
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for name in file_names:
+                entry = report[name]
+                record = {
+                    'file_name': name,
+                    'node_types': sorted(entry['node_types']),
+                    'references': entry['references'],
+                    'workflows': entry['workflows'],
+                }
+                if entry.get('present_as'):
+                    record['present_as'] = entry['present_as']
+                if entry.get('near_matches'):
+                    record['near_matches'] = [{'path': path, 'score': score} for score, path in entry['near_matches']]
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    else:
+        has_local = any(entry.get('present_as') for entry in report.values())
+        has_near = any(entry.get('near_matches') for entry in report.values())
+        with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
+            fieldnames = ['序号', '文件名', '节点类型', '引用次数', '工作流数', '工作流']
+            if has_local:
+                fieldnames += ['搜索状态', '本地文件']
+            if has_near:
+                fieldnames.append(FUZZY_MATCH_COLUMN)
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for i, name in enumerate(file_names, 1):
+                entry = report[name]
+                row = {
+                    '序号': i,
+                    '文件名': name,
+                    '节点类型': '; '.join(sorted(entry['node_types'])),
+                    '引用次数': entry['references'],
+                    '工作流数': len(entry['workflows']),
+                    '工作流': '; '.join(entry['workflows'])
+                }
+                if entry.get('present_as'):
+                    row['搜索状态'] = LOCAL_MATCH_STATUS
+                    row['本地文件'] = entry['present_as']
+                if entry.get('near_matches'):
+                    row[FUZZY_MATCH_COLUMN] = format_near_matches(entry['near_matches'])
+                writer.writerow(row)
+    
+    return output_file
+
+def run_batch(args):
+    """命令行批量分析入口"""
+    workflow_files = collect_workflow_files(args.paths)
+    if not workflow_files:
+        print("错误: 没有找到工作流JSON文件", file=sys.stderr)
+        return EXIT_ERROR
+    
+    print(f"找到 {len(workflow_files)} 个工作流文件")
+    start_time = time.time()
+    
+    report, errors = analyze_workflows(workflow_files, model_roots=args.model_roots, workers=args.workers,
+                                       hash_identity=args.hash_identity, near_matches=not args.no_near_matches)
+    write_batch_report(report, args.output, args.format)
+    
+    elapsed = time.time() - start_time
+    missing = sum(1 for entry in report.values() if not entry.get('present_as'))
+    print(f"分析完成: {len(workflow_files)} 个工作流, {missing} 个不同的缺失模型, "
+          f"{len(report) - missing} 个以其他文件名存在, {len(errors)} 个错误 ({elapsed:.2f}秒)")
+    print(f"报告已保存为: {os.path.abspath(args.output)}")
+    
+    for workflow_file, error in errors:
+        print(f"解析失败: {workflow_file}: {error}", file=sys.stderr)
+    
+    if errors:
+        return EXIT_ERROR
+    return EXIT_MISSING if missing else EXIT_OK
+
+def run_search(args):
+    """命令行搜索入口"""
+    if not os.path.exists(args.csv_file):
+        print(f"错误: 文件不存在: {args.csv_file}", file=sys.stderr)
+        return EXIT_ERROR
+    
+    backend = get_search_backend(args.backend, workers=args.workers, base_url=args.hf_endpoint,
+                                 browser_service=True if args.browser_service else None)
+    cache = None
+    if not args.no_cache and (args.cache_ttl is not None or args.negative_cache_ttl is not None):
+        cache = ResolutionCache(ttl=CACHE_TTL if args.cache_ttl is None else args.cache_ttl * 3600,
+                                negative_ttl=NEGATIVE_CACHE_TTL if args.negative_cache_ttl is None
+                                else args.negative_cache_ttl * 3600)
+    try:
+        result = search_model_links(args.csv_file, cache=cache, use_cache=not args.no_cache, backend=backend,
+                                    compact_interval=args.compact_interval, html_mode=args.html_mode,
+                                    verify=args.verify, mirrors=args.mirrors, use_catalog=not args.no_catalog,
+                                    expand_repos=not args.no_expand_repos)
+    finally:
+        if cache is not None:
+            cache.close()
+    return EXIT_OK if result else EXIT_ERROR
+
+def run_catalog(args):
+    """命令行离线模型目录入口"""
+    if args.catalog_command == 'merge':
+        missing = [f for f in args.csv_files if not os.path.exists(f)]
+        if missing:
+            print(f"错误: 文件不存在: {', '.join(missing)}", file=sys.stderr)
+            return EXIT_ERROR
+        added, updated, skipped = merge_catalog(args.csv_files, args.catalog)
+        catalog = ModelCatalog(args.catalog)
+        print(f"合并完成: 新增 {added} 个, 更新 {updated} 个, 跳过 {skipped} 行（不是同名文件的链接）; "
+              f"目录共 {len(catalog)} 个模型, 版本 {catalog.revision}: {os.path.abspath(args.catalog)}")
+        catalog.close()
+        return EXIT_OK
+    
+    catalogs = open_catalogs([args.catalog] if getattr(args, 'catalog', None) else None)
+    try:
+        if args.catalog_command == 'show':
+            writer = csv.writer(sys.stdout)
+            writer.writerow(('文件名', '仓库', '路径', '文件大小', 'SHA256', '目录'))
+            for catalog in catalogs:
+                for entry in catalog.entries():
+                    writer.writerow((entry['file_name'], entry['repo_id'], entry['path'], entry['size'] or '',
+                                     entry['sha256'], catalog.path))
+            return EXIT_OK
+        
+        found = 0
+        for name in args.names:
+            entry = lookup_catalogs(catalogs, name)
+            if entry:
+                found += 1
+                print(f"{name}: {catalog_link(entry)}")
+            else:
+                print(f"{name}: 未收录")
+        return EXIT_OK if found == len(args.names) else EXIT_MISSING
+    finally:
+        for catalog in catalogs:
+            catalog.close()
+
+def run_browser(args):
+    """命令行常驻浏览器服务入口"""
+    if not _load_drission():
+        print("错误: DrissionPage库未安装，无法使用浏览器", file=sys.stderr)
+        return EXIT_ERROR
+    
+    service = BrowserService(persistent=True, port=args.port)
+    if args.browser_command == 'start':
+        service.attach()
+        service.detach()
+        print(f"常驻浏览器已就绪: 127.0.0.1:{args.port}；搜索时加 --browser-service 或设置 {BROWSER_SERVICE_ENV}=1 即可连接")
+        return EXIT_OK
+    
+    if not browser_endpoint_alive(args.port):
+        print(f"常驻浏览器未运行 (127.0.0.1:{args.port})")
+        return EXIT_OK if args.browser_command == 'stop' else EXIT_MISSING
+    
+    if args.browser_command == 'stop':
+        service.stop()
+        print("常驻浏览器已关闭")
+        return EXIT_OK
+    
+    service.connect()
+    status = service.status()
+    memory = status['memory_mb']
+    print(f"常驻浏览器运行中: 127.0.0.1:{args.port}，空闲标签页 {status['idle_tabs']} 个，"
+          f"内存 {f'{memory:.0f}MB' if memory is not None else '未知（需要psutil）'}")
+    return EXIT_OK if status['running'] else EXIT_ERROR
+
+def run_verify(args):
+    """命令行链接验证入口"""
+    if not os.path.exists(args.csv_file):
+        print(f"错误: 文件不存在: {args.csv_file}", file=sys.stderr)
+        return EXIT_ERROR
+    
+    valid, total = verify_links(args.csv_file, concurrency=args.workers or VERIFY_CONCURRENCY,
+                                use_cache=not args.no_cache)
+    html_file = create_html_view(args.csv_file, args.html_mode)
+    if html_file:
+        print(f"已生成HTML结果文件: {html_file}")
+    return EXIT_OK if valid == total else EXIT_MISSING
+
+def run_download(args):
+    """命令行下载入口"""
+    if not os.path.exists(args.csv_file):
+        print(f"错误: 文件不存在: {args.csv_file}", file=sys.stderr)
+        return EXIT_ERROR
+    
+    roots = get_model_roots(args.models_dir)
+    if not roots:
+        print(f"错误: 请用 --models-dir 或环境变量{MODEL_ROOTS_ENV}指定模型目录", file=sys.stderr)
+        return EXIT_ERROR
+    
+    bandwidth = parse_rate(args.limit_rate) if args.limit_rate else None
+    ok, failed = download_models(args.csv_file, roots[0], connections=args.connections,
+                                 max_files=args.files, bandwidth=bandwidth, prefer_mirror=not args.origin,
+                                 mirrors=args.mirrors)
+    return EXIT_MISSING if failed else EXIT_OK
+
+# ----- 监视模式 -----
+
+# 轮询模式下检查目录和工作流文件的间隔（秒）
+WATCH_POLL_INTERVAL = 0.5
+
+# 收到第一个变化后再等待一小段时间，把连续的变化合并处理（秒）
+WATCH_DEBOUNCE = 0.1
+
+def _is_under(path, roots):
+    """path是否位于roots中的某个目录下（含目录本身）"""
+    return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)
+
+class InotifyWatcher:
+    """Linux inotify：递归监视目录，新建的子目录自动加入监视
+
+    wait() 返回 (内容发生增减的目录集合, 写入完成的文件集合)，事件队列溢出时返回None。
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+    def __init__(self, roots):
+        import ctypes
+        import ctypes.util
+        self.ctypes = ctypes
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.paths = {}
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | getattr(os, 'O_CLOEXEC', 0))
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1失败")
+        try:
+            for root in roots:
+                self._add_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.WATCH_MASK)
+        if wd < 0:
+            errno = self.ctypes.get_errno()
+            # 目录已被删除时忽略；超出监视数量上限等其他错误交给调用方改用轮询
+            if errno in (2, 20):
+                return []
+            raise OSError(errno, f"inotify_add_watch失败: {directory}")
+        self.paths[wd] = directory
+        return [directory]
+
+    def _add_tree(self, root):
+        """监视root及其所有子目录，返回加入监视的目录"""
+        added = []
+        for dirpath, dirnames, _ in os.walk(root):
+            added.extend(self._add_watch(dirpath))
+        return added
+
+    def wait(self, timeout):
+        import select
+        dirs, files = set(), set()
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return dirs, files
+            if not select.select([self.fd], [], [], remaining)[0]:
+                return dirs, files
+            if self._read(dirs, files) is None:
+                return None
+            # 收到事件后只再等待一小段时间合并后续的变化
+            deadline = min(deadline, time.monotonic() + WATCH_DEBOUNCE)
+
+    def _read(self, dirs, files):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return dirs
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = struct.unpack_from('iIII', data, offset)
+            name = os.fsdecode(data[offset + 16:offset + 16 + length].rstrip(b'\0'))
+            offset += 16 + length
+            
+            if mask & self.IN_Q_OVERFLOW:
+                return None
+            directory = self.paths.get(wd)
+            if directory is None:
+                continue
+            if mask & (self.IN_IGNORED | self.IN_DELETE_SELF):
+                self.paths.pop(wd, None)
+                continue
+            
+            path = os.path.join(directory, name)
+            if mask & (self.IN_CREATE | self.IN_DELETE | self.IN_MOVED_FROM | self.IN_MOVED_TO):
+                dirs.add(directory)
+            if mask & self.IN_ISDIR:
+                # 新建或移入的目录：加入监视，其中已有的内容按目录变化处理
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    dirs.update(self._add_tree(path))
+            elif mask & (self.IN_CLOSE_WRITE | self.IN_MOVED_TO):
+                files.add(path)
+        return dirs
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+    """没有inotify时的轮询实现：只stat已知的目录和工作流文件，目录mtime变化时才重新列出该目录"""
+
+    def __init__(self, roots, interval=WATCH_POLL_INTERVAL, suffix='.json'):
+        self.interval = interval
+        self.suffix = suffix
+        self.dirs = {}
+        self.files = {}
+        for root in roots:
+            self._scan_tree(root)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _scan_tree(self, root):
+        """记录root下所有目录和工作流文件的状态，返回新发现的目录"""
+        added = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            if dirpath in self.dirs:
+                continue
+            self.dirs[dirpath] = self._stat(dirpath)
+            added.append(dirpath)
+            for name in filenames:
+                if name.lower().endswith(self.suffix):
+                    path = os.path.join(dirpath, name)
+                    self.files[path] = self._stat(path)
+        return added
+
+    def _forget(self, directory):
+        prefix = directory.rstrip(os.sep) + os.sep
+        for table in (self.dirs, self.files):
+            for path in [p for p in table if p == directory or p.startswith(prefix)]:
+                del table[path]
+
+    def wait(self, timeout):
+        time.sleep(min(self.interval, timeout))
+        dirs, files = set(), set()
+        for directory, state in list(self.dirs.items()):
+            if directory not in self.dirs:
+                continue
+            current = self._stat(directory)
+            if current is None:
+                # 目录被删除：由父目录的变化处理
+                self._forget(directory)
+                dirs.add(os.path.dirname(directory))
+            elif current != state:
+                self.dirs[directory] = current
+                dirs.add(directory)
+                try:
+                    entries = list(os.scandir(directory))
+                except OSError:
+                    continue
+                for entry in entries:
+                    if entry.is_dir() and entry.path not in self.dirs:
+                        dirs.update(self._scan_tree(entry.path))
+                    elif entry.name.lower().endswith(self.suffix) and entry.path not in self.files:
+                        self.files[entry.path] = self._stat(entry.path)
+                        files.add(entry.path)
+        
+        for path, state in list(self.files.items()):
+            current = self._stat(path)
+            if current is None:
+                del self.files[path]
+            elif current != state:
+                self.files[path] = current
+                files.add(path)
+        return dirs, files
+
+    def close(self):
+        pass
+
+def create_watcher(roots, polling=False, interval=WATCH_POLL_INTERVAL):
+    """优先使用inotify，不可用（非Linux或超出监视数量上限）时改用轮询"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError) as e:
+            print(f"inotify不可用，改用轮询: {e}")
+    return PollingWatcher(roots, interval)
+
+class ReportWatcher:
+    """监视模式：工作流或模型目录变化时只重新分析受影响的工作流，只更新报告中受影响的行
+
+    每个工作流解析一次并保存其模型引用，模型目录变化只需重新判断引用了变化文件名的工作流，
+    近似匹配也只为与增减的文件名相近的行重新查找（缺失文件名另建一个FuzzyIndex反查）；
+    行按normalize_model_name合并（与批量分析一致），未变化的行复用上次序列化的CSV内容。
+    报告CSV中已有的搜索结果等其他列原样保留。
+    """
+
+    REPORT_COLUMNS = ['序号', '文件名', '节点类型', '引用次数', '工作流数', '工作流', FUZZY_MATCH_COLUMN]
+
+    def __init__(self, paths, output_file, model_roots=None, html_mode=None):
+        self.workflow_roots = [os.path.abspath(p) for p in paths if os.path.isdir(p)]
+        self.workflow_files = {os.path.abspath(p) for p in paths if os.path.isfile(p)}
+        self.output_file = output_file
+        self.html_mode = html_mode
+        self.model_index = load_model_index(model_roots)
+        self.model_roots = self.model_index.roots if self.model_index is not None else []
+        
+        self.references = {}     # 工作流 -> 模型引用
+        self.missing = {}        # 工作流 -> {规范化文件名: 缺失列表}
+        self.errors = {}         # 工作流 -> 解析错误
+        self.users = {}          # 规范化文件名 -> 引用它的工作流集合
+        self.by_dir = {}         # 目录 -> 其中的工作流集合
+        self.dir_cache = {}
+        self.report = {}
+        self.near = {}           # 规范化文件名 -> 近似匹配
+        self.missing_fuzzy = FuzzyIndex()
+        self.rows = {}
+        self.lines = {}          # 规范化文件名 -> 序列化后的CSV行（不含序号）
+        self.fieldnames = list(self.REPORT_COLUMNS)
+        self.written_mtime = None
+
+    def watch_roots(self):
+        """需要监视的目录：工作流目录（单个文件时为其所在目录）和模型根目录"""
+        roots = list(self.workflow_roots)
+        roots += sorted({os.path.dirname(f) for f in self.workflow_files})
+        roots += self.model_roots
+        return [r for r in dict.fromkeys(roots) if os.path.isdir(r)]
+
+    def is_workflow(self, path):
+        return path in self.workflow_files or (
+            path.lower().endswith('.json') and _is_under(path, self.workflow_roots))
+
+    def start(self):
+        """首次完整分析并写入报告"""
+        workflow_files = collect_workflow_files(self.workflow_roots) + sorted(self.workflow_files)
+        affected = set()
+        for workflow_file in dict.fromkeys(workflow_files):
+            affected |= self._analyze(workflow_file)
+        self._load_rows()
+        self._update(affected, rewrite=True)
+        return len(self.references)
+
+    def _analyze(self, workflow_file):
+        """解析工作流并检查缺失，返回报告中受影响的文件名"""
+        affected = self._forget(workflow_file)
+        try:
+            references = load_workflow_references(workflow_file)
+            self.errors.pop(workflow_file, None)
+        except Exception as e:
+            self.errors[workflow_file] = str(e)
+            print(f"解析失败: {workflow_file}: {e}")
+            return affected
+        
+        self.references[workflow_file] = references
+        self.by_dir.setdefault(os.path.dirname(workflow_file), set()).add(workflow_file)
+        for ref in references:
+            self.users.setdefault(normalize_model_name(ref['file_path']), set()).add(workflow_file)
+        return affected | self._check(workflow_file)
+
+    def _check(self, workflow_file):
+        """用已保存的引用重新检查缺失（不重新解析），返回缺失情况有变化的文件名"""
+        old = self.missing.get(workflow_file, {})
+        new = {}
+        for missing in check_missing_references(self.references[workflow_file], os.path.dirname(workflow_file),
+                                                self.model_index, self.dir_cache):
+            new.setdefault(normalize_model_name(missing['file_path']), []).append(missing)
+        self.missing[workflow_file] = new
+        return {name for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
+
+    def _forget(self, workflow_file):
+        """移除工作流的记录，返回受影响的文件名"""
+        affected = set(self.missing.pop(workflow_file, {}))
+        for ref in self.references.pop(workflow_file, []):
+            users = self.users.get(normalize_model_name(ref['file_path']))
+            if users:
+                users.discard(workflow_file)
+        self.by_dir.get(os.path.dirname(workflow_file), set()).discard(workflow_file)
+        self.errors.pop(workflow_file, None)
+        return affected
 
-def get_mirror_link(original_url):
-    """获取Hugging Face的镜像链接"""
-    if not original_url or 'huggingface.co' not in original_url:
-        return ''
-    
-    try:
-        # 解析URL以确保正确的格式转换
-        parsed_url = urlparse(original_url)
-        path = parsed_url.path
+    def handle(self, changes):
+        """处理一批变化，返回更新的行数；changes为None时（事件丢失）完整重新分析"""
+        start_time = time.monotonic()
+        if changes is None:
+            print("变化事件过多，重新完整分析")
+            if self.model_index is not None:
+                self.model_index.refresh()
+            self.dir_cache.clear()
+            for workflow_file in list(self.references):
+                self._forget(workflow_file)
+            self.report = {}
+            self.near = {}
+            self.missing_fuzzy = FuzzyIndex()
+            self.start()
+            return len(self.rows)
         
-        # 确保路径格式正确（移除/resolve/并替换为对应路径）
-        if '/resolve/' in path:
-            path = path.replace('/resolve/', '/blob/')
-            
-        # 构建正确的镜像链接
-        mirror_base_url = "https://hf-mirror.com"
-        mirror_url = urljoin(mirror_base_url, path)
+        dirs, files = changes
+        affected = set()
+        near = set()
         
-        # 将blob替换回resolve用于下载
-        if '/blob/' in mirror_url:
-            mirror_url = mirror_url.replace('/blob/', '/resolve/')
-            
-        return mirror_url
-    except Exception as e:
-        print(f"构建镜像链接时出错: {e}")
-        return ''
-
-def search_model_links(csv_file, status_callback=None, progress_callback=None):
-    """使用Bing搜索引擎查找模型下载链接"""
-    if not DRISSION_AVAILABLE:
-        print("错误: DrissionPage库未安装，无法使用网络搜索功能")
-        print("请运行 'pip install DrissionPage' 安装")
-        return False
+        # 模型目录：只重新列出变化的目录，找出增减的文件名，重新检查引用了这些文件名的工作流
+        model_dirs = {d for d in dirs if _is_under(d, self.model_roots)}
+        if model_dirs and self.model_index is not None:
+            changed = self.model_index.update_dirs(model_dirs)
+            names = {normalize_model_name(n) for n in changed}
+            for workflow_file in set().union(*(self.users.get(n, ()) for n in names)):
+                affected |= self._check(workflow_file)
+            # 只有近似匹配可能因增减的文件而变化的行才重新查找
+            near = self._near_affected(changed)
         
-    try:
-        # 读取CSV文件
-        try:
-            df = pd.read_csv(csv_file, encoding='utf-8')
-        except Exception:
-            df = pd.read_csv(csv_file, encoding='utf-8-sig')
+        # 工作流目录：文件增减时同步工作流列表，并重新检查该目录下的工作流（目录中的模型文件也算存在）
+        for directory in dirs:
+            if not (_is_under(directory, self.workflow_roots) or directory in self.by_dir):
+                continue
+            self.dir_cache.pop(directory, None)
+            for workflow_file in list(self.by_dir.get(directory, ())):
+                if not os.path.exists(workflow_file):
+                    affected |= self._forget(workflow_file)
+                else:
+                    affected |= self._check(workflow_file)
+            try:
+                entries = [e.path for e in os.scandir(directory) if e.is_file()]
+            except OSError:
+                entries = []
+            files = set(files) | {p for p in entries if self.is_workflow(p) and p not in self.references
+                                  and p not in self.errors}
         
-        # 检查必要的列是否存在
-        if '文件名' not in df.columns:
-            print("错误: CSV文件必须包含'文件名'列")
-            return False
+        for path in files:
+            if self.is_workflow(path) and os.path.isfile(path):
+                affected |= self._analyze(path)
         
-        # 添加必要的列
-        for col in ['下载链接', '镜像链接', '搜索状态']:
-            if col not in df.columns:
-                print(f"添加缺失列: '{col}'")
-                df[col] = ''
+        if not affected and not near:
+            return 0
+        updated = self._update(affected, near)
+        elapsed = (time.monotonic() - start_time) * 1000
+        print(f"[{time.strftime('%H:%M:%S')}] 更新报告 {updated} 行, 当前缺失 {len(self.report)} 个 ({elapsed:.0f}毫秒)")
+        return updated
+
+    def _entry(self, name):
+        """根据各工作流的缺失列表重新汇总一个文件名的报告条目，不再缺失时返回None"""
+        entry = None
+        for workflow_file in sorted(self.users.get(name, ())):
+            for missing in self.missing.get(workflow_file, {}).get(name, ()):
+                if entry is None:
+                    entry = {'file_name': missing['file_path'], 'node_types': set(), 'workflows': [], 'references': 0}
+                entry['node_types'].add(missing['node_type'])
+                entry['references'] += 1
+                if not entry['workflows'] or entry['workflows'][-1] != workflow_file:
+                    entry['workflows'].append(workflow_file)
+        return entry
+
+    def _near_matches(self, name, file_name):
+        """文件名近似的本地模型，记录下来供文件增减时判断是否受影响"""
+        entry = {'file_path': file_name}
+        find_near_matches([entry], self.model_index)
+        self.near[name] = entry.get('near_matches') or []
+        return self.near[name]
+
+    def _near_affected(self, changed):
+        """近似匹配会因增减这些本地文件名（ModelIndex.update_dirs的返回值）而变化的报告行
+
+        新增的文件名只影响得分能排进前FUZZY_MATCH_LIMIT名的行（得分对称，用缺失文件名的索引反查）；
+        删除的文件名只影响原来匹配到它的行。
+        """
+        affected = set()
+        for name in changed:
+            if name not in self.model_index:
+                continue
+            for score, row in self.missing_fuzzy.search(name, limit=len(self.missing_fuzzy)):
+                matches = self.near.get(row, [])
+                if len(matches) < FUZZY_MATCH_LIMIT or \
+                        (-score, name) < (-matches[-1][0], os.path.basename(matches[-1][1])):
+                    affected.add(row)
+        for row, matches in self.near.items():
+            if any(os.path.normcase(os.path.basename(path)) in changed for _, path in matches):
+                affected.add(row)
+        return affected
+
+    def _format_row(self, row):
+        """序列化一行中序号以外的列（序号随行的增减变化，写入时再加上）"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow([''] + [row.get(col, '') for col in self.fieldnames[1:]])
+        return buffer.getvalue()
+
+    def _load_rows(self):
+        """读取已有的报告，保留搜索结果等其他列"""
+        self.rows = {}
+        try:
+            with open(self.output_file, 'r', encoding='utf-8-sig', newline='') as f:
+                reader = csv.DictReader(f)
+                self.fieldnames = list(dict.fromkeys(list(self.REPORT_COLUMNS) + list(reader.fieldnames or [])))
+                for row in reader:
+                    self.rows[normalize_model_name(row.get('文件名') or '')] = row
+            self.written_mtime = os.stat(self.output_file).st_mtime_ns
+        except OSError:
+            self.fieldnames = list(self.REPORT_COLUMNS)
+        self.lines = {}
+
+    def _update(self, names, near=(), rewrite=False):
+        """更新受影响的行并原子地写回CSV和HTML，返回变化的行数
+
+        names: 需要重新汇总的文件名；near: 只需重新查找近似匹配的文件名
+        """
+        # 其他命令（搜索、下载）修改过报告时先重新读取，不覆盖它们写入的列
+        try:
+            if os.stat(self.output_file).st_mtime_ns != self.written_mtime:
+                self._load_rows()
+        except OSError:
+            pass
         
-        # 获取需要处理的关键词列表
-        keywords = []
-        for index, row in df.iterrows():
-            keyword = row['文件名']
-            if pd.isna(keyword) or keyword == '':
+        updated = 0
+        for name in names:
+            entry = self._entry(name)
+            self.lines.pop(name, None)
+            if entry is None:
+                self.report.pop(name, None)
+                self.near.pop(name, None)
+                self.missing_fuzzy.remove(name)
+                updated += self.rows.pop(name, None) is not None
                 continue
-                
-            # 检查是否已经处理过
-            if row['搜索状态'] == '已处理' and row['下载链接']:
-                print(f"跳过已处理的关键词: {keyword}")
+            self.report[name] = entry
+            self.missing_fuzzy.add(name)
+            row = self.rows.setdefault(name, {})
+            row.update({
+                '文件名': entry['file_name'],
+                '节点类型': '; '.join(sorted(entry['node_types'])),
+                '引用次数': entry['references'],
+                '工作流数': len(entry['workflows']),
+                '工作流': '; '.join(entry['workflows']),
+                FUZZY_MATCH_COLUMN: format_near_matches(self._near_matches(name, entry['file_name'])),
+            })
+            updated += 1
+        for name in set(near) - set(names):
+            if name not in self.report or name not in self.rows:
                 continue
-                
-            keywords.append(keyword)
-        
-        if not keywords:
-            print("没有找到需要处理的关键词")
-            return True
-            
-        print(f"找到 {len(keywords)} 个需要处理的关键词")
+            matches = format_near_matches(self._near_matches(name, self.report[name]['file_name']))
+            if self.rows[name].get(FUZZY_MATCH_COLUMN) != matches:
+                self.rows[name][FUZZY_MATCH_COLUMN] = matches
+                self.lines.pop(name, None)
+                updated += 1
         
-        # 创建浏览器配置
-        print("正在准备浏览器配置...")
-        chrome_options = ChromiumOptions()
+        # 首次写入时移除已经不再缺失的旧行
+        if rewrite:
+            for name in [n for n in self.rows if n not in self.report]:
+                del self.rows[name]
+        if not updated and not rewrite:
+            return 0
         
-        # 使用默认用户数据目录 - 使用当前用户的Chrome配置
-        user_data_dir = os.path.join(os.environ['LOCALAPPDATA'], 'Google', 'Chrome', 'User Data')
-        if os.path.exists(user_data_dir):
-            print(f"使用默认Chrome用户数据目录: {user_data_dir}")
-            chrome_options.set_user_data_path(user_data_dir)
-        else:
-            print("未找到Chrome用户数据目录，将使用临时配置文件")
+        # 只序列化变化的行，其他行使用缓存的内容
+        tmp_file = self.output_file + '.tmp'
+        with open(tmp_file, 'w', newline='', encoding='utf-8-sig') as f:
+            csv.writer(f).writerow(self.fieldnames)
+            for i, (name, row) in enumerate(self.rows.items(), 1):
+                row['序号'] = i
+                line = self.lines.get(name)
+                if line is None:
+                    line = self.lines[name] = self._format_row(row)
+                f.write(f"{i}{line}")
+        os.replace(tmp_file, self.output_file)
+        self.written_mtime = os.stat(self.output_file).st_mtime_ns
+        create_html_view(self.output_file, self.html_mode)
+        return updated
+
+def watch_report(paths, output_file, model_roots=None, polling=False, interval=WATCH_POLL_INTERVAL,
+                 html_mode=None, stop_event=None):
+    """持续监视工作流和模型目录，增量更新缺失模型报告，直到stop_event被设置或按Ctrl+C"""
+    report = ReportWatcher(paths, output_file, model_roots, html_mode)
+    count = report.start()
+    print(f"已分析 {count} 个工作流，当前缺失 {len(report.report)} 个模型，报告: {os.path.abspath(output_file)}")
+    
+    watcher = create_watcher(report.watch_roots(), polling, interval)
+    print(f"开始监视（{'inotify' if isinstance(watcher, InotifyWatcher) else '轮询'}），按Ctrl+C停止")
+    try:
+        while stop_event is None or not stop_event.is_set():
+            changes = watcher.wait(interval)
+            if changes is None or changes[0] or changes[1]:
+                report.handle(changes)
+    except KeyboardInterrupt:
+        print("已停止监视")
+    finally:
+        watcher.close()
+    return report
+
+def run_watch(args):
+    """命令行监视入口"""
+    if not args.output.lower().endswith('.csv'):
+        print("错误: 监视模式只支持CSV报告", file=sys.stderr)
+        return EXIT_ERROR
+    if not any(os.path.exists(p) for p in args.paths):
+        print("错误: 没有找到要监视的工作流目录或文件", file=sys.stderr)
+        return EXIT_ERROR
+    
+    watch_report(args.paths, args.output, model_roots=args.model_roots, polling=args.polling,
+                 interval=args.interval, html_mode=args.html_mode)
+    return EXIT_OK
+
+# ----- 本地API服务 -----
+
+# 默认监听地址和端口（只监听本机）
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8189
+
+# 后台检查模型目录变化的间隔（秒），有inotify时目录变化后立即更新
+SERVER_INDEX_REFRESH = 30
+
+# 请求体大小上限（字节）
+SERVER_MAX_BODY = 64 * 1024 * 1024
+
+# 缓存的下载链接在内存中保留的时间（秒），避免每次查询都读写SQLite
+SERVER_LINK_MEMO_TTL = 60
+
+# 内存中最多保留的下载链接条数，超出时先清除过期的条目
+SERVER_LINK_MEMO_MAX = 10000
+
+class ApiServer:
+    """本地JSON API服务：模型库索引和搜索结果缓存常驻内存，供ComfyUI前端、队列等工具查询
+
+    POST /analyze   请求体为工作流JSON（界面格式或API格式），返回缺失的模型及缓存（或离线模型目录）中的下载链接
+    POST /resolve   {"files": [文件名]}，返回每个文件名的本地路径和缓存的下载链接
+    GET  /links?name=文件名   查询缓存的下载链接
+    POST /refresh   立即刷新模型库索引
+    GET  /health    服务状态
+    """
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, model_roots=None, cache=None,
+                 refresh_interval=SERVER_INDEX_REFRESH, cors_origin=None):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
         
-        # 配置其他浏览器参数
-        chrome_options.set_argument('--disable-infobars')
-        chrome_options.set_argument('--disable-extensions')
-        chrome_options.set_argument('--no-sandbox')
-        chrome_options.set_argument('--disable-gpu')
-        chrome_options.set_argument('--disable-dev-shm-usage')
+        self.model_index = load_model_index(model_roots)
+        self.cache = cache or ResolutionCache()
+        self.catalogs = open_catalogs()
+        self.refresh_interval = refresh_interval
+        self.cors_origin = cors_origin
+        self.dir_cache = {}
+        self.link_memo = {}
+        self.requests = 0
+        # 处理线程并发更新请求计数和链接缓存
+        self.lock = threading.Lock()
+        # 模型库索引和目录缓存的所有读写：处理线程读取，后台刷新线程和 POST /refresh 修改
+        self.index_lock = threading.Lock()
+        self.started_at = time.time()
+        self.stop_event = threading.Event()
+        server = self
         
-        # 创建浏览器实例
-        page = None
-        try:
-            print("正在初始化浏览器...")
-            page = ChromiumPage(chrome_options)
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
             
-            # 处理每个关键词
-            for i, keyword in enumerate(keywords):
-                print(f"搜索模型 ({i+1}/{len(keywords)}): {keyword}")
-                
-                # 更新进度
-                if progress_callback:
-                    progress_callback(i+1, len(keywords))
+            # 响应头和响应体分两次写出，关闭Nagle算法避免与客户端的延迟确认叠加出约40毫秒的等待
+            disable_nagle_algorithm = True
+            
+            def log_message(self, *args):
+                pass
+            
+            def do_GET(self):
+                self._handle('GET')
+            
+            def do_POST(self):
+                self._handle('POST')
+            
+            def do_OPTIONS(self):
+                self._send(204, None)
+            
+            def _handle(self, method):
+                with server.lock:
+                    server.requests += 1
+                parsed = urlparse(self.path)
+                route = server.routes.get((method, parsed.path))
+                if route is None:
+                    self._send(404, {'error': f"未知的接口: {method} {parsed.path}"})
+                    return
                 
                 try:
-                    # 搜索重试
-                    max_retries = 3
-                    search_success = False
-                    
-                    for retry in range(max_retries):
-                        try:
-                            # 访问国际版Bing
-                            page.get("https://www.bing.com/?setlang=en-US")
-                            time.sleep(1)
-                            
-                            # 获取搜索框元素
-                            search_box = page.ele("#sb_form_q")
-                            
-                            if search_box:
-                                # 清空搜索框并输入新的搜索关键词
-                                search_box.clear()
-                                search_query = f'site:huggingface.co "{keyword}"'
-                                
-                                # 输入搜索关键词
-                                search_box.input(search_query)
-                                time.sleep(1)
-                                
-                                # 提交搜索表单
-                                page.run_js("document.querySelector('#sb_form').submit();")
-                                time.sleep(1)
-                                
-                                # 尝试提取搜索结果
-                                search_results = page.eles("xpath://*[@id='b_results']//h2/a")
-                                
-                                if search_results and len(search_results) > 0:
-                                    # 获取第一个搜索结果
-                                    first_result = search_results[0]
-                                    title = first_result.text
-                                    original_link = first_result.attr("href")
-                                    
-                                    print(f"找到搜索结果: {title}")
-                                    
-                                    if 'huggingface.co' in original_link:
-                                        # 在原链接中，如果是blob路径，转换为resolve路径用于下载
-                                        if "blob" in original_link:
-                                            download_link = original_link.replace("/blob/", "/resolve/")
-                                        else:
-                                            download_link = original_link
-                                            
-                                        # 构造镜像链接
-                                        mirror_link = get_mirror_link(original_link)
-                                        
-                                        # 保存结果
-                                        row_idx = df.index[df['文件名'] == keyword].tolist()
-                                        if row_idx:
-                                            idx = row_idx[0]
-                                            df.at[idx, '下载链接'] = download_link
-                                            df.at[idx, '镜像链接'] = mirror_link
-                                            df.at[idx, '搜索状态'] = '已处理'
-                                            
-                                            print(f"生成下载链接: {download_link}")
-                                            print(f"生成镜像链接: {mirror_link}")
-                                        
-                                        search_success = True
-                                        break
-                                    else:
-                                        print(f"找到结果但不是Hugging Face链接，重试 ({retry+1}/{max_retries})...")
-                                        time.sleep(1)
-                                else:
-                                    print(f"Bing搜索未找到结果，重试 ({retry+1}/{max_retries})...")
-                                    time.sleep(1)
-                            else:
-                                print(f"未找到Bing搜索框，重试 ({retry+1}/{max_retries})...")
-                                page.refresh()
-                                time.sleep(1)
-                                
-                        except Exception as e:
-                            error_msg = str(e)
-                            print(f"搜索过程中出错 ({retry+1}/{max_retries}): {error_msg}")
-                            
-                            # 检查是否是连接断开错误
-                            if "与页面的连接已断开" in error_msg or "连接失败" in error_msg:
-                                print("浏览器连接断开，尝试重新创建实例...")
-                                try:
-                                    if page:
-                                        page.quit()
-                                except:
-                                    pass
-                                    
-                                time.sleep(1)
-                                page = ChromiumPage(chrome_options)
-                            
-                            time.sleep(1)
-                    
-                    # 如果搜索失败，标记为未找到
-                    if not search_success:
-                        print(f"未能找到模型 {keyword} 的下载链接")
-                        
-                        row_idx = df.index[df['文件名'] == keyword].tolist()
-                        if row_idx:
-                            idx = row_idx[0]
-                            df.at[idx, '搜索状态'] = '未找到'
-                    
-                    # 每处理一个关键词保存一次进度
-                    df.to_csv(csv_file, index=False, encoding='utf-8-sig')
-                    print(f"已保存当前进度 ({i+1}/{len(keywords)})")
-                    
-                    # 两次搜索之间增加等待时间
-                    time.sleep(1)
-                    
+                    payload = None
+                    if method == 'POST':
+                        length = int(self.headers.get('Content-Length') or 0)
+                        if length > SERVER_MAX_BODY:
+                            self.close_connection = True
+                            self._send(413, {'error': "请求体过大"})
+                            return
+                        body = self.rfile.read(length) if length else b''
+                        payload = json.loads(body.decode('utf-8')) if body else {}
+                    else:
+                        payload = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+                    self._send(200, route(payload))
+                except (ValueError, TypeError, KeyError, AttributeError) as e:
+                    self._send(400, {'error': f"请求格式错误: {e}"})
                 except Exception as e:
-                    print(f"处理关键词 {keyword} 时发生错误: {str(e)}")
-                    
-                    row_idx = df.index[df['文件名'] == keyword].tolist()
-                    if row_idx:
-                        idx = row_idx[0]
-                        df.at[idx, '搜索状态'] = '处理错误'
-                    
-                    df.to_csv(csv_file, index=False, encoding='utf-8-sig')
+                    self._send(500, {'error': str(e)})
+            
+            def _send(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8') if data is not None else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                if server.cors_origin:
+                    self.send_header('Access-Control-Allow-Origin', server.cors_origin)
+                    self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+                    self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+                self.end_headers()
+                self.wfile.write(body)
         
-        finally:
-            # 确保浏览器实例被关闭
-            if page:
-                try:
-                    print("正在关闭浏览器...")
-                    page.quit()
-                except Exception as e:
-                    print(f"关闭浏览器时出错: {str(e)}")
+        self.routes = {
+            ('POST', '/analyze'): self.analyze,
+            ('POST', '/resolve'): self.resolve,
+            ('GET', '/links'): self.links,
+            ('POST', '/refresh'): self.refresh,
+            ('GET', '/health'): self.health,
+        }
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def _links(self, file_name):
+        """缓存的下载链接，没有缓存时返回None"""
+        name = normalize_model_name(file_name)
+        now = time.monotonic()
+        with self.lock:
+            memo = self.link_memo.get(name)
+        if memo and memo[0] > now:
+            return memo[1]
         
-        # 创建HTML视图
-        html_file = create_html_view(csv_file)
-        if html_file:
-            print(f"已生成HTML结果文件: {html_file}")
-            return html_file
+        entry = self.cache.get(file_name)
+        links = None
+        if entry is not None:
+            links = {'found': entry['found'], 'download_link': entry['download_link'],
+                     'mirror_link': entry['mirror_link'], 'source': entry['source']}
+        if not (links and links['found']):
+            catalog_entry = lookup_catalogs(self.catalogs, file_name)
+            if catalog_entry:
+                download_link = catalog_link(catalog_entry)
+                links = {'found': True, 'download_link': download_link,
+                         'mirror_link': get_mirror_link(download_link), 'source': 'catalog'}
+        with self.lock:
+            if len(self.link_memo) >= SERVER_LINK_MEMO_MAX:
+                self.link_memo = {k: v for k, v in self.link_memo.items() if v[0] > now}
+                # 都未过期时整体清空，内存占用始终有上限
+                if len(self.link_memo) >= SERVER_LINK_MEMO_MAX:
+                    self.link_memo = {}
+            self.link_memo[name] = (now + SERVER_LINK_MEMO_TTL, links)
+        return links
+
+    def analyze(self, payload):
+        """分析POST的工作流，返回缺失的模型"""
+        start_time = time.perf_counter()
+        workflow = payload.get('workflow') or payload.get('prompt') or payload
+        references = extract_model_references(workflow) if 'nodes' in workflow \
+            else extract_prompt_references(workflow)
+        with self.index_lock:
+            missing = check_missing_references(references, os.getcwd(), self.model_index, self.dir_cache)
         
-        return True
-    
-    except Exception as e:
-        print(f"处理CSV文件时发生错误: {str(e)}")
-        return False
+        # 同一个文件名只返回一次，附带引用它的节点
+        merged = {}
+        for item in missing:
+            entry = merged.setdefault(item['file_path'], {'file_name': item['file_path'], 'nodes': [],
+                                                         'node_types': []})
+            entry['nodes'].append(item['node_id'])
+            if item['node_type'] not in entry['node_types']:
+                entry['node_types'].append(item['node_type'])
+        entries = [{'file_path': name} for name in merged]
+        with self.index_lock:
+            find_near_matches(entries, self.model_index)
+        for entry, matched in zip(merged.values(), entries):
+            entry['folder'] = model_folder_for('; '.join(entry['node_types']))
+            entry['links'] = self._links(entry['file_name'])
+            entry['near_matches'] = [{'path': path, 'score': score} for score, path in matched.get('near_matches', [])]
+        
+        return {
+            'references': len(references),
+            'missing': list(merged.values()),
+            'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 3),
+        }
+
+    def resolve(self, payload):
+        """查询文件名是否存在于本地以及缓存的下载链接"""
+        results = []
+        for file_name in payload['files']:
+            file_name = str(file_name)
+            with self.index_lock:
+                paths = list(self.model_index.lookup(file_name)) if self.model_index is not None else []
+            results.append({'file_name': file_name, 'present': bool(paths), 'paths': paths,
+                            'links': self._links(file_name)})
+        return {'files': results}
+
+    def links(self, payload):
+        name = payload['name']
+        return {'file_name': name, 'links': self._links(name)}
+
+    def refresh(self, payload=None):
+        """增量刷新模型库索引（只重新列出mtime变化的目录），有变化时才保存"""
+        start_time = time.perf_counter()
+        with self.index_lock:
+            if self.model_index is not None:
+                self.model_index.refresh()
+                if self.model_index.stats['changed']:
+                    self.model_index.save()
+            self.dir_cache = {}
+            models = len(self.model_index) if self.model_index is not None else 0
+        return {'models': models, 'elapsed_ms': round((time.perf_counter() - start_time) * 1000, 3)}
+
+    def health(self, payload=None):
+        return {
+            'status': 'ok',
+            'version': __version__,
+            'models': len(self.model_index) if self.model_index is not None else 0,
+            'roots': self.model_index.roots if self.model_index is not None else [],
+            'requests': self.requests,
+            'uptime_s': round(time.time() - self.started_at, 1),
+        }
+
+    def _refresh_loop(self):
+        """监视模型目录，只重新列出发生变化的目录，有文件增减时才保存索引"""
+        watcher = create_watcher(self.model_index.roots, interval=self.refresh_interval)
+        try:
+            while not self.stop_event.is_set():
+                changes = watcher.wait(self.refresh_interval)
+                if self.stop_event.is_set():
+                    break
+                try:
+                    if changes is None:
+                        self.refresh()
+                    elif changes[0]:
+                        with self.index_lock:
+                            if self.model_index.update_dirs(changes[0]):
+                                self.model_index.save()
+                                self.dir_cache = {}
+                except Exception as e:
+                    print(f"刷新模型库索引时出错: {e}")
+        finally:
+            watcher.close()
+
+    def _start_refresh(self):
+        # 空的索引也要监视（ModelIndex按文件数判断真假）
+        if self.refresh_interval and self.model_index is not None:
+            threading.Thread(target=self._refresh_loop, daemon=True).start()
+
+    def start(self):
+        """在后台线程中启动服务"""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self._start_refresh()
+        return self
 
-def create_html_view(csv_file):
-    """创建简单的HTML视图"""
+    def serve_forever(self):
+        self._start_refresh()
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.stop_event.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.cache.close()
+        for catalog in self.catalogs:
+            catalog.close()
+
+def run_serve(args):
+    """命令行API服务入口"""
     try:
-        # 读取CSV文件
+        server = ApiServer(args.host, args.port, model_roots=args.model_roots,
+                           refresh_interval=args.refresh_interval, cors_origin=args.cors_origin)
+    except OSError as e:
+        print(f"错误: 无法监听 {args.host}:{args.port}: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    
+    print(f"API服务已启动: {server.url}（按Ctrl+C停止）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("已停止服务")
+    finally:
+        server.httpd.server_close()
+        server.cache.close()
+    return EXIT_OK
+
+# ----- 精简GUI界面 -----
+
+# 日志区域最多保留的行数，超出时删除最早的行
+GUI_LOG_MAX_LINES = 5000
+
+# 界面从队列中取出日志和进度的间隔（毫秒）
+GUI_PUMP_INTERVAL = 50
+
+class LogPump:
+    """工作线程与Tk界面之间的日志泵
+
+    任何线程的print只追加到有界的环形缓冲区，进度只记录最新值，界面操作放入队列；
+    Tk主循环定时批量取出并一次性写入日志控件，工作线程从不直接调用Tk。
+    """
+
+    def __init__(self, root, text_widget, on_progress, max_lines=GUI_LOG_MAX_LINES, interval=GUI_PUMP_INTERVAL):
+        self.root = root
+        self.text = text_widget
+        self.on_progress = on_progress
+        self.max_lines = max_lines
+        self.interval = interval
+        # 界面来不及刷新时只保留最近的日志片段（print的内容和换行各算一个片段）
+        self.fragments = deque(maxlen=max_lines * 2)
+        self.dropped = 0
+        self.progress = None
+        self.calls = queue.SimpleQueue()
+        self.root.after(self.interval, self._drain)
+
+    def write(self, string):
+        """替代sys.stdout.write，可以在任何线程调用"""
+        if string:
+            if len(self.fragments) == self.fragments.maxlen:
+                self.dropped += 1
+            self.fragments.append(string)
+        return len(string)
+
+    def flush(self):
+        pass
+
+    def set_progress(self, percentage, text=None):
+        """记录最新进度，多次更新在下一次刷新时合并为一次"""
+        self.progress = (percentage, text)
+
+    def call(self, func):
+        """在Tk主线程中执行func（工作线程结束时更新界面、弹出对话框）"""
+        self.calls.put(func)
+
+    def clear(self):
+        """清空日志（只在主线程调用）"""
+        self.fragments.clear()
+        self.dropped = 0
+        self.text.delete(1.0, tk.END)
+
+    def _drain(self):
         try:
-            df = pd.read_csv(csv_file, encoding='utf-8')
-        except Exception:
-            df = pd.read_csv(csv_file, encoding='utf-8-sig')
-        
-        # 生成HTML文件名
-        html_file = os.path.splitext(csv_file)[0] + '.html'
-        
-        # 创建HTML内容
-        html_content = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>模型下载链接</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 20px; }
-                table { border-collapse: collapse; width: 100%; }
-                th, td { border: 1px solid #ddd; padding: 8px; text-align: left; }
-                th { background-color: #f2f2f2; }
-                tr:nth-child(even) { background-color: #f9f9f9; }
-                a { text-decoration: none; color: blue; }
-                a:hover { text-decoration: underline; }
-                .status-processed { color: blue; }
-                .status-notfound { color: red; }
-                .status-error { color: orange; }
-                .file-name { font-weight: bold; }
-                .link-col { max-width: 300px; word-break: break-all; }
-            </style>
-        </head>
-        <body>
-            <h1>模型下载链接</h1>
-            <p style="margin-bottom: 20px;">
-                注意：所有链接为通过网络搜索自动生成，查找结果可能不完全准确。
-            </p>
-            <table>
-                <tr>
-        """
-        
-        # 添加表头
-        core_columns = ['文件名', '下载链接', '镜像链接', '搜索状态']
-        for col in df.columns:
-            if col in core_columns or col in ['序号', '节点ID', '节点类型']:
-                html_content += f"<th>{col}</th>\n"
-        
-        html_content += "</tr>\n"
-        
-        # 添加数据行
-        for index, row in df.iterrows():
-            html_content += "<tr>\n"
+            self._flush_log()
             
-            for col in df.columns:
-                if col not in core_columns and col not in ['序号', '节点ID', '节点类型']:
-                    continue
-                    
-                value = row.get(col, '')
-                if pd.isna(value):
-                    value = ''
-                    
-                if col == '搜索状态':
-                    if value == '已处理':
-                        status_class = "status-processed"
-                    elif value == '处理错误':
-                        status_class = "status-error"
-                    else:
-                        status_class = "status-notfound"
-                    html_content += f'<td class="{status_class}">{value}</td>\n'
-                elif col == '文件名':
-                    html_content += f'<td class="file-name">{value}</td>\n'
-                elif col == '下载链接' or col == '镜像链接':
-                    if value and not pd.isna(value):
-                        html_content += f'<td class="link-col"><a href="{value}" target="_blank">{value}</a></td>\n'
-                    else:
-                        html_content += f'<td></td>\n'
-                else:
-                    html_content += f'<td>{value}</td>\n'
-            
-            html_content += "</tr>\n"
-        
-        html_content += """
-            </table>
-            <div style="margin-top: 20px;">
-                <h3>使用说明：</h3>
-                <ul>
-                    <li>优先使用镜像链接下载，速度更快</li>
-                    <li>如果镜像链接无效，可尝试原始下载链接</li>
-                    <li>状态为"已处理"表示已生成链接，但不保证链接有效</li>
-                    <li>状态为"未找到"表示在搜索引擎中未找到对应的模型</li>
-                    <li>状态为"处理错误"表示搜索过程中发生错误</li>
-                </ul>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # 写入HTML文件
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            progress, self.progress = self.progress, None
+            if progress is not None:
+                self.on_progress(*progress)
+            
+            while True:
+                try:
+                    func = self.calls.get_nowait()
+                except queue.Empty:
+                    break
+                func()
+        finally:
+            self.root.after(self.interval, self._drain)
+
+    def _flush_log(self):
+        """把缓冲区中的日志一次性写入控件，并把控件中的行数限制在max_lines以内"""
+        if not self.fragments:
+            return
+        parts = []
+        if self.dropped:
+            parts.append(f"... 省略了 {self.dropped} 条日志 ...\n")
+            self.dropped = 0
+        while self.fragments:
+            try:
+                parts.append(self.fragments.popleft())
+            except IndexError:
+                break
         
-        return html_file
-    except Exception as e:
-        print(f"创建HTML视图时出错: {e}")
-        return None 
+        self.text.insert(tk.END, ''.join(parts))
+        lines = int(self.text.index('end-1c').split('.')[0])
+        if lines > self.max_lines:
+            self.text.delete('1.0', f"{lines - self.max_lines + 1}.0")
+        self.text.see(tk.END)
 
-# ----- 精简GUI界面 -----
 
 class SimpleModelFinder:
     def __init__(self, root):
         self.root = root
         self.root.title("模型查找器 - 精简版")
-        self.root.geometry("600x500")
+        self.root.geometry("600x530")
         
         # 创建主框架
         main_frame = ttk.Frame(root, padding="10")
@@ -540,40 +5420,56 @@ class SimpleModelFinder:
         ttk.Entry(main_frame, textvariable=self.workflow_path, width=50).grid(row=1, column=1, sticky="ew", padx=5)
         ttk.Button(main_frame, text="浏览...", command=self.browse_workflow).grid(row=1, column=2, padx=5)
         
-        ttk.Button(main_frame, text="分析缺失文件", command=self.analyze_workflow).grid(row=2, column=0, columnspan=3, sticky="w", pady=5)
+        # 模型根目录，多个目录用系统路径分隔符分隔
+        ttk.Label(main_frame, text="模型目录:").grid(row=2, column=0, sticky="w")
+        self.model_roots = tk.StringVar(value=os.environ.get(MODEL_ROOTS_ENV, ''))
+        ttk.Entry(main_frame, textvariable=self.model_roots, width=50).grid(row=2, column=1, sticky="ew", padx=5)
+        ttk.Button(main_frame, text="添加...", command=self.browse_model_root).grid(row=2, column=2, padx=5)
+        
+        analyze_frame = ttk.Frame(main_frame)
+        analyze_frame.grid(row=3, column=0, columnspan=3, sticky="w", pady=5)
+        ttk.Button(analyze_frame, text="分析缺失文件", command=self.analyze_workflow).pack(side=tk.LEFT, padx=(0, 10))
+        self.hash_identity = tk.BooleanVar(value=False)
+        ttk.Checkbutton(analyze_frame, text="按内容哈希识别重命名的模型", variable=self.hash_identity).pack(side=tk.LEFT)
         
-        ttk.Separator(main_frame, orient="horizontal").grid(row=3, column=0, columnspan=3, sticky="ew", pady=10)
+        ttk.Separator(main_frame, orient="horizontal").grid(row=4, column=0, columnspan=3, sticky="ew", pady=10)
         
         # 下半部分 - 链接生成
-        ttk.Label(main_frame, text="第二步：搜索模型下载链接", font=("Arial", 10, "bold")).grid(row=4, column=0, columnspan=3, sticky="w", pady=(0, 5))
+        ttk.Label(main_frame, text="第二步：搜索模型下载链接", font=("Arial", 10, "bold")).grid(row=5, column=0, columnspan=3, sticky="w", pady=(0, 5))
         
-        ttk.Label(main_frame, text="CSV文件:").grid(row=5, column=0, sticky="w")
+        ttk.Label(main_frame, text="CSV文件:").grid(row=6, column=0, sticky="w")
         self.csv_path = tk.StringVar()
-        ttk.Entry(main_frame, textvariable=self.csv_path, width=50).grid(row=5, column=1, sticky="ew", padx=5)
-        ttk.Button(main_frame, text="浏览...", command=self.browse_csv).grid(row=5, column=2, padx=5)
+        ttk.Entry(main_frame, textvariable=self.csv_path, width=50).grid(row=6, column=1, sticky="ew", padx=5)
+        ttk.Button(main_frame, text="浏览...", command=self.browse_csv).grid(row=6, column=2, padx=5)
         
         search_frame = ttk.Frame(main_frame)
-        search_frame.grid(row=6, column=0, columnspan=3, sticky="ew", pady=5)
+        search_frame.grid(row=7, column=0, columnspan=3, sticky="ew", pady=5)
         ttk.Button(search_frame, text="搜索下载链接", command=self.search_links).pack(side=tk.LEFT, padx=(0, 5))
+        self.verify_after_search = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="验证链接", variable=self.verify_after_search).pack(side=tk.LEFT, padx=(0, 5))
+        self.keep_browser = tk.BooleanVar(value=browser_service_enabled())
+        ttk.Checkbutton(search_frame, text="常驻浏览器", variable=self.keep_browser,
+                        command=self.warm_browser).pack(side=tk.LEFT, padx=(0, 5))
         self.view_html_btn = ttk.Button(search_frame, text="查看结果", command=self.view_html, state=tk.DISABLED)
-        self.view_html_btn.pack(side=tk.LEFT)
+        self.view_html_btn.pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(search_frame, text="下载模型", command=self.download_models).pack(side=tk.LEFT)
         
         # 添加进度条
         progress_frame = ttk.Frame(main_frame)
-        progress_frame.grid(row=7, column=0, columnspan=3, sticky="ew", pady=5)
+        progress_frame.grid(row=8, column=0, columnspan=3, sticky="ew", pady=5)
         ttk.Label(progress_frame, text="进度:").pack(side=tk.LEFT, padx=(0, 5))
         self.progress_bar = ttk.Progressbar(progress_frame, orient=tk.HORIZONTAL, length=100, mode='determinate')
         self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         self.progress_label = ttk.Label(progress_frame, text="0%")
         self.progress_label.pack(side=tk.LEFT, padx=5)
         
-        ttk.Separator(main_frame, orient="horizontal").grid(row=8, column=0, columnspan=3, sticky="ew", pady=10)
+        ttk.Separator(main_frame, orient="horizontal").grid(row=9, column=0, columnspan=3, sticky="ew", pady=10)
         
         # 日志区域
-        ttk.Label(main_frame, text="处理日志:").grid(row=9, column=0, columnspan=3, sticky="w", pady=(0, 5))
+        ttk.Label(main_frame, text="处理日志:").grid(row=10, column=0, columnspan=3, sticky="w", pady=(0, 5))
         
         log_frame = ttk.Frame(main_frame)
-        log_frame.grid(row=10, column=0, columnspan=3, sticky="nsew", pady=(0, 5))
+        log_frame.grid(row=11, column=0, columnspan=3, sticky="nsew", pady=(0, 5))
         
         self.log_text = tk.Text(log_frame, height=10, wrap=tk.WORD)
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -584,7 +5480,7 @@ class SimpleModelFinder:
         
         # 使主框架的列可伸缩
         main_frame.columnconfigure(1, weight=1)
-        main_frame.rowconfigure(10, weight=1)
+        main_frame.rowconfigure(11, weight=1)
         
         # 状态栏
         self.status_var = tk.StringVar(value="就绪")
@@ -594,8 +5490,28 @@ class SimpleModelFinder:
         # 存储HTML文件路径
         self.html_file_path = None
         
+        # 所有print输出都经由日志泵写入日志区域
+        self.log_pump = LogPump(root, self.log_text, self.show_progress)
+        sys.stdout = self.log_pump
+        
         # 初始化日志
         self.show_welcome_message()
+        
+        # 使用常驻浏览器时在后台提前启动，第一次搜索不必等待浏览器启动
+        self.warm_browser()
+    
+    def warm_browser(self):
+        """勾选"常驻浏览器"时在后台启动或连接常驻浏览器"""
+        if not self.keep_browser.get() or not DRISSION_AVAILABLE:
+            return
+        
+        def warm():
+            try:
+                if _load_drission():
+                    get_browser_service().connect()
+            except Exception as e:
+                print(f"启动常驻浏览器失败: {e}")
+        threading.Thread(target=warm, daemon=True).start()
     
     def show_welcome_message(self):
         """显示欢迎消息"""
@@ -607,12 +5523,6 @@ class SimpleModelFinder:
         self.log_text.delete(1.0, tk.END)
         self.log_text.insert(tk.END, welcome_text)
     
-    def update_log(self, message):
-        """更新日志显示"""
-        self.log_text.insert(tk.END, message + "\n")
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
-    
     def browse_workflow(self):
         """浏览工作流文件"""
         file_path = filedialog.askopenfilename(
@@ -622,6 +5532,15 @@ class SimpleModelFinder:
         if file_path:
             self.workflow_path.set(file_path)
     
+    def browse_model_root(self):
+        """添加模型根目录"""
+        directory = filedialog.askdirectory(title="选择模型目录")
+        if directory:
+            roots = get_model_roots(self.model_roots.get())
+            if os.path.abspath(directory) not in roots:
+                roots.append(os.path.abspath(directory))
+            self.model_roots.set(os.pathsep.join(roots))
+    
     def browse_csv(self):
         """浏览CSV文件"""
         file_path = filedialog.askopenfilename(
@@ -633,7 +5552,7 @@ class SimpleModelFinder:
             self.view_html_btn.config(state=tk.DISABLED)
     
     def analyze_workflow(self):
-        """分析工作流文件"""
+        """分析工作流文件（在后台线程中运行，界面不会冻结）"""
         workflow_file = self.workflow_path.get().strip()
         if not workflow_file:
             messagebox.showerror("错误", "请选择工作流JSON文件")
@@ -644,52 +5563,48 @@ class SimpleModelFinder:
             return
         
         # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        self.log_pump.clear()
         self.status_var.set("正在分析...")
+        self.disable_buttons()
         
-        # 重定向stdout到Text控件
-        class StdoutRedirector:
-            def __init__(self, text_widget):
-                self.text_widget = text_widget
-            
-            def write(self, string):
-                self.text_widget.insert(tk.END, string)
-                self.text_widget.see(tk.END)
-                self.text_widget.update_idletasks()
-            
-            def flush(self):
-                pass
-        
-        old_stdout = sys.stdout
-        sys.stdout = StdoutRedirector(self.log_text)
+        # Tk变量只能在主线程读取，先取出再交给工作线程
+        model_roots = self.model_roots.get()
+        hash_identity = self.hash_identity.get()
         
-        try:
-            # 分析工作流
-            missing_files = find_missing_models(workflow_file)
-            
-            if missing_files:
-                # 创建CSV文件
-                output_file = os.path.basename(workflow_file)
-                csv_file = create_csv_file(missing_files, output_file)
+        def analyze_thread():
+            try:
+                # 分析工作流
+                missing_files = find_missing_models(workflow_file, model_roots=model_roots,
+                                                    hash_identity=hash_identity)
                 
-                if csv_file:
-                    # 自动设置CSV路径
-                    self.csv_path.set(csv_file)
+                if missing_files:
+                    # 创建CSV文件
+                    output_file = os.path.basename(workflow_file)
+                    csv_file = create_csv_file(missing_files, output_file)
                     
-                    messagebox.showinfo("完成", f"发现 {len(missing_files)} 个缺失文件，已保存到CSV文件")
-                    self.status_var.set(f"分析完成: 找到 {len(missing_files)} 个缺失文件")
-                
-            else:
-                messagebox.showinfo("完成", "没有发现缺失文件")
-                self.status_var.set("分析完成: 没有缺失文件")
-        
-        except Exception as e:
-            messagebox.showerror("错误", f"分析过程中出错: {str(e)}")
-            self.status_var.set("分析失败")
+                    if csv_file:
+                        missing_count = sum(1 for missing in missing_files if not missing.get('present_as'))
+                        
+                        def done():
+                            # 自动设置CSV路径
+                            self.csv_path.set(csv_file)
+                            self.status_var.set(f"分析完成: 找到 {missing_count} 个缺失文件")
+                            messagebox.showinfo("完成", f"发现 {missing_count} 个缺失文件，已保存到CSV文件")
+                        self.log_pump.call(done)
+                else:
+                    self.log_pump.call(lambda: self.status_var.set("分析完成: 没有缺失文件"))
+                    self.log_pump.call(lambda: messagebox.showinfo("完成", "没有发现缺失文件"))
+            
+            except Exception as e:
+                # except块结束后e会被删除，先取出消息再交给界面线程
+                msg = str(e)
+                self.log_pump.call(lambda: self.status_var.set("分析失败"))
+                self.log_pump.call(lambda: messagebox.showerror("错误", f"分析过程中出错: {msg}"))
+            
+            finally:
+                self.log_pump.call(self.enable_buttons)
         
-        finally:
-            # 恢复stdout
-            sys.stdout = old_stdout
+        threading.Thread(target=analyze_thread, daemon=True).start()
     
     def search_links(self):
         """搜索模型下载链接"""
@@ -702,92 +5617,120 @@ class SimpleModelFinder:
             messagebox.showerror("错误", "文件不存在")
             return
         
-        if not DRISSION_AVAILABLE:
-            messagebox.showerror("错误", "DrissionPage库未安装，请运行 'pip install DrissionPage' 安装")
-            return
-        
         # 清空日志
-        self.log_text.delete(1.0, tk.END)
+        self.log_pump.clear()
         self.status_var.set("搜索中...")
         self.view_html_btn.config(state=tk.DISABLED)
         
         # 重置进度条
-        self.progress_bar['value'] = 0
-        self.progress_label.config(text="0%")
+        self.show_progress(0)
         
         # 禁用按钮
-        for widget in self.root.winfo_children():
-            if isinstance(widget, ttk.Button):
-                widget.config(state=tk.DISABLED)
+        self.disable_buttons()
+        
+        verify = self.verify_after_search.get()
+        keep_browser = self.keep_browser.get()
         
         # 在单独的线程中执行搜索，避免界面冻结
         def search_thread():
-            # 重定向stdout到Text控件
-            class StdoutRedirector:
-                def __init__(self, text_widget):
-                    self.text_widget = text_widget
-                
-                def write(self, string):
-                    self.text_widget.insert(tk.END, string)
-                    self.text_widget.see(tk.END)
-                    self.text_widget.update_idletasks()
-                
-                def flush(self):
-                    pass
-            
-            # 更新进度条的回调函数
+            # 更新进度条的回调函数（只记录最新进度，由界面定时刷新）
             def update_progress(current, total):
                 if total > 0:
-                    percentage = int((current / total) * 100)
-                    self.root.after(0, lambda: self.progress_bar.config(value=percentage))
-                    self.root.after(0, lambda: self.progress_label.config(text=f"{percentage}%"))
-            
-            old_stdout = sys.stdout
-            sys.stdout = StdoutRedirector(self.log_text)
+                    self.log_pump.set_progress(int((current / total) * 100))
             
             try:
-                result = search_model_links(csv_file, progress_callback=update_progress)
+                backend = get_search_backend(browser_service=keep_browser)
+                result = search_model_links(csv_file, progress_callback=update_progress, verify=verify,
+                                            backend=backend)
                 
                 if isinstance(result, str) and os.path.exists(result):
-                    self.html_file_path = result
-                    self.status_var.set("搜索完成")
-                    
-                    # 确保进度条显示100%
-                    self.root.after(0, lambda: self.progress_bar.config(value=100))
-                    self.root.after(0, lambda: self.progress_label.config(text="100%"))
-                    
-                    # 在主线程中启用HTML查看按钮
-                    self.root.after(0, lambda: self.view_html_btn.config(state=tk.NORMAL))
-                    self.root.after(0, lambda: messagebox.showinfo("完成", "搜索完成，可以查看HTML结果"))
+                    def done():
+                        self.html_file_path = result
+                        self.status_var.set("搜索完成")
+                        
+                        # 确保进度条显示100%
+                        self.show_progress(100)
+                        
+                        # 启用HTML查看按钮
+                        self.view_html_btn.config(state=tk.NORMAL)
+                        messagebox.showinfo("完成", "搜索完成，可以查看HTML结果")
+                    self.log_pump.call(done)
                 else:
-                    self.status_var.set("搜索完成，但没有生成HTML结果")
-                    self.root.after(0, lambda: messagebox.showinfo("完成", "搜索完成"))
+                    self.log_pump.call(lambda: self.status_var.set("搜索完成，但没有生成HTML结果"))
+                    self.log_pump.call(lambda: messagebox.showinfo("完成", "搜索完成"))
             
             except Exception as e:
-                self.status_var.set("搜索失败")
-                self.root.after(0, lambda: messagebox.showerror("错误", f"搜索过程中出错: {str(e)}"))
+                # except块结束后e会被删除，先取出消息再交给界面线程
+                msg = str(e)
+                self.log_pump.call(lambda: self.status_var.set("搜索失败"))
+                self.log_pump.call(lambda: messagebox.showerror("错误", f"搜索过程中出错: {msg}"))
             
             finally:
-                # 恢复stdout
-                sys.stdout = old_stdout
-                
                 # 启用按钮
-                self.root.after(0, lambda: self.enable_buttons())
+                self.log_pump.call(self.enable_buttons)
         
         threading.Thread(target=search_thread, daemon=True).start()
     
+    def download_models(self):
+        """把搜索到的模型下载到模型目录"""
+        csv_file = self.csv_path.get().strip()
+        if not csv_file or not os.path.exists(csv_file):
+            messagebox.showerror("错误", "请选择已搜索过链接的CSV文件")
+            return
+        
+        # 下载到第一个模型根目录，未设置时让用户选择
+        roots = get_model_roots(self.model_roots.get())
+        models_dir = roots[0] if roots else filedialog.askdirectory(title="选择ComfyUI的models目录")
+        if not models_dir:
+            return
+        
+        self.status_var.set("下载中...")
+        self.show_progress(0)
+        self.disable_buttons()
+        
+        def download_thread():
+            def update_progress(current, total):
+                if total > 0:
+                    percentage = int((current / total) * 100)
+                    self.log_pump.set_progress(
+                        percentage, f"{percentage}% ({current / 1024 / 1024:.0f}/{total / 1024 / 1024:.0f} MB)")
+            
+            try:
+                ok, failed = download_models(csv_file, models_dir, progress_callback=update_progress)
+                self.log_pump.call(lambda: self.status_var.set(f"下载完成: 成功 {ok} 个，失败 {failed} 个"))
+                self.log_pump.call(lambda: messagebox.showinfo("完成", f"下载完成: 成功 {ok} 个，失败 {failed} 个"))
+            except Exception as e:
+                # except块结束后e会被删除，先取出消息再交给界面线程
+                msg = str(e)
+                self.log_pump.call(lambda: self.status_var.set("下载失败"))
+                self.log_pump.call(lambda: messagebox.showerror("错误", f"下载过程中出错: {msg}"))
+            
+            finally:
+                self.log_pump.call(self.enable_buttons)
+        
+        threading.Thread(target=download_thread, daemon=True).start()
+    
+    def show_progress(self, percentage, text=None):
+        """更新进度条（只在主线程调用）"""
+        self.progress_bar.config(value=percentage)
+        self.progress_label.config(text=text or f"{percentage}%")
+    
+    def _set_buttons_state(self, state):
+        """设置所有按钮的状态（包括嵌套在框架中的按钮）"""
+        pending = list(self.root.winfo_children())
+        while pending:
+            widget = pending.pop()
+            if isinstance(widget, ttk.Button):
+                widget.config(state=state)
+            pending.extend(widget.winfo_children())
+    
+    def disable_buttons(self):
+        """禁用所有按钮"""
+        self._set_buttons_state(tk.DISABLED)
+    
     def enable_buttons(self):
         """启用所有按钮"""
-        for widget in self.root.winfo_children():
-            if isinstance(widget, ttk.Frame):
-                for child in widget.winfo_children():
-                    if isinstance(child, ttk.Button):
-                        child.config(state=tk.NORMAL)
-                for grandchild in widget.winfo_children():
-                    if isinstance(grandchild, ttk.Frame):
-                        for child in grandchild.winfo_children():
-                            if isinstance(child, ttk.Button):
-                                child.config(state=tk.NORMAL)
+        self._set_buttons_state(tk.NORMAL)
     
     def view_html(self):
         """查看HTML结果"""
@@ -806,8 +5749,9 @@ class SimpleModelFinder:
 
 # ----- 主函数 -----
 
-def main():
+def run_gui():
     root = tk.Tk()
+    old_stdout = sys.stdout
     app = SimpleModelFinder(root)
     
     # 设置图标
@@ -816,7 +5760,164 @@ def main():
     except:
         pass
     
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        sys.stdout = old_stdout
+
+def build_arg_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description="模型查找器 - 检测缺失模型并生成下载链接（不带参数时启动图形界面）")
+    parser.add_argument('--version', action='version', version=f"%(prog)s {__version__}")
+    parser.add_argument('--profile', metavar='TRACE_JSON',
+                        help="记录各阶段耗时，结束时写入Chrome trace-event JSON（chrome://tracing 或 Perfetto 打开）"
+                             "并打印汇总表；批量分析的子进程不记录，需要逐个工作流的耗时时加 -j 1")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    batch_parser = subparsers.add_parser(
+        'batch', help="批量分析工作流目录",
+        description="批量分析工作流，汇总缺失模型。退出码: 0=无缺失, 1=有缺失, 2=解析错误")
+    batch_parser.add_argument('paths', nargs='+', help="工作流目录、文件或通配符（如 'workflows/**/*.json'）")
+    batch_parser.add_argument('-o', '--output', default='missing_models.csv', help="报告文件（.csv 或 .jsonl）")
+    batch_parser.add_argument('--format', choices=['csv', 'jsonl'], help="报告格式，默认按文件扩展名判断")
+    batch_parser.add_argument('-j', '--workers', type=int, help="进程数，默认为CPU核数")
+    batch_parser.add_argument('--model-roots', help=f"模型根目录，多个用'{os.pathsep}'分隔，默认读取{MODEL_ROOTS_ENV}")
+    batch_parser.add_argument('--hash-identity', action='store_true',
+                              help="按内容哈希（SHA-256）识别以其他文件名存在于本地的模型，不计为缺失")
+    batch_parser.add_argument('--no-near-matches', action='store_true',
+                              help=f"不查找文件名近似的本地模型（报告中的'{FUZZY_MATCH_COLUMN}'列）")
+    batch_parser.set_defaults(func=run_batch)
+    
+    search_parser = subparsers.add_parser('search', help="为CSV中的缺失模型搜索下载链接")
+    search_parser.add_argument('csv_file', help="缺失模型CSV（分析结果或批量报告）")
+    search_parser.add_argument('--backend', choices=['bing', 'hf'], help="搜索后端，默认bing（未安装DrissionPage时为hf）")
+    search_parser.add_argument('--hf-endpoint', help=f"Hugging Face兼容API地址，默认{HF_ENDPOINT}")
+    search_parser.add_argument('-j', '--workers', type=int, help="并发数（浏览器标签页数或HTTP并发请求数）")
+    search_parser.add_argument('--no-cache', action='store_true', help="不读写搜索结果缓存")
+    search_parser.add_argument('--cache-ttl', type=float, metavar='HOURS',
+                               help=f"搜索结果缓存的有效期（小时），默认{CACHE_TTL // 3600}")
+    search_parser.add_argument('--negative-cache-ttl', type=float, metavar='HOURS',
+                               help=f"\"未找到\"结果缓存的有效期（小时），默认{NEGATIVE_CACHE_TTL // 3600}")
+    search_parser.add_argument('--compact-interval', type=int, default=JOURNAL_COMPACT_INTERVAL, metavar='N',
+                               help="每解析N个关键词把进度日志合并回CSV和HTML，默认0（只在结束时合并）")
+    search_parser.add_argument('--no-catalog', action='store_true', help="不查询离线模型目录")
+    search_parser.add_argument('--no-expand-repos', action='store_true', help="不获取命中仓库的完整文件列表")
+    search_parser.add_argument('--browser-service', action='store_true',
+                               help=f"连接常驻浏览器（没有运行时启动），搜索结束后不关闭；默认读取{BROWSER_SERVICE_ENV}")
+    search_parser.add_argument('--html-mode', choices=['table', 'compact'],
+                               help=f"HTML视图模式，默认超过{HTML_COMPACT_THRESHOLD}行时使用compact（浏览器端分页）")
+    search_parser.add_argument('--verify', action='store_true', help="搜索完成后验证所有下载链接和镜像链接")
+    search_parser.add_argument('--mirrors', help=f"镜像列表，用逗号分隔，镜像列使用测速最快的可用镜像，默认读取{MIRRORS_ENV}")
+    search_parser.set_defaults(func=run_search)
+    
+    verify_parser = subparsers.add_parser(
+        'verify', help="验证CSV中的下载链接",
+        description="并发发送HEAD请求验证下载链接和镜像链接，状态码、文件大小和ETag写入CSV。"
+                    "退出码: 0=全部有效, 1=有无效链接")
+    verify_parser.add_argument('csv_file', help="搜索结果CSV")
+    verify_parser.add_argument('-j', '--workers', type=int, help=f"并发请求数，默认{VERIFY_CONCURRENCY}")
+    verify_parser.add_argument('--no-cache', action='store_true', help="不使用缓存的验证结果")
+    verify_parser.add_argument('--html-mode', choices=['table', 'compact'], help="HTML视图模式")
+    verify_parser.set_defaults(func=run_verify)
+    
+    download_parser = subparsers.add_parser(
+        'download', help="下载CSV中已找到链接的模型",
+        description="按节点类型把模型下载到models目录下对应的子目录，每个文件多连接分段下载，"
+                    "中断后重新运行会从.part文件续传。退出码: 0=全部成功, 1=有下载失败")
+    download_parser.add_argument('csv_file', help="搜索结果CSV")
+    download_parser.add_argument('-d', '--models-dir', help=f"ComfyUI的models目录，默认为{MODEL_ROOTS_ENV}中的第一个目录")
+    download_parser.add_argument('-j', '--files', type=int, default=DOWNLOAD_FILES,
+                                 help=f"同时下载的文件数，默认{DOWNLOAD_FILES}")
+    download_parser.add_argument('-c', '--connections', type=int, default=DOWNLOAD_CONNECTIONS,
+                                 help=f"每个文件的连接数，默认{DOWNLOAD_CONNECTIONS}")
+    download_parser.add_argument('--limit-rate', help="总带宽上限，如 10M、500K（字节/秒）")
+    download_parser.add_argument('--origin', action='store_true', help="优先使用原始链接而不是最快的镜像")
+    download_parser.add_argument('--mirrors', help=f"镜像列表，用逗号分隔，默认读取{MIRRORS_ENV}")
+    download_parser.set_defaults(func=run_download)
+    
+    watch_parser = subparsers.add_parser(
+        'watch', help="持续监视工作流和模型目录，增量更新缺失模型报告",
+        description="工作流或模型目录变化时只重新分析受影响的工作流，只更新报告中受影响的行（保留已有的搜索结果）。"
+                    "Linux上使用inotify，其他平台轮询。按Ctrl+C停止")
+    watch_parser.add_argument('paths', nargs='+', help="工作流目录或文件")
+    watch_parser.add_argument('-o', '--output', default='missing_models.csv', help="报告文件（.csv）")
+    watch_parser.add_argument('--model-roots', help=f"模型根目录，多个用'{os.pathsep}'分隔，默认读取{MODEL_ROOTS_ENV}")
+    watch_parser.add_argument('--polling', action='store_true', help="不使用inotify，改为轮询")
+    watch_parser.add_argument('--interval', type=float, default=WATCH_POLL_INTERVAL,
+                              help=f"轮询间隔（秒），默认{WATCH_POLL_INTERVAL}")
+    watch_parser.add_argument('--html-mode', choices=['table', 'compact'], help="HTML视图模式")
+    watch_parser.set_defaults(func=run_watch)
+    
+    serve_parser = subparsers.add_parser(
+        'serve', help="启动本地JSON API服务",
+        description="模型库索引和搜索结果缓存常驻内存，通过HTTP查询工作流缺失的模型。"
+                    "接口: POST /analyze, POST /resolve, GET /links?name=, POST /refresh, GET /health")
+    serve_parser.add_argument('--host', default=SERVER_HOST, help=f"监听地址，默认{SERVER_HOST}")
+    serve_parser.add_argument('--port', type=int, default=SERVER_PORT, help=f"端口，默认{SERVER_PORT}")
+    serve_parser.add_argument('--model-roots', help=f"模型根目录，多个用'{os.pathsep}'分隔，默认读取{MODEL_ROOTS_ENV}")
+    serve_parser.add_argument('--refresh-interval', type=float, default=SERVER_INDEX_REFRESH,
+                              help=f"检查模型目录变化的间隔（秒，有inotify时目录变化后立即更新），"
+                                   f"0表示不自动刷新，默认{SERVER_INDEX_REFRESH}")
+    serve_parser.add_argument('--cors-origin', help="允许跨域访问的来源（如ComfyUI前端的地址），默认不允许")
+    serve_parser.set_defaults(func=run_serve)
+    
+    catalog_parser = subparsers.add_parser(
+        'catalog', help="管理离线模型目录",
+        description="离线模型目录记录常见模型的 文件名 -> 仓库/路径，搜索时先查询目录，命中的模型不访问网络。"
+                    f"本机目录: {USER_CATALOG}，随程序发布的目录: {BUNDLED_CATALOG}")
+    catalog_subparsers = catalog_parser.add_subparsers(dest='catalog_command', required=True)
+    merge_parser = catalog_subparsers.add_parser('merge', help="把已解析的结果CSV合并进目录")
+    merge_parser.add_argument('csv_files', nargs='+', help="搜索结果CSV（只收录下载链接指向同名文件的行）")
+    merge_parser.add_argument('-o', '--catalog', default=USER_CATALOG, help="目录文件，默认为本机目录")
+    show_parser = catalog_subparsers.add_parser('show', help="以CSV格式输出目录内容")
+    show_parser.add_argument('--catalog', help="目录文件，默认输出本机目录和随程序发布的目录")
+    lookup_parser = catalog_subparsers.add_parser('lookup', help="查询文件名")
+    lookup_parser.add_argument('names', nargs='+', help="模型文件名")
+    catalog_parser.set_defaults(func=run_catalog)
+    
+    browser_parser = subparsers.add_parser(
+        'browser', help="管理常驻浏览器",
+        description="常驻浏览器在固定调试端口上持续运行，搜索（--browser-service 或界面勾选\"常驻浏览器\"）时直接连接，"
+                    "不必每次启动Chromium；标签页达到使用次数或内存上限时自动回收，浏览器内存过高时在两次搜索之间重启")
+    browser_parser.add_argument('browser_command', choices=['start', 'status', 'stop'], help="启动、查看状态或关闭")
+    browser_parser.add_argument('--port', type=int, default=BROWSER_SERVICE_PORT,
+                                help=f"调试端口，默认{BROWSER_SERVICE_PORT}（环境变量MODEL_FINDER_BROWSER_PORT）")
+    browser_parser.set_defaults(func=run_browser)
+    
+    return parser
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    
+    # 不带参数时启动图形界面
+    if not argv:
+        run_gui()
+        return EXIT_OK
+    
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return EXIT_ERROR
+    if not args.profile:
+        return args.func(args)
+    
+    tracer = start_profiling()
+    try:
+        with trace_span(args.command, 'command'):
+            return args.func(args)
+    finally:
+        stop_profiling()
+        tracer.print_summary()
+        try:
+            print(f"\n性能剖析结果已保存: {os.path.abspath(tracer.write_trace(args.profile))}")
+        except OSError as e:
+            print(f"\n保存性能剖析结果时出错: {e}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    # 只有打包成exe时才需要freeze_support，普通启动省去导入multiprocessing
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    sys.exit(main())
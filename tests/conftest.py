@@ -0,0 +1,25 @@
+"""
+测试公共部分：复用性能基准中的本地模拟服务器（模拟CDN、Bing和 /api/models），完全离线运行。
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+from benchmark import FakeServer, mf  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """每个测试使用独立的缓存目录，不读写用户的 ~/.model_finder"""
+    directory = tmp_path / 'cache'
+    monkeypatch.setattr(mf, 'CACHE_DIR', str(directory))
+    return directory
+
+@pytest.fixture
+def server():
+    with FakeServer() as fake:
+        yield fake
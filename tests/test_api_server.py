@@ -0,0 +1,92 @@
+"""
+本地API服务：分析、查询和刷新接口，以及刷新与查询并发时的索引一致性
+"""
+
+import json
+import os
+import threading
+
+from benchmark import mf
+
+def test_api_server_analyze(tmp_path):
+    loras = tmp_path / 'models' / 'loras'
+    loras.mkdir(parents=True)
+    (loras / 'present.safetensors').write_bytes(b'')
+    cache = mf.ResolutionCache(str(tmp_path / 'cache.sqlite3'))
+    cache.put('absent_lora.safetensors', 'https://huggingface.co/org/repo/resolve/main/absent_lora.safetensors',
+              'https://hf-mirror.com/org/repo/resolve/main/absent_lora.safetensors', source='test')
+    prompt = {'prompt': {
+        '1': {'class_type': 'LoraLoader', 'inputs': {'lora_name': 'present.safetensors', 'strength_model': 1.0}},
+        '2': {'class_type': 'LoraLoader', 'inputs': {'lora_name': 'absent_lora.safetensors', 'strength_model': 1.0}},
+        '3': {'class_type': 'LoraLoader', 'inputs': {'lora_name': 'absent_lora.safetensors', 'strength_model': 0.5}},
+    }}
+
+    server = mf.ApiServer(port=0, model_roots=[str(tmp_path / 'models')], cache=cache, refresh_interval=0).start()
+    pool = mf.HttpConnectionPool()
+    try:
+        response = pool.request('POST', server.url + '/analyze', body=json.dumps(prompt).encode('utf-8'))
+        assert response.status == 200
+        result = response.json()
+        assert result['references'] == 3
+        assert len(result['missing']) == 1
+        missing = result['missing'][0]
+        assert missing['file_name'] == 'absent_lora.safetensors'
+        assert sorted(missing['nodes']) == ['2', '3']
+        assert missing['folder'] == 'loras'
+        assert missing['links']['found'] and missing['links']['source'] == 'test'
+
+        response = pool.request('POST', server.url + '/analyze', body=b'{not json')
+        assert response.status == 400
+        assert pool.request('GET', server.url + '/health').json()['requests'] == 3
+    finally:
+        pool.close()
+        server.shutdown()
+
+def test_refresh_while_analyzing(tmp_path):
+    loras = tmp_path / 'models' / 'loras'
+    loras.mkdir(parents=True)
+    for i in range(200):
+        (loras / f"lora_{i}.safetensors").write_bytes(b'')
+    prompt = json.dumps({'prompt': {
+        str(i): {'class_type': 'LoraLoader', 'inputs': {'lora_name': f"lora_{i}_v2.safetensors", 'strength_model': 1.0}}
+        for i in range(50)}}).encode('utf-8')
+
+    server = mf.ApiServer(port=0, model_roots=[str(tmp_path / 'models')],
+                          cache=mf.ResolutionCache(str(tmp_path / 'cache.sqlite3')), refresh_interval=0).start()
+    statuses = []
+    stop = threading.Event()
+
+    def client():
+        pool = mf.HttpConnectionPool()
+        try:
+            while not stop.is_set():
+                statuses.append(pool.request('POST', server.url + '/analyze', body=prompt).status)
+                statuses.append(pool.request('POST', server.url + '/resolve',
+                                             body=b'{"files": ["lora_1.safetensors"]}').status)
+        finally:
+            pool.close()
+
+    clients = [threading.Thread(target=client) for _ in range(4)]
+    for thread in clients:
+        thread.start()
+    pool = mf.HttpConnectionPool()
+    try:
+        # 不断增删文件和子目录，同时通过接口和直接调用两条路径刷新索引
+        for i in range(30):
+            subdir = loras / f"batch_{i % 3}"
+            subdir.mkdir(exist_ok=True)
+            for j in range(20):
+                (subdir / f"lora_{j}_v{i}.safetensors").write_bytes(b'')
+            assert pool.request('POST', server.url + '/refresh').status == 200
+            for path in subdir.iterdir():
+                os.remove(path)
+            subdir.rmdir()
+            server.refresh()
+    finally:
+        stop.set()
+        for thread in clients:
+            thread.join()
+        pool.close()
+        server.shutdown()
+
+    assert statuses and set(statuses) == {200}
@@ -0,0 +1,77 @@
+"""
+批量分析：进程池中分析整个目录，按规范化文件名合并缺失模型，退出码区分无缺失、有缺失和解析错误
+"""
+
+import csv
+import json
+import os
+
+import pytest
+
+from benchmark import mf
+
+def write_workflow(path, loras):
+    nodes = [{'id': i, 'type': 'LoraLoader', 'widgets_values': [name, 1.0, 1.0]} for i, name in enumerate(loras, 1)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'nodes': nodes}, f)
+
+@pytest.fixture
+def library(tmp_path):
+    loras = tmp_path / 'models' / 'loras'
+    loras.mkdir(parents=True)
+    (loras / 'have.safetensors').write_bytes(b'')
+    (tmp_path / 'workflows').mkdir()
+    return tmp_path
+
+def run(library, *args):
+    return mf.main(['batch', str(library / 'workflows'), '--model-roots', str(library / 'models'),
+                    '-o', str(library / 'report.csv'), '--no-near-matches', *args])
+
+def read_report(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f))
+
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_missing_models_are_merged_across_workflows(library, workers):
+    write_workflow(library / 'workflows' / 'a.json', ['have.safetensors', 'Missing.safetensors'])
+    write_workflow(library / 'workflows' / 'b.json', ['missing.safetensors'])
+    write_workflow(library / 'workflows' / 'c.json', ['subdir\\missing.safetensors', 'other.safetensors'])
+
+    assert run(library, '-j', workers) == mf.EXIT_MISSING
+
+    rows = read_report(library / 'report.csv')
+    # 大小写和路径分隔符不同的写法合并为一行
+    assert [(row['文件名'], row['引用次数'], row['工作流数']) for row in rows] == [
+        ('Missing.safetensors', '3', '3'), ('other.safetensors', '1', '1')]
+
+def test_exit_ok_when_nothing_is_missing(library):
+    write_workflow(library / 'workflows' / 'a.json', ['have.safetensors'])
+    write_workflow(library / 'workflows' / 'b.json', ['have.safetensors'])
+    assert run(library, '-j', '2') == mf.EXIT_OK
+    assert read_report(library / 'report.csv') == []
+
+def test_exit_error_on_unparsable_workflow(library):
+    write_workflow(library / 'workflows' / 'a.json', ['have.safetensors'])
+    (library / 'workflows' / 'broken.json').write_text('{"nodes": [', encoding='utf-8')
+    assert run(library, '-j', '2') == mf.EXIT_ERROR
+
+def test_exit_error_without_workflows(library):
+    assert run(library) == mf.EXIT_ERROR
+
+def test_workers_use_the_refreshed_index_when_saving_fails(library, monkeypatch):
+    write_workflow(library / 'workflows' / 'a.json', ['have.safetensors'])
+    write_workflow(library / 'workflows' / 'b.json', ['gone.safetensors'])
+    monkeypatch.setattr(mf.ModelIndex, 'save', lambda self: self)
+
+    assert run(library, '-j', '2') == mf.EXIT_MISSING
+    assert [row['文件名'] for row in read_report(library / 'report.csv')] == ['gone.safetensors']
+
+def test_jsonl_report(library):
+    write_workflow(library / 'workflows' / 'a.json', ['absent.safetensors'])
+    output = library / 'report.jsonl'
+    assert mf.main(['batch', str(library / 'workflows'), '--model-roots', str(library / 'models'),
+                    '-o', str(output), '--no-near-matches']) == mf.EXIT_MISSING
+    with open(output, 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records == [{'file_name': 'absent.safetensors', 'node_types': ['LoraLoader'], 'references': 1,
+                        'workflows': [os.path.abspath(library / 'workflows' / 'a.json')]}]
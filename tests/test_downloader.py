@@ -0,0 +1,112 @@
+"""
+分段下载：多连接下载、换地址续传、文件变化后重新下载和进度统计
+"""
+
+import json
+import os
+
+import pytest
+
+from benchmark import FakeServer, file_bytes, mf
+
+class RecordingServer(FakeServer):
+    """记录每个文件请求的Range头"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.ranges = []
+
+    def model_file(self, handler, path):
+        self.ranges.append(handler.headers.get('Range'))
+        return super().model_file(handler, path)
+
+class Interrupted(Exception):
+    pass
+
+def test_segmented_download_resumes_on_another_mirror(tmp_path, monkeypatch):
+    monkeypatch.setattr(mf, 'DOWNLOAD_MIN_SEGMENT', 256 * 1024)
+    monkeypatch.setattr(mf, 'DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+    size = 2 * 1024 * 1024
+    path = '/org/repo/resolve/main/model.safetensors'
+    dest = str(tmp_path / 'loras' / 'model.safetensors')
+
+    def interrupt(current, total):
+        # 开始时回调一次，之后每0.2秒回调一次；镜像限速后第一次进度回调时还没有下载完
+        if current:
+            raise Interrupted()
+
+    with RecordingServer(file_size=size, stream_rate=size // 2) as mirror, \
+            RecordingServer(file_size=size) as origin:
+        downloader = mf.SegmentedDownloader(connections=4, max_retries=0, progress_callback=interrupt)
+        with pytest.raises(Interrupted):
+            downloader.download(mirror.url + path, dest)
+        downloader.close()
+
+        with open(dest + '.part.json', 'r', encoding='utf-8') as f:
+            saved = sum(segment[2] for segment in json.load(f)['segments'])
+        assert 0 < saved < size
+        assert not os.path.exists(dest)
+
+        # 换成另一个地址后从各段已完成的位置继续，不再从头下载
+        downloader = mf.SegmentedDownloader(connections=4)
+        assert downloader.download(origin.url + path, dest) == dest
+        downloader.close()
+
+    with open(dest, 'rb') as f:
+        assert f.read() == file_bytes(0, size)
+    assert not os.path.exists(dest + '.part')
+    assert not os.path.exists(dest + '.part.json')
+    # 第二个地址上只请求了尚未下载的部分（不计探测用的第一个字节）
+    requested = [tuple(map(int, r[len('bytes='):].split('-'))) for r in origin.ranges if r and r != 'bytes=0-0']
+    assert requested and sum(last - first + 1 for first, last in requested) == size - saved
+
+def test_segmented_download_restarts_when_file_changes(tmp_path):
+    path = '/org/repo/resolve/main/model.safetensors'
+    dest = str(tmp_path / 'model.safetensors')
+    with FakeServer(file_size=1024) as server:
+        with open(dest + '.part', 'wb') as f:
+            f.write(b'\0' * 2048)
+        with open(dest + '.part.json', 'w', encoding='utf-8') as f:
+            json.dump({'file': 'model.safetensors', 'url': server.url + path, 'size': 2048, 'etag': '',
+                       'segments': [[0, 2047, 1000]]}, f)
+        downloader = mf.SegmentedDownloader()
+        downloader.download(server.url + path, dest)
+        downloader.close()
+    with open(dest, 'rb') as f:
+        assert f.read() == file_bytes(0, 1024)
+
+class NoRangeServer(FakeServer):
+    """不支持Range的服务器，第一次下载请求只发送一半数据后断开连接"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.downloads = 0
+
+    def model_file(self, handler, path):
+        size = self.file_size
+        if handler.headers.get('Range') == 'bytes=0-0':
+            return 200, {'Content-Length': str(size)}, file_bytes(0, size)
+        self.downloads += 1
+        if self.downloads == 1:
+            return 200, {'Content-Length': str(size), 'Connection': 'close'}, file_bytes(0, size // 2)
+        return 200, {}, file_bytes(0, size)
+
+def test_restart_without_range_does_not_double_count_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(mf, 'DOWNLOAD_CHUNK_SIZE', 64 * 1024)
+    monkeypatch.setattr(mf, 'backoff_delay', lambda retry: 0)
+    size = 1024 * 1024
+    dest = str(tmp_path / 'model.safetensors')
+    reports = []
+
+    with NoRangeServer(file_size=size) as server:
+        downloader = mf.SegmentedDownloader(max_retries=2, progress_callback=lambda current, total: reports.append(
+            (current, total)))
+        downloader.download(server.url + '/org/repo/resolve/main/model.safetensors', dest)
+        downloader.close()
+        assert server.downloads == 2
+
+    with open(dest, 'rb') as f:
+        assert f.read() == file_bytes(0, size)
+    # 从头重新下载时先减掉已计入的字节，进度不会超过100%
+    assert all(current <= total == size for current, total in reports)
+    assert reports[-1] == (size, size)
@@ -0,0 +1,85 @@
+"""
+本地近似匹配：缺失文件名与本地文件名的三元组倒排索引
+"""
+
+import os
+
+from benchmark import mf
+
+LOCAL = ['Flux1-Dev.safetensors', 'flux1_dev_fp8_e4m3fn.safetensors', 'sdxl_vae.safetensors',
+         'realisticVision_v51.safetensors', 'control_v11p_sd15_canny.pth']
+
+def test_scores():
+    fuzzy = mf.FuzzyIndex(LOCAL)
+    assert len(fuzzy) == len(LOCAL)
+
+    # 只有大小写和分隔符不同
+    assert fuzzy.search('loras\\flux1_DEV.safetensors')[0] == (1.0, 'Flux1-Dev.safetensors')
+    # 只有精度后缀不同
+    score, name = fuzzy.search('flux1-dev-fp16.safetensors')[0]
+    assert name in ('Flux1-Dev.safetensors', 'flux1_dev_fp8_e4m3fn.safetensors') and score >= 0.9
+    assert [name for _, name in fuzzy.search('realisticVision_v60.safetensors')] == ['realisticVision_v51.safetensors']
+    assert fuzzy.search('completely_unrelated_model.ckpt') == []
+
+def test_add_and_remove():
+    fuzzy = mf.FuzzyIndex(LOCAL)
+    fuzzy.remove('sdxl_vae.safetensors')
+    assert len(fuzzy) == len(LOCAL) - 1
+    assert fuzzy.search('sdxl_vae.safetensors') == []
+
+    # 移除后空出的编号被新加入的文件名复用
+    fuzzy.add('sdxl_vae_fp16.safetensors')
+    fuzzy.add('sdxl_vae_fp16.safetensors')
+    assert len(fuzzy) == len(LOCAL) and len(fuzzy.names) == len(LOCAL)
+    assert fuzzy.search('sdxl_vae.safetensors')[0][1] == 'sdxl_vae_fp16.safetensors'
+
+def test_find_near_matches(tmp_path):
+    loras = tmp_path / 'loras'
+    loras.mkdir()
+    for name in LOCAL:
+        (loras / name).write_bytes(b'')
+    index = mf.ModelIndex([str(tmp_path)]).refresh()
+    missing = [{'file_path': 'flux1_dev.safetensors'},
+               {'file_path': 'sdxl-vae.safetensors', 'present_as': str(loras / 'other.safetensors')},
+               {'file_path': 'nothing_like_it.gguf'}]
+
+    assert mf.find_near_matches(missing, index) == 1
+    assert missing[0]['near_matches'][0] == (1.0, str(loras / 'Flux1-Dev.safetensors'))
+    assert 'near_matches' not in missing[1] and 'near_matches' not in missing[2]
+    assert mf.find_near_matches(missing, None) == 0
+
+def test_index_updates_fuzzy_index_in_place(tmp_path):
+    loras = tmp_path / 'loras'
+    (loras / 'sub').mkdir(parents=True)
+    for name in LOCAL:
+        (loras / name).write_bytes(b'')
+    index = mf.ModelIndex([str(tmp_path)]).refresh()
+    fuzzy = index.fuzzy_index()
+
+    (loras / 'sub' / 'new_model_v2.safetensors').write_bytes(b'')
+    (loras / 'sub' / 'Flux1-Dev.safetensors').write_bytes(b'')
+    os.remove(loras / 'sdxl_vae.safetensors')
+    changed = index.update_dirs([str(loras), str(loras / 'sub')])
+    assert changed == {os.path.normcase(name) for name in
+                       ('new_model_v2.safetensors', 'Flux1-Dev.safetensors', 'sdxl_vae.safetensors')}
+    assert len(index) == len(LOCAL) + 1
+
+    # 近似匹配索引没有重建，只更新了增减的文件名
+    assert index.fuzzy_index() is fuzzy
+    assert fuzzy.search('new_model_v1.safetensors')[0][1] == 'new_model_v2.safetensors'
+    assert fuzzy.search('sdxl_vae.safetensors') == []
+    # 同名文件的另一个路径被删除时文件名仍然保留
+    os.remove(loras / 'Flux1-Dev.safetensors')
+    index.update_dirs([str(loras)])
+    assert fuzzy.search('flux1_dev.safetensors')[0] == (1.0, 'Flux1-Dev.safetensors')
+
+    # 完整刷新时同样只更新增减的部分，结果与重新构建的索引一致
+    (loras / 'another_lora.safetensors').write_bytes(b'')
+    os.remove(loras / 'sub' / 'new_model_v2.safetensors')
+    index.refresh()
+    assert index.fuzzy_index() is fuzzy
+    rebuilt = mf.FuzzyIndex(os.path.basename(paths[0]) for paths in index.by_name.values())
+    assert sorted(n for n in fuzzy.names if n) == rebuilt.names
+    for query in ['another-lora.safetensors', 'new_model_v2.safetensors', 'flux1_dev_fp16.safetensors']:
+        assert fuzzy.search(query) == rebuilt.search(query)
+    assert len(index) == sum(len(paths) for paths in index.by_name.values())
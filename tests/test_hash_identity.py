@@ -0,0 +1,69 @@
+"""
+按内容哈希识别以其他文件名存在于本地的模型
+"""
+
+import csv
+import hashlib
+import json
+
+import pytest
+
+from benchmark import mf
+
+CONTENT = b'model weights' * 1000
+
+@pytest.fixture
+def library(tmp_path):
+    loras = tmp_path / 'models' / 'loras'
+    loras.mkdir(parents=True)
+    (loras / 'renamed.safetensors').write_bytes(CONTENT)
+    (loras / 'same_size.safetensors').write_bytes(b'x' * len(CONTENT))
+    (loras / 'other.safetensors').write_bytes(b'small')
+    # 原文件名的哈希来自搜索后端（如Hugging Face API返回的LFS哈希）
+    mf.record_known_hashes({'original.safetensors': (hashlib.sha256(CONTENT).hexdigest(), len(CONTENT))},
+                           source='test')
+    return tmp_path
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """记录实际计算了哈希的文件"""
+    paths = []
+    hash_file = mf.hash_file
+
+    def recording_hash_file(path, *args, **kwargs):
+        paths.append(path)
+        return hash_file(path, *args, **kwargs)
+    monkeypatch.setattr(mf, 'hash_file', recording_hash_file)
+    return paths
+
+def test_identify_renamed_model(library, hashed):
+    index = mf.ModelIndex([str(library / 'models')]).refresh()
+    missing = [{'file_path': 'loras\\Original.safetensors'}, {'file_path': 'unknown.safetensors'}]
+
+    assert mf.identify_by_hash(missing, index) == 1
+    assert missing[0]['present_as'] == str(library / 'models' / 'loras' / 'renamed.safetensors')
+    assert 'present_as' not in missing[1]
+    # 只有大小与已知哈希一致的文件才计算哈希
+    assert sorted(hashed) == [str(library / 'models' / 'loras' / name)
+                              for name in ('renamed.safetensors', 'same_size.safetensors')]
+
+    # 文件未变化时使用缓存的哈希，不再读取文件
+    hashed.clear()
+    missing = [{'file_path': 'original.safetensors'}]
+    assert mf.identify_by_hash(missing, index) == 1
+    assert hashed == []
+
+def test_batch_hash_identity(library):
+    (library / 'workflows').mkdir()
+    nodes = [{'id': 1, 'type': 'LoraLoader', 'widgets_values': ['original.safetensors', 1.0, 1.0]}]
+    with open(library / 'workflows' / 'a.json', 'w', encoding='utf-8') as f:
+        json.dump({'nodes': nodes}, f)
+
+    # 唯一的缺失模型以其他文件名存在，不算缺失
+    assert mf.main(['batch', str(library / 'workflows'), '--model-roots', str(library / 'models'),
+                    '-o', str(library / 'report.csv'), '--no-near-matches', '--hash-identity']) == mf.EXIT_OK
+    with open(library / 'report.csv', 'r', encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 1
+    assert rows[0]['搜索状态'] == mf.LOCAL_MATCH_STATUS
+    assert rows[0]['本地文件'].endswith('renamed.safetensors')
@@ -0,0 +1,48 @@
+"""
+HTML报告：表格模式和紧凑模式中的值都要转义
+"""
+
+import csv
+import json
+import re
+
+from benchmark import mf
+
+EVIL_NAME = '<img src=x onerror=alert(1)>.safetensors'
+EVIL_NODE = '</script><script>alert(2)</script>'
+
+def write_report(path):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['序号', '节点ID', '文件名', '下载链接', '镜像链接', '搜索状态', '内部列'])
+        writer.writerow(['1', EVIL_NODE, EVIL_NAME, 'javascript:alert(3)',
+                         'https://example.com/a?x=1&y="2"', '已处理', 'hidden'])
+
+def test_table_mode_escapes_values(tmp_path):
+    csv_file = str(tmp_path / 'report.csv')
+    write_report(csv_file)
+
+    with open(mf.create_html_view(csv_file, 'table'), 'r', encoding='utf-8') as f:
+        page = f.read()
+
+    assert '<img' not in page and 'alert(2)</script>' not in page
+    assert '&lt;img src=x onerror=alert(1)&gt;.safetensors' in page
+    # 只有http(s)地址生成链接
+    assert 'href="javascript' not in page
+    assert '<a href="https://example.com/a?x=1&amp;y=&quot;2&quot;" target="_blank">' in page
+    assert 'hidden' not in page
+
+def test_compact_mode_keeps_data_inside_script(tmp_path):
+    csv_file = str(tmp_path / 'report.csv')
+    write_report(csv_file)
+
+    with open(mf.create_html_view(csv_file, 'compact'), 'r', encoding='utf-8') as f:
+        page = f.read()
+
+    match = re.search(r'<script id="report-data" type="application/json">(.*?)</script>', page, re.S)
+    assert match
+    data = json.loads(match.group(1))
+    assert data['columns'] == ['序号', '节点ID', '文件名', '下载链接', '镜像链接', '搜索状态']
+    assert data['rows'] == [['1', EVIL_NODE, EVIL_NAME, 'javascript:alert(3)',
+                             'https://example.com/a?x=1&y="2"', '已处理']]
+    assert '<img' not in page
@@ -0,0 +1,29 @@
+"""
+页面加载超时的自适应计算
+"""
+
+from benchmark import mf
+
+def test_timeout_shrinks_after_fast_loads():
+    tracker = mf.LatencyTracker(initial=10, minimum=2, maximum=30)
+    assert tracker.timeout() == 10
+    for _ in range(20):
+        tracker.record(0.3)
+    assert tracker.timeout() == 2
+
+def test_timeouts_back_off_up_to_maximum():
+    tracker = mf.LatencyTracker(initial=10, minimum=2, maximum=30)
+    for _ in range(20):
+        tracker.record(0.3)
+
+    timeouts = []
+    for _ in range(5):
+        timeout = tracker.timeout()
+        timeouts.append(timeout)
+        tracker.timed_out(timeout)
+    assert timeouts == [2, 4, 8, 16, 30]
+    assert tracker.timeout() == 30
+
+    # 再次成功加载后恢复按观测耗时计算
+    tracker.record(0.3)
+    assert tracker.timeout() < 30
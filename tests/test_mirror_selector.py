@@ -0,0 +1,64 @@
+"""
+镜像选择：按测速结果使用最快的可用镜像
+"""
+
+import pytest
+
+from benchmark import FakeServer, mf
+
+HF_LINK = 'https://huggingface.co/org/repo/blob/main/model.safetensors'
+PATH = '/org/repo/resolve/main/model.safetensors'
+
+@pytest.fixture
+def mirrors():
+    with FakeServer(latency=0.2) as slow, FakeServer() as fast:
+        yield slow, fast
+
+def test_fastest_mirror_is_used(mirrors):
+    slow, fast = mirrors
+    selector = mf.MirrorSelector([slow.url, fast.url])
+    try:
+        assert selector.rank(PATH) == [fast.url, slow.url]
+        assert selector.mirror_link(HF_LINK) == fast.url + PATH
+        # 测速只进行一次
+        requests = slow.requests + fast.requests
+        selector.mirror_link(HF_LINK)
+        assert slow.requests + fast.requests == requests
+
+        # 下载失败的镜像排到最后，其次是CSV中原有的链接
+        selector.mark_failed(fast.url + PATH)
+        assert selector.candidates(HF_LINK) == [slow.url + PATH, fast.url + PATH, HF_LINK]
+    finally:
+        selector.close()
+
+def test_probe_results_are_cached(mirrors):
+    slow, fast = mirrors
+    cache = mf.ResolutionCache()
+    try:
+        selector = mf.MirrorSelector([slow.url, fast.url], cache=cache)
+        selector.rank(PATH)
+        selector.close()
+        requests = slow.requests + fast.requests
+
+        selector = mf.MirrorSelector([slow.url, fast.url], cache=cache)
+        assert selector.rank(PATH) == [fast.url, slow.url]
+        assert slow.requests + fast.requests == requests
+        selector.close()
+    finally:
+        cache.close()
+
+def test_unavailable_mirror_is_ranked_last(server):
+    selector = mf.MirrorSelector([server.url + '/missing', server.url])
+    try:
+        assert selector.mirror_link(HF_LINK) == server.url + PATH
+    finally:
+        selector.close()
+
+def test_links_without_mirror():
+    selector = mf.MirrorSelector([])
+    try:
+        assert selector.mirror_link(HF_LINK) == ''
+        assert selector.mirror_link('https://civitai.com/api/download/models/1') == ''
+        assert selector.candidates(HF_LINK) == [HF_LINK]
+    finally:
+        selector.close()
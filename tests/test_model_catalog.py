@@ -0,0 +1,34 @@
+"""
+离线模型目录：二进制目录文件的写入、查询和枚举
+"""
+
+from benchmark import mf
+
+def test_model_catalog_round_trip(tmp_path):
+    catalog_file = str(tmp_path / 'catalog.bin')
+    entries = [
+        {'file_name': 'Flux1-Dev.safetensors', 'repo_id': 'black-forest-labs/FLUX.1-dev',
+         'path': 'flux1-dev.safetensors', 'size': 23802932552, 'sha256': 'ab' * 32},
+        {'file_name': 'ae.safetensors', 'repo_id': 'black-forest-labs/FLUX.1-dev', 'path': 'ae.safetensors'},
+        {'file_name': 'bad\0name.safetensors', 'repo_id': 'org/repo', 'path': 'bad'},
+    ]
+    assert mf.ModelCatalog.write(catalog_file, entries, revision=7) == 2
+
+    catalog = mf.ModelCatalog(catalog_file)
+    try:
+        assert len(catalog) == 2 and catalog.revision == 7
+        entry = catalog.get('flux1-dev.SAFETENSORS')
+        assert entry == {'file_name': 'Flux1-Dev.safetensors', 'repo_id': 'black-forest-labs/FLUX.1-dev',
+                         'path': 'flux1-dev.safetensors', 'size': 23802932552, 'sha256': 'ab' * 32}
+        assert catalog.get('ae.safetensors')['size'] is None
+        assert catalog.get('missing.safetensors') is None
+        assert [e['file_name'] for e in catalog.entries()] == ['ae.safetensors', 'Flux1-Dev.safetensors']
+    finally:
+        catalog.close()
+
+def test_empty_model_catalog_closes(tmp_path):
+    catalog_file = str(tmp_path / 'empty.bin')
+    mf.ModelCatalog.write(catalog_file, [], revision=1)
+    catalog = mf.ModelCatalog(catalog_file)
+    assert len(catalog) == 0 and catalog.get('x.safetensors') is None
+    catalog.close()
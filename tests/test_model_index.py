@@ -0,0 +1,77 @@
+"""
+模型库索引：首次完整扫描，之后按目录mtime增量刷新，没有变化时不重写索引文件
+"""
+
+import os
+
+from benchmark import mf
+
+def make_tree(root):
+    for folder, names in {'checkpoints': ['base.safetensors'], 'loras': ['style.safetensors', 'notes.txt'],
+                          'loras/sub': ['detail.safetensors']}.items():
+        os.makedirs(os.path.join(root, folder), exist_ok=True)
+        for name in names:
+            open(os.path.join(root, folder, name), 'wb').close()
+
+def count_saves(monkeypatch):
+    saves = []
+    original = mf.ModelIndex.save
+    monkeypatch.setattr(mf.ModelIndex, 'save', lambda self: saves.append(1) or original(self))
+    return saves
+
+def test_initial_scan_lists_model_files(tmp_path):
+    make_tree(str(tmp_path / 'models'))
+    index = mf.load_model_index([str(tmp_path / 'models')])
+
+    assert len(index) == 3
+    assert index.lookup('style.safetensors') == [str(tmp_path / 'models' / 'loras' / 'style.safetensors')]
+    assert 'detail.safetensors' in index
+    assert 'notes.txt' not in index
+    assert os.path.exists(index.index_file)
+
+def test_unchanged_tree_is_reused_without_saving(tmp_path, monkeypatch):
+    make_tree(str(tmp_path / 'models'))
+    mf.load_model_index([str(tmp_path / 'models')])
+    saves = count_saves(monkeypatch)
+
+    index = mf.load_model_index([str(tmp_path / 'models')])
+
+    assert index.stats == {'scanned': 0, 'reused': 4, 'changed': False}
+    assert len(index) == 3
+    assert saves == []
+
+def test_only_changed_directories_are_rescanned(tmp_path, monkeypatch):
+    root = tmp_path / 'models'
+    make_tree(str(root))
+    mf.load_model_index([str(root)])
+    saves = count_saves(monkeypatch)
+
+    open(root / 'loras' / 'sub' / 'new.safetensors', 'wb').close()
+    index = mf.load_model_index([str(root)])
+
+    assert index.stats['scanned'] == 1 and index.stats['reused'] == 3
+    assert index.lookup('new.safetensors') == [str(root / 'loras' / 'sub' / 'new.safetensors')]
+    assert saves == [1]
+
+def test_removed_directory_drops_its_files(tmp_path):
+    root = tmp_path / 'models'
+    make_tree(str(root))
+    mf.load_model_index([str(root)])
+
+    os.remove(root / 'loras' / 'sub' / 'detail.safetensors')
+    os.rmdir(root / 'loras' / 'sub')
+    index = mf.load_model_index([str(root)])
+
+    assert 'detail.safetensors' not in index
+    assert str(root / 'loras' / 'sub') not in index.dirs
+    assert index.stats['changed']
+
+def test_index_for_other_roots_is_ignored(tmp_path):
+    make_tree(str(tmp_path / 'models'))
+    index_file = str(tmp_path / 'index.json')
+    mf.ModelIndex([str(tmp_path / 'models')], index_file=index_file).refresh().save()
+
+    os.makedirs(tmp_path / 'other')
+    index = mf.ModelIndex([str(tmp_path / 'other')], index_file=index_file).load()
+
+    assert index.dirs == {} and len(index) == 0
@@ -0,0 +1,97 @@
+"""
+模型分类目录：按节点类型只在ComfyUI会加载的目录中查找，以及extra_model_paths.yaml的解析
+"""
+
+import os
+import textwrap
+
+import pytest
+
+from benchmark import mf
+
+EXTRA_PATHS = textwrap.dedent('''\
+    # ComfyUI附带的示例配置
+    a111:
+        base_path: ../webui   # 相对于配置文件所在目录
+        checkpoints: models/Stable-diffusion
+        loras: |
+            models/Lora
+            models/LyCORIS
+        unet: "models/unet # 引号中的#不是注释"
+        is_default: true
+
+    "shared models":
+        base_path: 'C:\\models'
+        clip: clip
+    ''')
+
+def test_parse_extra_model_paths():
+    assert mf.parse_extra_model_paths(EXTRA_PATHS) == {
+        'a111': {
+            'base_path': '../webui',
+            'checkpoints': 'models/Stable-diffusion',
+            'loras': 'models/Lora\nmodels/LyCORIS',
+            'unet': 'models/unet # 引号中的#不是注释',
+            'is_default': 'true',
+        },
+        'shared models': {'base_path': 'C:\\models', 'clip': 'clip'},
+    }
+
+def test_load_extra_model_paths(tmp_path):
+    comfy = tmp_path / 'ComfyUI'
+    comfy.mkdir()
+    yaml_file = comfy / 'extra_model_paths.yaml'
+    yaml_file.write_text('webui:\n    base_path: ../webui\n    loras: |\n        models/Lora\n        models/LyCORIS\n'
+                         '    unet: models/unet\nlocal:\n    vae: vae_models\n', encoding='utf-8')
+
+    webui = str(tmp_path / 'webui')
+    assert mf.load_extra_model_paths(str(yaml_file)) == [
+        ('loras', os.path.join(webui, 'models', 'Lora')),
+        ('loras', os.path.join(webui, 'models', 'LyCORIS')),
+        # 旧分类名换成新的分类名
+        ('diffusion_models', os.path.join(webui, 'models', 'unet')),
+        # 没有base_path时相对于配置文件所在目录
+        ('vae', str(comfy / 'vae_models')),
+    ]
+
+@pytest.fixture
+def comfy(tmp_path, monkeypatch):
+    monkeypatch.delenv(mf.EXTRA_MODEL_PATHS_ENV, raising=False)
+    models = tmp_path / 'ComfyUI' / 'models'
+    for folder, name in (('checkpoints', 'sd_xl_base.safetensors'), ('loras', 'detail.safetensors'),
+                         ('unet', 'flux1-dev.safetensors'), ('misc', 'anything.safetensors')):
+        (models / folder).mkdir(parents=True)
+        (models / folder / name).write_bytes(b'')
+    lora_dir = tmp_path / 'webui' / 'models' / 'Lora'
+    lora_dir.mkdir(parents=True)
+    (lora_dir / 'webui_lora.safetensors').write_bytes(b'')
+    (tmp_path / 'ComfyUI' / 'extra_model_paths.yaml').write_text(
+        'webui:\n    base_path: ../webui\n    loras: models/Lora\n', encoding='utf-8')
+    return mf.ModelIndex([str(models)]).refresh()
+
+def test_lookup_by_node_type(comfy):
+    models = comfy.model_roots[0]
+    assert comfy.lookup_for('sd_xl_base.safetensors', 'CheckpointLoaderSimple') == [
+        os.path.join(models, 'checkpoints', 'sd_xl_base.safetensors')]
+    # 放在其他分类目录中的文件ComfyUI不会加载
+    assert comfy.lookup_for('sd_xl_base.safetensors', 'LoraLoader') == []
+    # unet是diffusion_models的旧目录名
+    assert comfy.lookup_for('flux1-dev.safetensors', 'UNETLoader') == [
+        os.path.join(models, 'unet', 'flux1-dev.safetensors')]
+    # extra_model_paths.yaml中的目录加入索引，并按配置的分类查找
+    assert len(comfy.lookup_for('webui_lora.safetensors', 'LoraLoaderModelOnly')) == 1
+    assert comfy.lookup_for('webui_lora.safetensors', 'VAELoader') == []
+    # 无法识别的节点类型不按分类查找
+    assert comfy.lookup_for('anything.safetensors', 'SomeCustomLoader') is None
+
+def test_misplaced_models_are_missing(comfy):
+    references = [
+        {'node_id': '1', 'node_type': 'LoraLoader', 'file_path': 'sd_xl_base.safetensors'},
+        {'node_id': '2', 'node_type': 'CheckpointLoaderSimple', 'file_path': 'sd_xl_base.safetensors'},
+        {'node_id': '3', 'node_type': 'SomeCustomLoader', 'file_path': 'anything.safetensors'},
+        {'node_id': '4', 'node_type': 'LoraLoader', 'file_path': 'webui_lora.safetensors'},
+    ]
+    missing = mf.check_missing_references(references, comfy.model_roots[0], comfy)
+    assert missing == [{'node_id': '1', 'node_type': 'LoraLoader', 'file_path': 'sd_xl_base.safetensors',
+                        'misplaced': [os.path.join(comfy.model_roots[0], 'checkpoints', 'sd_xl_base.safetensors')]}]
+    assert mf.model_folder_for('SomeCustomLoader; LoraLoader') == 'loras'
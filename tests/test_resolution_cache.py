@@ -0,0 +1,79 @@
+"""
+搜索结果缓存：TTL、负缓存、淘汰，以及搜索前先查询缓存
+"""
+
+import os
+
+import pytest
+
+from benchmark import mf
+
+def test_resolution_cache_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mf.time, 'time', lambda: now[0])
+    cache = mf.ResolutionCache(str(tmp_path / 'cache.sqlite3'), ttl=100, negative_ttl=10)
+    try:
+        cache.put('Model.safetensors', 'https://example.com/model', 'https://mirror.example.com/model', source='test')
+        cache.put('gone.safetensors', source='test', found=False)
+
+        entry = cache.get('model.safetensors')
+        assert entry['found'] and entry['download_link'] == 'https://example.com/model'
+        assert cache.get('gone.safetensors')['found'] is False
+
+        # 负缓存先过期，找到的结果在ttl之后过期
+        now[0] += 11
+        assert cache.get('gone.safetensors') is None
+        assert cache.get('model.safetensors') is not None
+        now[0] += 90
+        assert cache.get('model.safetensors') is None
+    finally:
+        cache.close()
+
+def test_evict_keeps_most_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mf.time, 'time', lambda: now[0])
+    cache = mf.ResolutionCache(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    try:
+        for name in ('a.safetensors', 'b.safetensors', 'c.safetensors'):
+            now[0] += 1
+            cache.put(name, f"https://example.com/{name}")
+        now[0] += 1
+        cache.get('a.safetensors')
+        cache.evict()
+        assert cache.get('a.safetensors') and cache.get('c.safetensors')
+        assert cache.get('b.safetensors') is None
+    finally:
+        cache.close()
+
+class CountingBackend(mf.SearchBackend):
+    name = 'test'
+
+    def __init__(self):
+        super().__init__()
+        self.searched = []
+
+    def search_all(self, keywords, on_result):
+        for keyword in keywords:
+            self.searched.append(keyword)
+            on_result(keyword, (f"https://example.com/{keyword}", ''), None)
+
+def test_search_uses_cache_before_backend(tmp_path):
+    pd = pytest.importorskip('pandas')
+    csv_file = str(tmp_path / 'missing.csv')
+    pd.DataFrame({'文件名': ['cached.safetensors', 'new.safetensors', 'gone.safetensors']}).to_csv(csv_file, index=False)
+    cache = mf.ResolutionCache(str(tmp_path / 'cache.sqlite3'))
+    try:
+        cache.put('CACHED.safetensors', 'https://example.com/cached.safetensors', '', source='test')
+        cache.put('gone.safetensors', source='test', found=False)
+        backend = CountingBackend()
+        mf.search_model_links(csv_file, cache=cache, backend=backend, use_catalog=False, expand_repos=False)
+        assert backend.searched == ['new.safetensors']
+        # 新的结果写入缓存，下次运行不再搜索
+        assert cache.get('new.safetensors')['source'] == 'test'
+    finally:
+        cache.close()
+
+    df = pd.read_csv(csv_file, encoding='utf-8-sig')
+    assert list(df['搜索状态']) == ['已处理', '已处理', '未找到']
+    assert df['下载链接'][0] == 'https://example.com/cached.safetensors'
+    assert not os.path.exists(str(tmp_path / 'missing.journal.jsonl'))
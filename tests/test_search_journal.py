@@ -0,0 +1,71 @@
+"""
+断点续搜：进度日志的追加、按间隔压缩和中断后的重放
+"""
+
+import os
+
+import pytest
+
+from benchmark import mf
+
+pd = pytest.importorskip('pandas')
+
+class InterruptingBackend(mf.SearchBackend):
+    """奇数编号的文件找到链接，偶数编号的未找到；搜索stop_after个关键词后模拟Ctrl+C"""
+
+    name = 'test'
+
+    def __init__(self, stop_after=None):
+        super().__init__()
+        self.stop_after = stop_after
+        self.searched = []
+
+    def search_all(self, keywords, on_result):
+        for keyword in keywords:
+            if len(self.searched) == self.stop_after:
+                raise KeyboardInterrupt()
+            self.searched.append(keyword)
+            index = int(keyword[len('model'):].split('.')[0])
+            on_result(keyword, (f"https://example.com/{keyword}", '') if index % 2 else None, None)
+
+def test_resume_skips_journaled_names(tmp_path):
+    csv_file = str(tmp_path / 'missing.csv')
+    names = [f"model{i}.safetensors" for i in range(6)]
+    pd.DataFrame({'文件名': names}).to_csv(csv_file, index=False)
+    journal_file = str(tmp_path / 'missing.journal.jsonl')
+
+    backend = InterruptingBackend(stop_after=4)
+    with pytest.raises(KeyboardInterrupt):
+        mf.search_model_links(csv_file, use_cache=False, backend=backend, compact_interval=2,
+                              use_catalog=False, expand_repos=False)
+    assert backend.searched == names[:4]
+
+    # 压缩后结果已写入CSV；未找到的条目在CSV中会被重新搜索，只能靠保留在日志中的条目跳过
+    df = pd.read_csv(csv_file, encoding='utf-8-sig')
+    assert list(df['搜索状态'].fillna(''))[:4] == ['未找到', '已处理', '未找到', '已处理']
+    journal = mf.SearchJournal(csv_file)
+    assert journal.replay(df.copy()) == 2
+    assert journal.done == {mf.normalize_model_name(names[0]), mf.normalize_model_name(names[2])}
+
+    backend = InterruptingBackend()
+    assert mf.search_model_links(csv_file, use_cache=False, backend=backend,
+                                 use_catalog=False, expand_repos=False)
+    assert backend.searched == names[4:]
+    assert not os.path.exists(journal_file)
+    df = pd.read_csv(csv_file, encoding='utf-8-sig')
+    assert list(df['搜索状态']) == ['未找到', '已处理'] * 3
+    assert df.at[5, '下载链接'] == 'https://example.com/model5.safetensors'
+
+def test_replay_ignores_torn_last_line(tmp_path):
+    csv_file = str(tmp_path / 'missing.csv')
+    df = pd.DataFrame({'文件名': ['a.safetensors', 'b.safetensors'], '下载链接': '', '镜像链接': '', '搜索状态': ''})
+    journal = mf.SearchJournal(csv_file)
+    journal.append('a.safetensors', [0], 'https://example.com/a', '', '已处理')
+    journal.close()
+    with open(journal.path, 'a', encoding='utf-8') as f:
+        f.write('{"file_name": "b.safe')
+
+    journal = mf.SearchJournal(csv_file)
+    assert journal.replay(df) == 1
+    assert df.at[0, '下载链接'] == 'https://example.com/a'
+    assert journal.done == {mf.normalize_model_name('a.safetensors')}
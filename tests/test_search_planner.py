@@ -0,0 +1,69 @@
+"""
+搜索规划：每个唯一文件名只搜索一次，结果写入所有对应的行
+"""
+
+import pytest
+
+from benchmark import mf
+
+pd = pytest.importorskip('pandas')
+
+def make_frame(rows):
+    df = pd.DataFrame(rows, columns=['文件名', '下载链接', '镜像链接', '搜索状态'])
+    for col in ('下载链接', '镜像链接', '搜索状态'):
+        df[col] = df[col].astype(object)
+    return df
+
+def test_plan_groups_normalized_names():
+    df = make_frame([
+        ['Flux1-Dev.safetensors', '', '', ''],
+        ['flux1-dev.safetensors', '', '', ''],
+        ['unet\\FLUX1-DEV.safetensors', '', '', ''],
+        ['ae.safetensors', '', '', ''],
+        ['', '', '', ''],
+    ])
+    plan = mf.plan_searches(df)
+    assert plan == {'Flux1-Dev.safetensors': [0, 1, 2], 'ae.safetensors': [3]}
+
+def test_processed_rows_are_copied_not_searched():
+    df = make_frame([
+        ['vae.safetensors', 'https://example.com/vae', 'https://mirror.example.com/vae', '已处理'],
+        ['VAE.safetensors', '', '', ''],
+        ['local.safetensors', '', '', mf.LOCAL_MATCH_STATUS],
+        ['retry.safetensors', '', '', '未找到'],
+    ])
+    plan = mf.plan_searches(df)
+    assert plan == {'retry.safetensors': [3]}
+    assert df.at[1, '下载链接'] == 'https://example.com/vae'
+    assert df.at[1, '搜索状态'] == '已处理'
+    assert df.at[2, '搜索状态'] == mf.LOCAL_MATCH_STATUS
+
+def test_journaled_names_are_skipped():
+    df = make_frame([['a.safetensors', '', '', '未找到'], ['b.safetensors', '', '', '']])
+    assert mf.plan_searches(df, done={'a.safetensors'}) == {'b.safetensors': [1]}
+
+class RecordingBackend(mf.SearchBackend):
+    name = 'test'
+
+    def __init__(self):
+        super().__init__()
+        self.searched = []
+
+    def search_all(self, keywords, on_result):
+        for keyword in keywords:
+            self.searched.append(keyword)
+            on_result(keyword, (f"https://example.com/{keyword}", ''), None)
+
+def test_search_fans_one_result_out_to_all_rows(tmp_path):
+    csv_file = str(tmp_path / 'missing.csv')
+    pd.DataFrame({'文件名': ['lora.safetensors', 'LORA.safetensors', 'other.pt', 'lora.safetensors']}).to_csv(
+        csv_file, index=False)
+    backend = RecordingBackend()
+
+    mf.search_model_links(csv_file, use_cache=False, backend=backend, use_catalog=False, expand_repos=False)
+
+    assert sorted(backend.searched) == ['lora.safetensors', 'other.pt']
+    df = pd.read_csv(csv_file, encoding='utf-8-sig')
+    assert list(df['下载链接']) == ['https://example.com/lora.safetensors'] * 2 + \
+        ['https://example.com/other.pt', 'https://example.com/lora.safetensors']
+    assert set(df['搜索状态']) == {'已处理'}
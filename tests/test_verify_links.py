@@ -0,0 +1,30 @@
+"""
+链接验证：HEAD请求、不支持HEAD时的Range请求回退，以及状态码和文件大小写回CSV
+"""
+
+import csv
+
+import pytest
+
+from benchmark import mf
+
+def test_verify_links_falls_back_to_range_get(tmp_path, server):
+    pytest.importorskip('pandas')
+    csv_file = tmp_path / 'links.csv'
+    link = f"{server.url}/org/repo/resolve/main/nohead_model.safetensors"
+    missing = f"{server.url}/org/repo/resolve/main/missing_model.safetensors"
+    with open(csv_file, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['文件名', '下载链接', '镜像链接', '搜索状态'])
+        writer.writerow(['nohead_model.safetensors', link, missing, '已处理'])
+
+    valid, total = mf.verify_links(str(csv_file), use_cache=False)
+
+    assert (valid, total) == (1, 2)
+    with open(csv_file, 'r', encoding='utf-8-sig', newline='') as f:
+        row = next(csv.DictReader(f))
+    # HEAD返回405后改用Range GET，文件大小取自Content-Range
+    assert row['下载链接状态'] == '206'
+    assert row['镜像链接状态'] == '404'
+    assert int(row['文件大小']) == 1024 * 1024 + len('/cdn/org/repo/resolve/main/nohead_model.safetensors')
+    assert row['ETag']
@@ -0,0 +1,97 @@
+"""
+监视模式：工作流或模型目录变化后只更新报告中受影响的行
+"""
+
+import csv
+import json
+import os
+
+import pytest
+
+from benchmark import mf
+
+def write_workflow(path, loras):
+    nodes = [{'id': i, 'type': 'LoraLoader', 'widgets_values': [name, 1.0, 1.0]} for i, name in enumerate(loras, 1)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'nodes': nodes}, f)
+
+def read_report(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return {row['文件名']: row for row in csv.DictReader(f)}
+
+@pytest.fixture
+def watcher(tmp_path):
+    loras = tmp_path / 'models' / 'loras'
+    loras.mkdir(parents=True)
+    (loras / 'have.safetensors').write_bytes(b'')
+    workflows = tmp_path / 'workflows'
+    workflows.mkdir()
+    write_workflow(workflows / 'a.json', ['have.safetensors', 'Flux1_Dev.safetensors', 'sdxl_base_1.0.safetensors'])
+    write_workflow(workflows / 'b.json', ['loras\\flux1_dev.safetensors'])
+    report = mf.ReportWatcher([str(workflows)], str(tmp_path / 'report.csv'), [str(tmp_path / 'models')])
+    report.start()
+    return report
+
+def test_rows_are_merged_like_batch_mode(watcher):
+    rows = read_report(watcher.output_file)
+    assert sorted(rows) == ['Flux1_Dev.safetensors', 'sdxl_base_1.0.safetensors']
+    assert rows['Flux1_Dev.safetensors']['引用次数'] == '2'
+    assert rows['Flux1_Dev.safetensors']['工作流数'] == '2'
+
+def test_near_matches_update_only_affected_rows(watcher, monkeypatch):
+    loras = os.path.join(os.path.dirname(watcher.model_roots[0]), 'models', 'loras')
+    recomputed = []
+    near_matches = watcher._near_matches
+
+    def recording_near_matches(name, file_name):
+        recomputed.append(name)
+        return near_matches(name, file_name)
+    monkeypatch.setattr(watcher, '_near_matches', recording_near_matches)
+
+    # 与其中一个缺失文件名相近的新文件只影响这一行
+    open(os.path.join(loras, 'flux1_dev_fp8_e4m3fn.safetensors'), 'wb').close()
+    assert watcher.handle(({loras}, set())) == 1
+    assert recomputed == ['flux1_dev.safetensors']
+    rows = read_report(watcher.output_file)
+    assert 'flux1_dev_fp8_e4m3fn.safetensors' in rows['Flux1_Dev.safetensors'][mf.FUZZY_MATCH_COLUMN]
+    assert rows['sdxl_base_1.0.safetensors'][mf.FUZZY_MATCH_COLUMN] == ''
+
+    # 无关的文件不触发任何更新
+    recomputed.clear()
+    open(os.path.join(loras, 'unrelated_model.safetensors'), 'wb').close()
+    assert watcher.handle(({loras}, set())) == 0
+    assert recomputed == []
+
+    # 删除匹配到的文件后近似匹配随之消失
+    os.remove(os.path.join(loras, 'flux1_dev_fp8_e4m3fn.safetensors'))
+    assert watcher.handle(({loras}, set())) == 1
+    assert recomputed == ['flux1_dev.safetensors']
+    assert read_report(watcher.output_file)['Flux1_Dev.safetensors'][mf.FUZZY_MATCH_COLUMN] == ''
+
+def test_added_model_removes_row_and_keeps_other_columns(watcher):
+    # 搜索命令在报告中写入的列原样保留
+    rows = read_report(watcher.output_file)
+    with open(watcher.output_file, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=list(next(iter(rows.values()))) + ['下载链接'])
+        writer.writeheader()
+        for row in rows.values():
+            writer.writerow(dict(row, 下载链接=f"https://example.com/{row['文件名']}"))
+
+    loras = os.path.join(os.path.dirname(watcher.model_roots[0]), 'models', 'loras')
+    open(os.path.join(loras, 'sdxl_base_1.0.safetensors'), 'wb').close()
+    watcher.handle(({loras}, set()))
+
+    rows = read_report(watcher.output_file)
+    assert list(rows) == ['Flux1_Dev.safetensors']
+    assert rows['Flux1_Dev.safetensors']['序号'] == '1'
+    assert rows['Flux1_Dev.safetensors']['下载链接'] == 'https://example.com/Flux1_Dev.safetensors'
+
+def test_workflow_changes(watcher):
+    workflows = os.path.dirname(next(iter(watcher.references)))
+    write_workflow(os.path.join(workflows, 'c.json'), ['new_missing.safetensors'])
+    os.remove(os.path.join(workflows, 'b.json'))
+    watcher.handle(({workflows}, set()))
+
+    rows = read_report(watcher.output_file)
+    assert sorted(rows) == ['Flux1_Dev.safetensors', 'new_missing.safetensors', 'sdxl_base_1.0.safetensors']
+    assert rows['Flux1_Dev.safetensors']['引用次数'] == '1'
@@ -0,0 +1,64 @@
+"""
+流式工作流解析：增量JSON扫描器和流式提取的引用与json.load一致
+"""
+
+import io
+import json
+
+import pytest
+
+from benchmark import generate_workflow, mf
+
+JSON_DOCUMENTS = [
+    '{}',
+    '[]',
+    '{"a": 1, "b": [true, false, null], "c": {"d": -1.5e3, "e": ""}}',
+    '[1, "x", {"k": [2, 3]}, [], {}]',
+    '{"escaped": "line\\nbreak \\"quoted\\" \\\\ \\u4e2d\\u6587 \\ud83d\\ude00", "中文": "值"}',
+    '  {\r\n  "spaced" :\t[ 0 , 1 ] }  ',
+]
+
+def read_document(stream):
+    """用扫描器的遍历接口重建整个值（read_value只返回字符串和标量）"""
+    ch = stream.peek()
+    if ch == '{':
+        return {key: read_document(stream) for key in stream.iter_object()}
+    if ch == '[':
+        return [read_document(stream) for _ in stream.iter_array()]
+    return stream.read_value()
+
+@pytest.mark.parametrize('document', JSON_DOCUMENTS)
+@pytest.mark.parametrize('chunk_size', [1, 3, 1 << 16])
+def test_json_stream_matches_json_load(document, chunk_size, monkeypatch):
+    monkeypatch.setattr(mf._JsonStream, 'CHUNK_SIZE', chunk_size)
+    stream = mf._JsonStream(io.StringIO(document))
+    assert read_document(stream) == json.loads(document)
+    assert stream.peek() == ''
+
+def test_json_stream_skips_nested_values(monkeypatch):
+    monkeypatch.setattr(mf._JsonStream, 'CHUNK_SIZE', 2)
+    stream = mf._JsonStream(io.StringIO('[{"a": [1, {"b": "]}"}]}, "after"]'))
+    values = []
+    for _ in stream.iter_array():
+        values.append(stream.read_value())
+    assert values == [None, 'after']
+
+def test_streaming_references_match_json_load(tmp_path):
+    workflow_file = generate_workflow(str(tmp_path / 'workflow.json'), nodes=300)
+    streamed = mf.load_workflow_references(workflow_file, streaming=True)
+    loaded = mf.load_workflow_references(workflow_file, streaming=False)
+    assert streamed == loaded
+    assert loaded
+
+def test_streaming_handles_dict_widgets_and_other_keys(tmp_path):
+    workflow = {'last_node_id': 3, 'extra': {'nodes': 'not a list'}, 'nodes': [
+        {'id': 1, 'type': 'CheckpointLoaderSimple', 'widgets_values': ['sd_xl_base_1.0.safetensors']},
+        {'id': 2, 'type': 'VHS_LoadVideo', 'widgets_values': {'video': 'clip.mp4', 'upscale_model': 'x4.pth'}},
+        {'id': 3, 'type': 'Note', 'widgets_values': ['see "model.ckpt" \\ here']},
+    ], 'links': [[1, 1, 0, 2, 0, 'MODEL']]}
+    workflow_file = tmp_path / 'workflow.json'
+    workflow_file.write_text(json.dumps(workflow, ensure_ascii=False), encoding='utf-8')
+
+    streamed = mf.load_workflow_references(str(workflow_file), streaming=True)
+    assert streamed == mf.load_workflow_references(str(workflow_file), streaming=False)
+    assert {ref['file_path'] for ref in streamed} >= {'sd_xl_base_1.0.safetensors'}